@@ -0,0 +1,96 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+'''Per-call overhead of sending the observations, the labels and the criteria
+names to R, comparing the former conversion (global numpy2ri activation,
+labels and criteria sent as Python lists and flattened in R with `unlist`)
+with the scoped converter and typed arrays used by `session.call`.
+
+Usage: python -m benchmarks.conversion [--repeat 5] [--variables 4]
+'''
+import argparse
+import timeit
+import numpy as np
+from cluster_crit import session
+
+
+Sizes = (10 ** 3, 10 ** 5, 10 ** 6)
+
+# R functions receiving the same arguments as `rIntCriteria`, without
+# computing any criterion, so that only the conversion is measured
+BenchmarkFunctions = '''
+benchBefore <- function(dataset, labels, criteria) {
+    length(unlist(labels)) + length(unlist(criteria)) + nrow(dataset)
+}
+
+benchAfter <- function(dataset, labels, criteria) {
+    length(as.vector(labels)) + length(criteria) + nrow(dataset)
+}
+'''
+
+
+def before(traj, part, criteria):
+    '''Conversion used before scoped converters.'''
+    from rpy2 import robjects
+    from rpy2.robjects import numpy2ri
+
+    numpy2ri.activate()
+    try:
+        return robjects.globalenv['benchBefore'](traj, part.tolist(), list(criteria))
+    finally:
+        numpy2ri.deactivate()
+
+
+def after(traj, part, criteria):
+    '''Conversion used by `session.call`.'''
+    return session.call('benchAfter', traj, part, list(criteria))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='timings per size, the best is kept')
+    parser.add_argument('--variables', type=int, default=4, help='number of columns of the observations')
+    args = parser.parse_args()
+
+    session.init()
+    from rpy2 import robjects
+    robjects.r(BenchmarkFunctions)
+
+    rng = np.random.default_rng(0)
+    criteria = ('Calinski_Harabasz', 'Silhouette', 'Dunn')
+
+    print('{:>9} {:>12} {:>12} {:>8}'.format('N', 'before (s)', 'after (s)', 'speedup'))
+    for n in Sizes:
+        traj = rng.normal(size=(n, args.variables))
+        part = rng.integers(1, 6, size=n)
+
+        timings = []
+        for function in (before, after):
+            timer = timeit.Timer(lambda: function(traj, part, criteria))
+            timings.append(min(timer.repeat(repeat=args.repeat, number=1)))
+
+        print('{:>9} {:>12.4f} {:>12.4f} {:>7.1f}x'.format(n, timings[0], timings[1], timings[0] / timings[1]))
+
+
+if __name__ == '__main__':
+    main()
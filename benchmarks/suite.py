@@ -0,0 +1,292 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+'''Benchmark suite measuring the wall time and the peak memory of every
+criterion, for every available backend, across data set sizes (N), numbers
+of variables (d) and numbers of clusters (k). The R bootstrap, the conversion
+of the observations to R and the pairwise distances are measured as separate
+phases. Results are written as CSV, one row per measurement in a stable
+order, so that the files of two releases can be diffed or compared with the
+`compare` command.
+
+Usage:
+    python -m benchmarks.suite run --output results.csv
+    python -m benchmarks.suite run --quick --backends numpy
+    python -m benchmarks.suite compare old.csv new.csv --threshold 1.25
+
+Peak memory is the peak of the Python and numpy allocations (tracemalloc)
+during the measurement plus, for the R backend, the increase of the memory
+used by R (gc "max used").
+'''
+import argparse
+import csv
+import gc
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from cluster_crit import session
+from cluster_crit.concordance import ConcordanceCriteria
+from cluster_crit.contingency import contingencyCriteria
+from cluster_crit.criteria import CriteriaExternal, CriteriaInternal
+from cluster_crit.dataset import Dataset
+from cluster_crit.distance import distanceCache, pairwiseDistances
+from cluster_crit.native import NativeCriteria, nativeCriteria
+from cluster_crit.pairwise import PairwiseCriteria
+
+
+Sizes = (10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+Dimensions = (1, 16, 64, 256)
+Clusters = (2, 10, 100)
+
+QuickSizes = (10 ** 2, 10 ** 3)
+QuickDimensions = (2, 16)
+QuickClusters = (2, 10)
+
+# criteria whose cost grows with the number of pairs of points
+Quadratic = set(PairwiseCriteria) | set(ConcordanceCriteria) | {CriteriaInternal.Xie_Beni}
+
+# default limits keeping a complete run within a few hours and the memory
+# of the benchmark below a few GB
+DefaultMaxPairs = 5 * 10 ** 7
+DefaultMaxValues = 5 * 10 ** 7
+
+Columns = ('phase', 'backend', 'criterion', 'n', 'd', 'k', 'seconds', 'peak_bytes', 'status')
+
+
+def dataset(n, d, k, seed=0):
+    '''Gaussian clusters with every one of the k clusters present.
+
+    :return: tuple of (observations, labels 1-k)
+    '''
+    rng = np.random.default_rng(seed)
+    part = rng.permutation(np.arange(n) % k) + 1
+    centers = rng.normal(scale=5.0, size=(k, d))
+    return centers[part - 1] + rng.normal(size=(n, d)), part
+
+
+def _rMemory():
+    '''Reset the maximum memory used by R, returning the memory in use.'''
+    from rpy2 import robjects
+    return robjects.r('sum(gc(reset = TRUE)[, 2])')[0] * (1 << 20)
+
+
+def _rPeak(used):
+    from rpy2 import robjects
+    return max(0.0, robjects.r('sum(gc()[, 6])')[0] * (1 << 20) - used)
+
+
+def measure(function, backend, repeat):
+    '''Best wall time over `repeat` runs, then the peak memory of one more run.
+
+    :return: tuple of (seconds, peak bytes)
+    '''
+    best = np.inf
+    for _ in range(repeat):
+        distanceCache.clear()
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    distanceCache.clear()
+    gc.collect()
+    used = _rMemory() if backend == 'r' else 0.0
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if backend == 'r':
+        peak += _rPeak(used)
+    return best, int(peak)
+
+
+class Runner:
+    '''Run the measurements and write one CSV row per measurement.'''
+
+    def __init__(self, args, writer):
+        self.args = args
+        self.writer = writer
+
+    def row(self, phase, backend, criterion, n, d, k, seconds=None, peak=None, status='ok'):
+        self.writer.writerow({
+            'phase': phase, 'backend': backend, 'criterion': criterion, 'n': n, 'd': d, 'k': k,
+            'seconds': '' if seconds is None else '{:.6g}'.format(seconds),
+            'peak_bytes': '' if peak is None else peak, 'status': status,
+        })
+        self.args.output.flush()
+
+    def timed(self, phase, backend, criterion, n, d, k, function):
+        try:
+            seconds, peak = measure(function, backend, self.args.repeat)
+        except Exception as e:
+            self.row(phase, backend, criterion, n, d, k, status='error: {}'.format(type(e).__name__))
+        else:
+            self.row(phase, backend, criterion, n, d, k, seconds, peak)
+
+    def bootstrap(self, backends):
+        '''Time the start of R, which happens once per process.'''
+        if 'r' not in backends:
+            return backends
+        start = time.perf_counter()
+        try:
+            session.warmup(offline=True)
+        except session.RUnavailableError:
+            self.row('bootstrap', 'r', '', '', '', '', status='unavailable')
+            return [b for b in backends if b != 'r']
+        self.row('bootstrap', 'r', '', '', '', '', time.perf_counter() - start)
+        return backends
+
+    def internal(self, backends, n, d, k, criteria):
+        traj, part = dataset(n, d, k)
+        pairs = n * (n - 1) // 2
+
+        for backend in backends:
+            handle = None
+            if backend == 'r':
+                self.timed('conversion', 'r', '', n, d, k, lambda: Dataset(traj).assign())
+                handle = Dataset(traj)
+                handle.assign()
+            elif pairs <= self.args.max_pairs:
+                self.timed('distances', 'numpy', '', n, d, k, lambda: pairwiseDistances(traj))
+
+            for c in criteria:
+                if backend == 'numpy' and c not in NativeCriteria:
+                    self.row('internal', backend, c.name, n, d, k, status='unsupported')
+                elif c in Quadratic and pairs > self.args.max_pairs:
+                    self.row('internal', backend, c.name, n, d, k, status='skipped')
+                elif backend == 'numpy':
+                    self.timed('internal', backend, c.name, n, d, k,
+                               lambda: nativeCriteria(traj, part, [c]))
+                else:
+                    self.timed('internal', backend, c.name, n, d, k,
+                               lambda: session.call('rIntCriteria', handle, part, [c.name]))
+
+            if handle is not None:
+                handle.close()
+
+    def external(self, backends, n, k, criteria):
+        rng = np.random.default_rng(n + k)
+        part1 = rng.integers(1, k + 1, size=n)
+        part2 = rng.integers(1, k + 1, size=n)
+
+        for backend in backends:
+            for c in criteria:
+                if backend == 'numpy':
+                    function = lambda: contingencyCriteria(part1, part2, [c])
+                else:
+                    function = lambda: session.call('rExtCriteria', part1, part2, [c.name])
+                self.timed('external', backend, c.name, n, '', k, function)
+
+    def run(self):
+        args = self.args
+        backends = self.bootstrap(args.backends)
+        internal = [c for c in CriteriaInternal if c != CriteriaInternal.ALL]
+        external = [c for c in CriteriaExternal if c != CriteriaExternal.ALL]
+        if args.criteria:
+            internal = [c for c in internal if c.name in args.criteria]
+            external = [c for c in external if c.name in args.criteria]
+
+        for n in args.sizes:
+            for k in args.clusters:
+                if k >= n:
+                    continue
+                for d in args.dims:
+                    if n * d > args.max_values:
+                        continue
+                    self.internal(backends, n, d, k, internal)
+                self.external(backends, n, k, external)
+
+
+def _integers(value):
+    return tuple(int(float(v)) for v in value.split(','))
+
+
+def compare(args):
+    '''Print the measurements that got slower or larger by more than the threshold.'''
+    def load(path):
+        with open(path, newline='') as f:
+            rows = csv.DictReader(line for line in f if not line.startswith('#'))
+            return {tuple(r[c] for c in Columns[:6]): r for r in rows}
+
+    old, new = load(args.old), load(args.new)
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        for column in ('seconds', 'peak_bytes'):
+            before, after = old[key][column], new[key][column]
+            if not before or not after or float(before) <= 0:
+                continue
+            ratio = float(after) / float(before)
+            if ratio > args.threshold:
+                regressions += 1
+                print('{} {}: {} -> {} ({:.2f}x)'.format(' '.join(key), column, before, after, ratio))
+
+    print('{} regression(s), {} common measurements'.format(regressions, len(old.keys() & new.keys())))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmarks')
+    run.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    run.add_argument('--backends', type=lambda v: v.split(','), default=['r', 'numpy'])
+    run.add_argument('--criteria', type=lambda v: set(v.split(',')), default=None,
+                     help='comma separated criteria names, every criterion by default')
+    run.add_argument('--sizes', type=_integers, default=Sizes)
+    run.add_argument('--dims', type=_integers, default=Dimensions)
+    run.add_argument('--clusters', type=_integers, default=Clusters)
+    run.add_argument('--repeat', type=int, default=3, help='timings per measurement, the best is kept')
+    run.add_argument('--max-pairs', type=int, default=DefaultMaxPairs,
+                     help='skip the pairwise criteria above this number of pairs of points')
+    run.add_argument('--max-values', type=int, default=DefaultMaxValues,
+                     help='skip the data sets with more than this many values (N x d)')
+    run.add_argument('--quick', action='store_true', help='small grid for a smoke test')
+
+    diff = commands.add_parser('compare', help='compare two result files')
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--threshold', type=float, default=1.25)
+
+    args = parser.parse_args()
+    if args.command == 'compare':
+        return compare(args)
+
+    if args.quick:
+        args.sizes, args.dims, args.clusters = QuickSizes, QuickDimensions, QuickClusters
+
+    args.output.write('# python {} numpy {} {}\n'.format(
+        platform.python_version(), np.__version__, platform.machine()
+    ))
+    writer = csv.DictWriter(args.output, Columns)
+    writer.writeheader()
+    Runner(args, writer).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -23,12 +23,51 @@ SOFTWARE.
 """
 from .cluster import *
 from .criteria import *
+from .session import *
+from .dataset import *
+from .distance import DistanceCache, distanceCache
+from .sampling import Estimate
+from .incremental import IncrementalCriteria
+from .parallel import ParallelEvaluator
+from .results import ResultCache
+from .selection import selectK, sweepK
+from .stability import stability
+from .executor import RExecutor, ExecutorBusyError, aintCriteria, aextCriteria, abestCriterion
+from .instrument import MetricsCollector, addHook, removeHook, instrument, loggingHook
 
 __all__ = [
     "intCriteria",
+    "intCriteriaBatch",
     "extCriteria",
+    "extCriteriaBatch",
+    "extCriteriaMatrix",
     "bestCriterion",
+    "selectK",
+    "sweepK",
+    "stability",
+    "aintCriteria",
+    "aextCriteria",
+    "abestCriterion",
+    "RExecutor",
+    "ExecutorBusyError",
     "CriteriaInternal",
     "CriteriaExternal",
-    "getCriteriaNames"
+    "BestRule",
+    "getCriteriaNames",
+    "Dataset",
+    "DistanceCache",
+    "distanceCache",
+    "Estimate",
+    "IncrementalCriteria",
+    "ParallelEvaluator",
+    "ResultCache",
+    "MetricsCollector",
+    "addHook",
+    "removeHook",
+    "instrument",
+    "loggingHook",
+    "init",
+    "warmup",
+    "setOffline",
+    "RUnavailableError"
 ]
@@ -0,0 +1,71 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+from .criteria import BestRule
+
+
+def _select(values, rule):
+    '''Position of the best value of every row of `values`, -1 when the row
+    has no value that can be compared. Missing values are ignored, as with
+    `which.max` and `which.min` in R.
+    '''
+    if rule in (BestRule.MaxDiff, BestRule.MinDiff):
+        # V_i - V_{i-1} is the second difference, centered on the value i
+        values = np.diff(values, n=2, axis=1)
+        offset = 1
+    else:
+        offset = 0
+
+    if values.shape[1] == 0:
+        return np.full(len(values), -1)
+
+    largest = rule in (BestRule.Max, BestRule.MaxDiff)
+    missing = np.isnan(values)
+    filled = np.where(missing, -np.inf if largest else np.inf, values)
+    best = filled.argmax(axis=1) if largest else filled.argmin(axis=1)
+    return np.where(missing.all(axis=1), -1, best + offset)
+
+
+def bestIndices(values, rules):
+    '''Select the best value of several criteria at once. The rows sharing
+    the same rule are selected together with a single vectorized reduction.
+
+    :param values [matrix] : 2-D array with one row per criterion and one
+    column per candidate (e.g. per number of clusters).
+    :param rules [vector] : the `BestRule` of every row.
+
+    :return: integer array with the position of the best value of every row,
+    -1 when the row has no best value (too few or only missing values).
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim != 2 or len(values) != len(rules):
+        raise ValueError("expected one row of values per rule")
+
+    rules = np.asarray([r.value for r in rules], dtype=object)
+    best = np.full(len(values), -1)
+    for rule in BestRule:
+        rows = np.flatnonzero(rules == rule.value)
+        if len(rows):
+            best[rows] = _select(values[rows], rule)
+    return best
@@ -21,85 +21,279 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-import pandas as pd
-from rpy2 import robjects
-from rpy2.robjects.packages import importr, isinstalled
-from rpy2.robjects import numpy2ri
-from rpy2.robjects.vectors import StrVector
-from .criteria import CriteriaInternal, CriteriaExternal
+from .best import bestIndices
+from .criteria import CriteriaInternal, CriteriaExternal, matchCriterion
+from .distance import Precomputed, resolveMetric
+from .native import NativeCriteria, nativeCriteria, nativeCriteriaBatch
+from .planner import CoordinateCriteria
+from .contingency import ContingencyCriteria, contingencyCriteria, contingencyCriteriaBatch, contingencyCriteriaMatrix
+from .sampling import approximateCriteria
+from .scatter import factorize
+from .stream import StreamCriteria, isOutOfCore, mapArray, openLabels, openObservations, streamCriteria
+from .instrument import currentRecord, record
+from . import session
 import numpy as np
 
 
-PackageNameR = 'clusterCrit'
+# Engines that can compute the criteria. `r` sends the data to the clusterCrit
+# R package, `numpy` computes the supported criteria natively.
+Backends = ('r', 'numpy')
 
-# Initialize the R environment, including the Cluster Crit requirements
-utils = importr('utils')
-utils.chooseCRANmirror(ind=1)
 
-# install the packages inside of the R environment, if the packages are not
-# already installed
-if not isinstalled(PackageNameR):
-    utils.install_packages(StrVector((PackageNameR,)))
+def _resolveCriteria(crit, CriteriaClass):
+    '''Expand the list of requested criteria, skipping any value that
+    is not a member of `CriteriaClass`. `ALL` is expanded to every valid
+    member of the enumeration.
+    '''
+    if CriteriaClass.ALL in crit:
+        return [x for x in CriteriaClass if x != CriteriaClass.ALL]
+
+    return [c for c in crit if isinstance(c, CriteriaClass)]
 
-# define the R function that this script will use
-robjects.r(
+
+def _validateBackend(backend, supported, criteria, maxMemory=None):
+    '''Ensure that the backend exists and that it is able to compute
+    every one of the requested criteria.
     '''
-    rIntCriteria <- function(dataset, labels, criteria) {
-        ccData <- clusterCrit::intCriteria(dataset, unlist(labels), unlist(criteria))
-        return(ccData)
-    }
-    
-    rExtCriteria <- function(part1, part2, criteria) {
-        ccData <- clusterCrit::extCriteria(unlist(part1), unlist(part2), unlist(criteria))
-        return(ccData)
-    }
-    
-    rBestCriterion <- function(x, crit) {
-        ccData <- clusterCrit::bestCriterion(x, crit)
-        return(ccData)
-    }
+    if backend not in Backends:
+        raise ValueError("unknown backend '{}', expected one of {}".format(backend, Backends))
+
+    if maxMemory is not None and backend == 'r':
+        raise ValueError("maxMemory is only supported by the numpy backend")
+
+    if backend != 'r':
+        unsupported = [c.name for c in criteria if c not in supported]
+        if unsupported:
+            raise ValueError(
+                "backend '{}' does not support: {}".format(backend, ", ".join(unsupported))
+            )
+
+
+def _validateMetric(backend, metric, criteria, approximate=False):
+    '''Ensure that the criteria can be computed with the distances of `metric`.
+    Only the numpy backend supports other metrics than the Euclidean distance,
+    and the criteria computed from the coordinates of the observations are
+    rejected rather than silently computed with the Euclidean geometry.
+    '''
+    if metric == 'euclidean':
+        return
+
+    if backend != 'numpy':
+        raise ValueError("metric '{}' is only supported by the numpy backend".format(metric))
+
+    if metric == Precomputed:
+        if approximate:
+            raise ValueError("approximate mode needs the observations, not precomputed distances")
+    else:
+        resolveMetric(metric)
+
+    coordinates = [c.name for c in criteria if c in CoordinateCriteria]
+    if coordinates:
+        raise ValueError(
+            "criteria computed from the coordinates of the observations are not "
+            "supported with metric '{}': {}".format(metric, ", ".join(coordinates))
+        )
+
+
+def _metricScope(metric):
+    '''Part of the result cache key identifying the metric, nothing for the
+    Euclidean distance so that its keys are unchanged.
+    '''
+    if metric == 'euclidean':
+        return ()
+    if callable(metric):
+        raise ValueError("resultCache requires a named metric")
+    return (metric,)
+
+
+def _rLabels(part):
+    '''clusterCrit expects the labels 1-K, convert any labels (0-based, strings,
+    non-contiguous identifiers, ...) to these codes.
+    '''
+    return (factorize(part)[0] + 1).astype(np.int32)
+
+
+def _rIntCriteria(traj, part, indices):
+    '''Compute the internal criteria with the clusterCrit R package.
+    '''
+    applied_data = session.call('rIntCriteria', traj, _rLabels(part), indices)
+
+    # returned results are a matrix, so we need to flatten the data since
+    # there should be no entries with multiple values 
+    with currentRecord().phase('flatten'):
+        return [ad[0] if len(ad) == 1 else None for ad in applied_data]
+
+
+def _rExtCriteria(part1, part2, indices):
+    '''Compute the external criteria with the clusterCrit R package.
     '''
-)
+    applied_data = session.call('rExtCriteria', _rLabels(part1), _rLabels(part2), indices)
 
+    # returned results are a matrix, so we need to flatten the data since
+    # there should be no entries with multiple values 
+    with currentRecord().phase('flatten'):
+        return [ad[0] if len(ad) == 1 else None for ad in applied_data]
 
-def intCriteria(traj, part, crit):
+
+def intCriteria(traj, part, crit, backend='r', maxMemory=None, approximate=False,
+                sampleSize=2000, nRepeats=10, seed=None, confidence=0.95, resultCache=None,
+                metric='euclidean'):
     '''Expose the clusterCrit::intCriteria funcion (initially created in R)
     to all users. intCriteria calculates various internal clustering
     validation or quality criteria. The list of all the supported criteria
     can be obtained with the `getCriteriaNames`.
 
-    :param traj [matrix] : the matrix of observations (trajectories).
-    :param part [vector] : the partition vector.
+    :param traj [matrix] : the matrix of observations (trajectories) or a `Dataset`.
+    Observations that do not fit in memory can be given as the path of a `.npy` or
+    Parquet file, or as an `np.memmap`.
+    :param part [vector] : the partition vector, or the path of a `.npy` file.
     :param crit [vector] : a list containing CriteriaInternal indices to compute
+    :param backend [string] : `r` (default) to use the clusterCrit R package or
+    `numpy` to compute the criteria natively. The numpy backend supports the
+    criteria found in `cluster_crit.native.NativeCriteria`. With observations read
+    from disk, the criteria found in `cluster_crit.stream.StreamCriteria` are computed
+    from a few passes over chunks of rows, in O(K.p^2) memory, and are not cached.
+    :param maxMemory [int] : numpy backend only. When set, the pairwise distances
+    used by the distance based criteria are computed block by block with roughly
+    this many bytes of temporary memory, and the N x N distance matrix is never
+    held in memory. Use this for large data sets. With observations read from disk,
+    the bytes of temporary memory used for each chunk of rows.
+    :param approximate [bool] : estimate the criteria from `nRepeats` random
+    subsamples of `sampleSize` points instead of the full data set. Each subsample
+    keeps the cluster proportions of `part`. Use this for the O(N^2) criteria
+    (Silhouette, C_index, Gamma, Dunn, ...) on large data sets.
+    :param sampleSize [int] : approximate mode only, number of points per subsample.
+    :param nRepeats [int] : approximate mode only, number of subsamples.
+    :param seed [int] : approximate mode only, seed of the random subsamples.
+    :param confidence [float] : approximate mode only, level of the confidence intervals.
+    :param resultCache [ResultCache] : cache of previously computed values. Only the
+    criteria missing from the cache are computed. Approximate values are not cached.
+    :param metric [string] : numpy backend only, distance between the observations used
+    by the distance based criteria: `euclidean` (default), another name found in
+    `cluster_crit.distance.Metrics`, or a callable returning the matrix of distances
+    between the rows of two blocks of observations. With `precomputed`, traj is a
+    condensed distance vector or an N x N distance matrix (an `np.memmap` or the path
+    of a `.npy` file are read block by block when maxMemory is set). Criteria computed
+    from the coordinates of the observations (`cluster_crit.planner.CoordinateCriteria`)
+    are rejected with any other metric than `euclidean`.
 
-    :return: Map of the criteria to the value
+    :return: Map of the criteria to the value. In approximate mode the values are
+    `Estimate` tuples of (value, lower, upper) where value is the mean over the
+    subsamples and (lower, upper) is the confidence interval of that mean.
     '''
-    _criteria = []
-    if CriteriaInternal.ALL in crit:
-        _criteria = [x for x in CriteriaInternal if x != ClusterInternal.ALL]
-    else:
-        for c in crit:
-            if  isinstance(c, CriteriaInternal):
-                _criteria.append(c)
+    _criteria = _resolveCriteria(crit, CriteriaInternal)
 
     if not _criteria:
         return None
 
+    _validateBackend(backend, NativeCriteria, _criteria, maxMemory)
+    _validateMetric(backend, metric, _criteria, approximate)
+
     indices = [x.name for x in _criteria]
-    numpy2ri.activate()
-    if 'rIntCriteria' not in robjects.globalenv:
+
+    if (backend == 'numpy' and not approximate and (isOutOfCore(traj) or isOutOfCore(part))
+            and all(c in StreamCriteria for c in _criteria)):
+        # read the observations in chunks rather than loading them in memory
+        source, labels = openObservations(traj), openLabels(part)
+        with record('intCriteria', backend, source, labels, indices) as rec, rec.phase('compute'):
+            return dict(zip(indices, np.asarray(streamCriteria(source, labels, _criteria, maxMemory))))
+
+    traj, part = mapArray(traj), mapArray(part)
+
+    with record('intCriteria', backend, traj, part, indices, metric=metric):
+        if approximate:
+            if backend == 'numpy':
+                # the subsamples are never reused, keep them out of the distance cache
+                evaluate = lambda t, p: nativeCriteria(t, p, _criteria, maxMemory, cache=False, metric=metric)
+            else:
+                evaluate = lambda t, p: _rIntCriteria(t, p, indices)
+            estimates = approximateCriteria(
+                traj, part, _criteria, evaluate, sampleSize, nRepeats, seed, confidence
+            )
+            return dict(zip(indices, estimates))
+
+        def evaluate(names):
+            if backend == 'numpy':
+                with currentRecord().phase('compute'):
+                    return nativeCriteria(
+                        traj, part, [CriteriaInternal[n] for n in names], maxMemory, metric=metric
+                    )
+            return _rIntCriteria(traj, part, names)
+
+        if resultCache is not None:
+            scope = resultCache.scope('intCriteria', backend, traj, part, *_metricScope(metric))
+            return dict(zip(indices, np.asarray(resultCache.fetch(scope, indices, evaluate))))
+
+        return dict(zip(indices, np.asarray(evaluate(indices))))
+
+
+def _asPartitions(partitions):
+    '''Stack a list of partition vectors (or a 2-D array) into a 2-D
+    array with one partition per row.
+    '''
+    partitions = np.asarray(partitions)
+    if partitions.ndim == 1:
+        partitions = partitions.reshape(1, -1)
+    if partitions.ndim != 2:
+        raise ValueError("partitions must be a list of vectors or a 2-D array")
+    return partitions
+
+
+def intCriteriaBatch(traj, partitions, crit, backend='r', maxMemory=None, nJobs=1, metric='euclidean'):
+    '''Calculate internal clustering criteria for several partitions of the
+    same data set in a single call. The observations are converted (and sent
+    to R) only once rather than once per partition, which is much faster
+    than calling `intCriteria` in a loop, e.g. for every value of k.
+
+    :param traj [matrix] : the matrix of observations (trajectories) or a `Dataset`.
+    :param partitions [matrix] : list of partition vectors, or a 2-D array with
+    one partition per row.
+    :param crit [vector] : a list containing CriteriaInternal indices to compute
+    :param backend [string] : see `intCriteria`.
+    :param maxMemory [int] : see `intCriteria`.
+    :param nJobs [int] : number of worker processes, None for every core. When
+    greater than one the partitions are evaluated by a temporary `ParallelEvaluator`.
+    Keep a `ParallelEvaluator` open instead when evaluating several batches.
+    :param metric [string] : see `intCriteria`. The distances are computed once for
+    the whole batch.
+
+    :return: pandas.DataFrame with one row per criterion and one column per partition
+    '''
+    import pandas as pd
+
+    _criteria = _resolveCriteria(crit, CriteriaInternal)
+
+    if not _criteria:
         return None
 
-    applied_data = robjects.globalenv['rIntCriteria'](traj, part, indices)
-    numpy2ri.deactivate()
+    _validateBackend(backend, NativeCriteria, _criteria, maxMemory)
+    _validateMetric(backend, metric, _criteria)
 
-    # returned results are a matrix, so we need to flatten the data since
-    # there should be no entries with multiple values 
-    final_data = [ad[0] if len(ad) == 1 else None for ad in applied_data]
-    return dict(zip(indices, np.asarray(final_data)))
+    indices = [x.name for x in _criteria]
+    partitions = _asPartitions(partitions)
+    traj = mapArray(traj)
+
+    with record('intCriteriaBatch', backend, traj, partitions, indices, len(partitions), metric) as rec:
+        if nJobs != 1:
+            from .parallel import ParallelEvaluator
+            with ParallelEvaluator(nJobs, backend) as evaluator:
+                return evaluator.intCriteriaBatch(traj, partitions, _criteria, maxMemory, metric)
 
+        if backend == 'numpy':
+            with rec.phase('compute'):
+                values = nativeCriteriaBatch(traj, partitions, _criteria, maxMemory, metric=metric)
+        else:
+            # R expects one partition per column, the transpose of the row-major
+            # partitions is already in the column-major layout of R
+            codes = np.stack([_rLabels(p) for p in partitions])
+            applied_data = session.call('rIntCriteriaBatch', traj, codes.T, indices)
+            with rec.phase('flatten'):
+                values = np.asarray(applied_data, dtype=np.float64).reshape(len(indices), -1)
 
-def extCriteria(part1, part2, crit):
+        return pd.DataFrame(values, index=indices)
+
+
+def extCriteria(part1, part2, crit, backend='r', resultCache=None):
     '''Expose the clusterCrit::extCriteria funcion (initially created in R)
     to all users. intCriteria calculates external clustering indices in order
     to compare two partitions. The list of all the supported criteria
@@ -108,59 +302,201 @@ def extCriteria(part1, part2, crit):
     :param part1 [vector] : the first partition vector.
     :param part2 [vector] : the second partition vector.
     :param crit [vector]  : a list containing CriteriaExternal indices to compute
+    :param backend [string] : `r` (default) to use the clusterCrit R package or
+    `numpy` to compute the criteria from the contingency table of the partitions.
+    :param resultCache [ResultCache] : cache of previously computed values. Only the
+    criteria missing from the cache are computed.
 
     :return: Map of the criteria to the value
     '''
-    _criteria = []
-    if CriteriaExternal.ALL in crit:
-        _criteria = [x for x in CriteriaExternal if x != CriteriaExternal.ALL]
-    else:
-        for c in crit:
-            if  isinstance(c, CriteriaExternal):
-                _criteria.append(c)
+    _criteria = _resolveCriteria(crit, CriteriaExternal)
 
     if not _criteria:
         return None
 
+    _validateBackend(backend, ContingencyCriteria, _criteria)
+
     indices = [x.name for x in _criteria]
-    numpy2ri.activate()
-    if 'rExtCriteria' not in robjects.globalenv:
+
+    def evaluate(names):
+        if backend == 'numpy':
+            with currentRecord().phase('compute'):
+                return contingencyCriteria(part1, part2, [CriteriaExternal[n] for n in names])
+        return _rExtCriteria(part1, part2, names)
+
+    with record('extCriteria', backend, part=part1, criteria=indices):
+        if resultCache is not None:
+            scope = resultCache.scope('extCriteria', backend, part1, part2)
+            return dict(zip(indices, np.asarray(resultCache.fetch(scope, indices, evaluate))))
+
+        return dict(zip(indices, np.asarray(evaluate(indices))))
+
+
+def extCriteriaBatch(reference, candidates, crit, backend='r'):
+    '''Calculate external clustering criteria comparing one reference partition
+    with many candidate partitions in a single call. The reference is factorized
+    (and sent to R) only once rather than once per candidate, which is much
+    faster than calling `extCriteria` in a loop, e.g. to score an ensemble of
+    clusterings against a reference.
+
+    :param reference [vector] : the reference partition vector.
+    :param candidates [matrix] : list of candidate partition vectors, or a 2-D array
+    with one candidate per row.
+    :param crit [vector] : a list containing CriteriaExternal indices to compute
+    :param backend [string] : see `extCriteria`. The numpy backend counts the contingency
+    tables of many candidates at once with vectorized operations.
+
+    :return: pandas.DataFrame with one row per criterion and one column per candidate
+    '''
+    import pandas as pd
+
+    _criteria = _resolveCriteria(crit, CriteriaExternal)
+
+    if not _criteria:
         return None
 
-    applied_data = robjects.globalenv['rExtCriteria'](part1, part2, indices)
-    numpy2ri.deactivate()
+    _validateBackend(backend, ContingencyCriteria, _criteria)
 
-    # returned results are a matrix, so we need to flatten the data since
-    # there should be no entries with multiple values 
-    final_data = [ad[0] if len(ad) == 1 else None for ad in applied_data]
-    return dict(zip(indices, np.asarray(final_data)))
+    indices = [x.name for x in _criteria]
+    candidates = _asPartitions(candidates)
+    if candidates.shape[1] != len(reference):
+        raise ValueError(
+            "partitions have different lengths {} and {}".format(len(reference), candidates.shape[1])
+        )
+
+    with record('extCriteriaBatch', backend, part=candidates, criteria=indices,
+                partitions=len(candidates)) as rec:
+        if backend == 'numpy':
+            with rec.phase('compute'):
+                values = contingencyCriteriaBatch(reference, candidates, _criteria)
+        else:
+            codes = np.stack([_rLabels(p) for p in candidates])
+            applied_data = session.call('rExtCriteriaBatch', _rLabels(reference), codes.T, indices)
+            with rec.phase('flatten'):
+                values = np.asarray(applied_data, dtype=np.float64).reshape(len(indices), -1)
+
+        return pd.DataFrame(values, index=indices)
+
+
+def extCriteriaMatrix(partitions, crit, nJobs=1):
+    '''Calculate external clustering criteria between every pair of partitions
+    of an ensemble, e.g. to measure the agreement of many clusterings. Every
+    partition is factorized once and the contingency table of each pair is
+    counted once: the criteria are symmetric except McNemar, Precision and
+    Recall, whose lower triangle is derived from the transposed table.
 
+    :param partitions [matrix] : list of partition vectors, or a 2-D array with
+    one partition per row.
+    :param crit [vector] : a list containing CriteriaExternal indices to compute
+    :param nJobs [int] : number of worker processes, None for every core. When
+    greater than one the rows of the matrices are spread over a temporary
+    `ParallelEvaluator`.
 
-def bestCriterion(x, crit):
+    :return: Map of the criteria to a pandas.DataFrame of M x M values, where the
+    value at row i and column j compares partition i (part1) with partition j (part2)
+    '''
+    import pandas as pd
+
+    _criteria = _resolveCriteria(crit, CriteriaExternal)
+
+    if not _criteria:
+        return None
+
+    indices = [x.name for x in _criteria]
+    partitions = _asPartitions(partitions)
+
+    with record('extCriteriaMatrix', 'numpy', part=partitions, criteria=indices,
+                partitions=len(partitions)) as rec:
+        if nJobs != 1:
+            from .parallel import ParallelEvaluator
+            with ParallelEvaluator(nJobs, 'numpy') as evaluator:
+                return evaluator.extCriteriaMatrix(partitions, _criteria)
+
+        with rec.phase('compute'):
+            values = contingencyCriteriaMatrix(partitions, _criteria)
+
+        return {name: pd.DataFrame(v) for name, v in zip(indices, values)}
+
+
+def _bestTable(x, crit):
+    '''Split the input of `bestCriterion` into a 2-D array of values, the
+    matched criteria (one per row) and whether a single vector was given.
+    '''
+    import pandas as pd
+
+    if isinstance(x, pd.DataFrame):
+        values = x.to_numpy(dtype=np.float64)
+        crit = list(x.index) if crit is None else crit
+        single = False
+    else:
+        values = np.asarray(x, dtype=np.float64)
+        single = values.ndim <= 1
+        values = values.reshape(1, -1) if single else values
+        if single:
+            crit = [crit]
+
+    if values.ndim != 2:
+        raise ValueError("x must be a vector, a 2-D array or a pandas.DataFrame")
+
+    if crit is None or isinstance(crit, (str, CriteriaInternal, CriteriaExternal)):
+        raise ValueError("crit must name the criterion of every row of x")
+
+    criteria = [matchCriterion(c) for c in crit]
+    if len(criteria) != len(values):
+        raise ValueError(
+            "x has {} rows but {} criteria were given".format(len(values), len(criteria))
+        )
+
+    unranked = [c.name for c in criteria if c.rule is None]
+    if unranked:
+        raise ValueError("no best value is defined for: {}".format(", ".join(unranked)))
+
+    return values, criteria, single
+
+
+def bestCriterion(x, crit=None, backend='numpy'):
     '''Expose the clusterCrit::bestCriterionn function (initially created in R)
     to all users. `bestCriterion` returns the best index value according to a 
     specified criterion. Given a vector of several clustering quality index values
     computed with a given criterion, the function `bestCriterion` returns the index
     of the "best" one in the sense of the specified criterio
+
+    The rules of clusterCrit (see `CriteriaInternal.rule` and `BestRule`) are applied
+    natively, and a whole table of criteria is handled in a single call, e.g. the
+    output of `intCriteriaBatch` with one column per number of clusters.
     
-    :param x [matrix]    : a numeric vector of quality index values.
+    :param x [matrix]    : a numeric vector of quality index values, or a 2-D array
+    or pandas.DataFrame with one row per criterion and one column per candidate.
     :param crit [string] : a string specifying the name of the criterion which 
-    was used to compute the quality indices
+    was used to compute the quality indices. When `x` is 2-D, a list with the criterion
+    of every row. Defaults to the index of a DataFrame. Names are case insensitive and
+    can be abbreviated.
+    :param backend [string] : `numpy` (default) or `r` to call clusterCrit, which
+    only accepts a single vector.
     
     :return: The index in vector x of the best value according to the criterion
-    specified by the crit argument.
+    specified by the crit argument, None when there is no best value. When `x` is 2-D,
+    a map of the criteria names to their best index.
     '''
-    numpy2ri.activate()
-    if 'rBestCriterion' not in robjects.globalenv:
-        return None
+    if backend not in Backends:
+        raise ValueError("unknown backend '{}', expected one of {}".format(backend, Backends))
 
-    index = robjects.globalenv['rBestCriterion'](x, crit)
-    numpy2ri.deactivate()
+    values, criteria, single = _bestTable(x, crit)
+    names = [c.name for c in criteria]
 
-    index = index[0]
+    with record('bestCriterion', backend, criteria=names, partitions=values.shape[1]) as rec:
+        if backend == 'r':
+            if not single:
+                raise ValueError("the r backend only accepts a single vector")
+            try:
+                # convert to python indexing. The returned values are 1-N but we require 0-N-1
+                best = [int(session.call('rBestCriterion', values[0], names[0])[0]) - 1]
+            except (IndexError, TypeError, ValueError):
+                best = [-1]
+        else:
+            with rec.phase('compute'):
+                best = bestIndices(values, [c.rule for c in criteria])
 
-    try:
-        # convert to python indexing. The returned values are 1-N but we require 0-N-1
-        return int(index) - 1
-    except (TypeError, ValueError):
-        return None
+    # convert to python integers, the negative indices mark a missing best value
+    best = [int(b) if b >= 0 else None for b in best]
+    return best[0] if single else dict(zip(names, best))
@@ -0,0 +1,141 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import math
+import numpy as np
+from .criteria import CriteriaInternal
+from .distance import condensedOffsets, pairIndices
+
+
+# Bytes of memory used for each sorted distance: the collected blocks, the
+# concatenated vector and its sorted copy.
+SortBytes = 24
+
+
+class ConcordanceCounts:
+    '''Comparison of every within-cluster distance with every between-cluster
+    distance. A pair (within, between) is concordant when the within-cluster
+    distance is strictly smaller, discordant when it is strictly larger and
+    tied otherwise.
+
+    Rather than comparing the NW x NB pairs, the smaller of the two sets of
+    distances is sorted once and every distance of the other set is located
+    in it with a binary search, for a cost of O(M log M) with M = N(N-1)/2.
+
+    :param splus [int] : number of concordant pairs (s+).
+    :param sminus [int] : number of discordant pairs (s-).
+    :param nw [int] : number of within-cluster distances.
+    :param nb [int] : number of between-cluster distances.
+    '''
+
+    def __init__(self, splus, sminus, nw, nb):
+        self.splus = splus
+        self.sminus = sminus
+        self.nw = nw
+        self.nb = nb
+
+    @property
+    def nt(self):
+        '''Number of distances'''
+        return self.nw + self.nb
+
+    @property
+    def ties(self):
+        '''Number of (within, between) pairs with equal distances'''
+        return self.nw * self.nb - self.splus - self.sminus
+
+    @classmethod
+    def fromBlocks(cls, blocks, codes, maxMemory=None):
+        '''Count the concordant and discordant pairs with two passes over the
+        distances: the first collects and sorts the smaller of the within and
+        between sets, the second locates every other distance in it.
+
+        :param blocks [callable] : returns a new iterable of (first row, last row + 1,
+        distances) on every call, as returned by `distanceBlocks`.
+        :param codes [vector] : cluster code (0-K-1) of every point.
+        :param maxMemory [int] : bytes of memory available to sort the distances.
+        No limit when not provided.
+
+        :raises ValueError: the sorted set of distances does not fit in `maxMemory`.
+        '''
+        codes = np.asarray(codes)
+        n = len(codes)
+        counts = np.bincount(codes)
+        nw = int((counts * (counts - 1) // 2).sum())
+        nb = n * (n - 1) // 2 - nw
+
+        # sort the within-cluster distances unless there are fewer between-cluster ones
+        sortWithin = nw <= nb
+        size = nw if sortWithin else nb
+
+        if maxMemory is not None and size * SortBytes > maxMemory:
+            raise ValueError(
+                "Gamma, G_plus and Tau need to sort {} distances, which does not fit "
+                "in the memory budget".format(size)
+            )
+
+        offsets = condensedOffsets(n)
+
+        def _split(start, stop, d):
+            i, j = pairIndices(n, start, stop, offsets)
+            same = codes[i] == codes[j]
+            return (d[same], d[~same]) if sortWithin else (d[~same], d[same])
+
+        ordered = np.sort(np.concatenate(
+            [_split(*block)[0] for block in blocks()] or [np.empty(0)]
+        ))
+
+        below, above = 0, 0
+        for block in blocks():
+            # sorting the keys turns the binary searches into a merge-like,
+            # cache friendly walk through the sorted distances
+            other = np.sort(_split(*block)[1])
+            below += int(np.searchsorted(ordered, other, 'left').sum())
+            above += int((size - np.searchsorted(ordered, other, 'right')).sum())
+
+        # `below` counts the sorted values smaller than the other distances
+        if sortWithin:
+            return cls(below, above, nw, nb)
+        return cls(above, below, nw, nb)
+
+
+def _gamma(ctx):
+    c = ctx.concordance
+    return (c.splus - c.sminus) / (c.splus + c.sminus)
+
+
+def _gPlus(ctx):
+    c = ctx.concordance
+    return 2.0 * c.sminus / (c.nt * (c.nt - 1))
+
+
+def _tau(ctx):
+    c = ctx.concordance
+    return (c.splus - c.sminus) / math.sqrt(c.nb * c.nw * (c.nt * (c.nt - 1) / 2.0))
+
+
+ConcordanceCriteria = {
+    CriteriaInternal.Gamma: _gamma,
+    CriteriaInternal.G_plus: _gPlus,
+    CriteriaInternal.Tau: _tau,
+}
@@ -0,0 +1,445 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import math
+import numpy as np
+from .criteria import CriteriaExternal
+from .scatter import BlockEntries, factorize
+
+
+class PairCounts:
+    '''Number of pairs of points grouped together (y) or apart (n) by
+    each of the two partitions. `yn` counts the pairs that are in the
+    same cluster in the first partition but not in the second. The counts
+    are stored as python integers so that the products used by some of the
+    criteria cannot overflow.
+
+    :param table [matrix] : contingency table of the two partitions.
+    '''
+
+    def __init__(self, table):
+        table = np.asarray(table, dtype=np.int64)
+        self._setTotals(
+            int(table.sum()),
+            int(_pairs(table).sum()),
+            int(_pairs(table.sum(axis=1)).sum()),
+            int(_pairs(table.sum(axis=0)).sum()),
+        )
+
+    @classmethod
+    def fromTotals(cls, n, together, together1, together2):
+        '''Build the counts from the number of pairs grouped together by the
+        partitions, without the contingency table.
+
+        :param n [int] : number of points.
+        :param together [int] : pairs in the same cluster in both partitions.
+        :param together1 [int] : pairs in the same cluster in the first partition.
+        :param together2 [int] : pairs in the same cluster in the second partition.
+
+        :return: PairCounts
+        '''
+        counts = cls.__new__(cls)
+        counts._setTotals(int(n), int(together), int(together1), int(together2))
+        return counts
+
+    def _setTotals(self, n, together, together1, together2):
+        self.n = n
+        self.nt = self.n * (self.n - 1) // 2
+        self.yy = together
+        self.yn = together1 - together
+        self.ny = together2 - together
+        self.nn = self.nt - self.yy - self.yn - self.ny
+
+
+def _pairs(counts):
+    '''Number of distinct pairs that can be formed from each count.'''
+    return counts * (counts - 1) // 2
+
+
+def contingencyTable(part1, part2):
+    '''Build the contingency table of two partitions in a single pass
+    over the label vectors.
+
+    :param part1 [vector] : the first partition vector.
+    :param part2 [vector] : the second partition vector.
+
+    :return: K1 x K2 matrix where entry (i, j) is the number of points in
+    cluster i of `part1` and cluster j of `part2`.
+    '''
+    codes1, labels1 = factorize(part1)
+    codes2, labels2 = factorize(part2)
+
+    if len(codes1) != len(codes2):
+        raise ValueError(
+            "partitions have different lengths {} and {}".format(len(codes1), len(codes2))
+        )
+
+    k1, k2 = len(labels1), len(labels2)
+    return np.bincount(codes1 * k2 + codes2, minlength=k1 * k2).reshape(k1, k2)
+
+
+def _czekanowskiDice(c):
+    return 2 * c.yy / (2 * c.yy + c.yn + c.ny)
+
+
+def _folkesMallows(c):
+    return c.yy / math.sqrt((c.yy + c.yn) * (c.yy + c.ny))
+
+
+def _hubert(c):
+    num = c.nt * c.yy - (c.yy + c.yn) * (c.yy + c.ny)
+    return num / math.sqrt((c.yy + c.yn) * (c.yy + c.ny) * (c.nn + c.yn) * (c.nn + c.ny))
+
+
+def _jaccard(c):
+    return c.yy / (c.yy + c.yn + c.ny)
+
+
+def _kulczynski(c):
+    return 0.5 * (c.yy / (c.yy + c.ny) + c.yy / (c.yy + c.yn))
+
+
+def _mcNemar(c):
+    return (c.yn - c.ny) / math.sqrt(c.yn + c.ny)
+
+
+def _phi(c):
+    num = c.yy * c.nn - c.yn * c.ny
+    return num / ((c.yy + c.yn) * (c.yy + c.ny) * (c.yn + c.nn) * (c.ny + c.nn))
+
+
+def _precision(c):
+    return c.yy / (c.yy + c.ny)
+
+
+def _rand(c):
+    return (c.yy + c.nn) / c.nt
+
+
+def _recall(c):
+    return c.yy / (c.yy + c.yn)
+
+
+def _rogersTanimoto(c):
+    return (c.yy + c.nn) / (c.yy + c.nn + 2 * (c.yn + c.ny))
+
+
+def _russelRao(c):
+    return c.yy / c.nt
+
+
+def _sokalSneath1(c):
+    return c.yy / (c.yy + 2 * (c.yn + c.ny))
+
+
+def _sokalSneath2(c):
+    return (c.yy + c.nn) / (c.yy + c.nn + 0.5 * (c.yn + c.ny))
+
+
+ContingencyCriteria = {
+    CriteriaExternal.Czekanowski_Dice: _czekanowskiDice,
+    CriteriaExternal.Folkes_Mallows: _folkesMallows,
+    CriteriaExternal.Hubert: _hubert,
+    CriteriaExternal.Jaccard: _jaccard,
+    CriteriaExternal.Kulczynski: _kulczynski,
+    CriteriaExternal.McNemar: _mcNemar,
+    CriteriaExternal.Phi: _phi,
+    CriteriaExternal.Precision: _precision,
+    CriteriaExternal.Rand: _rand,
+    CriteriaExternal.Recall: _recall,
+    CriteriaExternal.Rogers_Tanimoto: _rogersTanimoto,
+    CriteriaExternal.Russel_Rao: _russelRao,
+    CriteriaExternal.Sokal_Sneath1: _sokalSneath1,
+    CriteriaExternal.Sokal_Sneath2: _sokalSneath2,
+}
+
+
+def pairCriteria(counts, criteria):
+    '''Compute the external criteria from the pair counts of two partitions.
+
+    :param counts [PairCounts] : the pair counts of the two partitions.
+    :param criteria [vector] : list of CriteriaExternal members
+
+    :return: list of values in the same order as `criteria`
+    '''
+    values = []
+    for c in criteria:
+        try:
+            values.append(float(ContingencyCriteria[c](counts)))
+        except ZeroDivisionError:
+            # degenerate partitions, e.g. every point in a single cluster
+            values.append(np.nan)
+    return values
+
+
+def contingencyCriteria(part1, part2, criteria):
+    '''Compute external criteria from the contingency table of the two
+    partitions. The table is built once and every requested criterion is
+    derived from the four pair counts (yy, yn, ny, nn).
+
+    :param part1 [vector] : the first partition vector.
+    :param part2 [vector] : the second partition vector.
+    :param criteria [vector] : list of CriteriaExternal members
+
+    :return: list of values in the same order as `criteria`
+    '''
+    return pairCriteria(PairCounts(contingencyTable(part1, part2)), criteria)
+
+
+def _clusterCodes(part):
+    '''Cluster codes of a partition for counting pairs. Integer labels spanning
+    a small range are only shifted: empty codes hold no pair, so the codes do
+    not need to be contiguous.
+
+    :return: tuple of (codes, number of codes)
+    '''
+    part = np.asarray(part).ravel()
+    if part.dtype.kind in 'iu' and len(part):
+        low = part.min()
+        span = int(part.max()) - int(low) + 1
+        if span <= len(part):
+            base = part.astype(np.int64) if part.dtype.kind == 'i' else part
+            return (base - low).astype(np.intp), span
+
+    codes, labels = factorize(part)
+    return codes, len(labels)
+
+
+def _candidateTotals(codes1, k1, candidates):
+    '''Pairs grouped together by each candidate and by both the reference and
+    the candidate. The cluster sizes of the candidate are the column sums of
+    the contingency table, so the points are only visited to count the table.
+    Large tables (many clusters in both partitions) are counted by sorting
+    the cell of every point instead.
+
+    :return: generator of (together, together2) for every candidate
+    '''
+    n = len(codes1)
+    for candidate in candidates:
+        codes2, k2 = _clusterCodes(candidate)
+        if len(codes2) != n:
+            raise ValueError(
+                "partitions have different lengths {} and {}".format(n, len(codes2))
+            )
+
+        cells = codes1 * k2 + codes2
+        if k1 * k2 <= max(BlockEntries, n):
+            table = np.bincount(cells, minlength=k1 * k2).reshape(k1, k2)
+            yield int(_pairs(table).sum()), int(_pairs(table.sum(axis=0)).sum())
+        else:
+            counts = np.unique(cells, return_counts=True)[1]
+            sizes = np.bincount(codes2, minlength=k2)
+            yield int(_pairs(counts).sum()), int(_pairs(sizes).sum())
+
+
+def contingencyCriteriaBatch(reference, candidates, criteria):
+    '''Compute external criteria comparing one reference partition with many
+    candidate partitions. The reference is factorized and its pairs counted
+    once, and only the contingency table of each candidate is counted.
+
+    :param reference [vector] : the reference partition vector.
+    :param candidates [matrix] : 2-D array with one candidate partition per row.
+    :param criteria [vector] : list of CriteriaExternal members
+
+    :return: array with one row per criterion and one column per candidate
+    '''
+    codes1, labels1 = factorize(reference)
+    k1 = len(labels1)
+    together1 = int(_pairs(np.bincount(codes1, minlength=k1)).sum())
+
+    values = np.empty((len(criteria), len(candidates)))
+    for j, (together, together2) in enumerate(_candidateTotals(codes1, k1, candidates)):
+        counts = PairCounts.fromTotals(len(codes1), together, together1, together2)
+        values[:, j] = pairCriteria(counts, criteria)
+    return values
+
+
+def partitionCodes(partitions):
+    '''Factorize every partition of an ensemble once, for `agreementRows`.
+
+    :param partitions [matrix] : 2-D array with one partition per row.
+
+    :return: tuple of (codes, sizes, together): M x N int32 matrix of cluster
+    codes, number of codes of each partition and number of pairs grouped
+    together by each partition.
+    '''
+    partitions = np.asarray(partitions)
+    codes = np.empty(partitions.shape, dtype=np.int32)
+    sizes = np.empty(len(partitions), dtype=np.int64)
+    together = []
+    for i, part in enumerate(partitions):
+        codes[i], sizes[i] = _clusterCodes(part)
+        together.append(int(_pairs(np.bincount(codes[i], minlength=sizes[i])).sum()))
+    return codes, sizes, together
+
+
+# Criteria that change when the two partitions are swapped: the agreement
+# matrices of these criteria are not symmetric.
+AsymmetricCriteria = (CriteriaExternal.McNemar, CriteriaExternal.Precision, CriteriaExternal.Recall)
+
+
+def agreementRows(codes, sizes, together, start, stop, criteria):
+    '''Compare the partitions start to stop - 1 with every following partition
+    of the ensemble, i.e. the rows start to stop - 1 of the upper triangle of
+    the agreement matrix. The contingency table of each pair is counted once:
+    the criteria of the swapped pair (j, i) only differ by the swapped counts.
+
+    :param codes [matrix] : cluster codes, see `partitionCodes`.
+    :param sizes [vector] : number of codes of each partition.
+    :param together [vector] : pairs grouped together by each partition.
+    :param start [int] : first row.
+    :param stop [int] : last row + 1.
+    :param criteria [vector] : list of CriteriaExternal members
+
+    :return: tuple of (upper, lower) arrays with one row per criterion and one
+    column per pair (i, j), i < j, in condensed order. Upper compares i with j
+    and lower j with i.
+    '''
+    m, n = codes.shape
+    asymmetric = [c for c in criteria if c in AsymmetricCriteria]
+    swapped = [criteria.index(c) for c in asymmetric]
+
+    upper, lower = [], []
+    for i in range(start, stop):
+        first = codes[i].astype(np.intp)
+        for j in range(i + 1, m):
+            cells = first * sizes[j] + codes[j]
+            if sizes[i] * sizes[j] <= max(BlockEntries, n):
+                yy = _pairs(np.bincount(cells, minlength=sizes[i] * sizes[j])).sum()
+            else:
+                yy = _pairs(np.unique(cells, return_counts=True)[1]).sum()
+
+            values = pairCriteria(PairCounts.fromTotals(n, yy, together[i], together[j]), criteria)
+            upper.append(values)
+            if asymmetric:
+                values = list(values)
+                counts = PairCounts.fromTotals(n, yy, together[j], together[i])
+                for position, value in zip(swapped, pairCriteria(counts, asymmetric)):
+                    values[position] = value
+            lower.append(values)
+
+    def _table(rows):
+        return np.asarray(rows, dtype=np.float64).reshape(-1, len(criteria)).T
+
+    return _table(upper), _table(lower)
+
+
+def agreementMatrices(upper, lower, codes, together, criteria):
+    '''Assemble the agreement matrices from their triangles. The diagonal
+    compares every partition with itself.
+
+    :param upper [matrix] : upper triangle returned by `agreementRows` for every row.
+    :param lower [matrix] : lower triangle returned by `agreementRows` for every row.
+    :param codes [matrix] : cluster codes, see `partitionCodes`.
+    :param together [vector] : pairs grouped together by each partition.
+    :param criteria [vector] : list of CriteriaExternal members
+
+    :return: array of shape (criteria, M, M)
+    '''
+    m, n = codes.shape
+    values = np.empty((len(criteria), m, m))
+    indices = np.triu_indices(m, 1)
+    for c in range(len(criteria)):
+        values[c][indices] = upper[c]
+        values[c].T[indices] = lower[c]
+
+    for i in range(m):
+        counts = PairCounts.fromTotals(n, together[i], together[i], together[i])
+        values[:, i, i] = pairCriteria(counts, criteria)
+    return values
+
+
+def contingencyCriteriaMatrix(partitions, criteria):
+    '''Compute external criteria between every pair of partitions of an
+    ensemble. Every partition is factorized, and its pairs counted, once and
+    the contingency table of each pair of partitions is counted once.
+
+    :param partitions [matrix] : 2-D array with one partition per row.
+    :param criteria [vector] : list of CriteriaExternal members
+
+    :return: array of shape (criteria, M, M), entry (c, i, j) compares the partition
+    i with the partition j. The matrices are symmetric except for `AsymmetricCriteria`.
+    '''
+    codes, sizes, together = partitionCodes(partitions)
+    upper, lower = agreementRows(codes, sizes, together, 0, len(codes), criteria)
+    return agreementMatrices(upper, lower, codes, together, criteria)
+
+
+def overlapCriteria(codes, criteria):
+    '''Compare every pair of partitions of different subsets of the points on
+    the points that both subsets contain. The points missing from a subset get
+    an extra cluster code, so that the contingency table of a pair restricted to
+    its overlap is the table of the codes without the extra row and column.
+    Each partition is compared with all the following ones at once: the cell of
+    every point is offset by the position of its pair and the tables are counted
+    with one bincount.
+
+    :param codes [matrix] : M x N matrix of cluster codes (0-K-1) of each partition,
+    -1 for the points missing from its subset.
+    :param criteria [vector] : list of CriteriaExternal members
+
+    :return: array with one row per criterion and one column per pair (i, j),
+    i < j, in condensed order
+    '''
+    codes = np.asarray(codes)
+    m, n = codes.shape
+    k = int(codes.max()) + 1 if codes.size else 1
+    width = k + 1
+    cells = width * width
+    extended = np.where(codes < 0, k, codes).astype(np.intp)
+    scaled = extended * width
+
+    totals = []
+    if cells <= max(BlockEntries, n):
+        batch = max(1, BlockEntries // max(n, cells))
+        for i in range(m - 1):
+            for start in range(i + 1, m, batch):
+                stop = min(start + batch, m)
+                flat = scaled[i] + extended[start:stop]
+                flat += (np.arange(stop - start) * cells)[:, None]
+                tables = np.bincount(flat.ravel(), minlength=(stop - start) * cells)
+                tables = tables.reshape(-1, width, width)[:, :k, :k]
+                totals.extend(zip(
+                    tables.sum(axis=(1, 2)),
+                    _pairs(tables).sum(axis=(1, 2)),
+                    _pairs(tables.sum(axis=2)).sum(axis=1),
+                    _pairs(tables.sum(axis=1)).sum(axis=1),
+                ))
+    else:
+        # too many clusters for dense tables, count the cells of each pair by sorting
+        for i in range(m - 1):
+            for j in range(i + 1, m):
+                keep = (codes[i] >= 0) & (codes[j] >= 0)
+                codes1, codes2 = extended[i, keep], extended[j, keep]
+                totals.append((
+                    len(codes1),
+                    _pairs(np.unique(codes1 * k + codes2, return_counts=True)[1]).sum(),
+                    _pairs(np.bincount(codes1)).sum(),
+                    _pairs(np.bincount(codes2)).sum(),
+                ))
+
+    values = np.empty((len(criteria), len(totals)))
+    for p, (size, together, together1, together2) in enumerate(totals):
+        counts = PairCounts.fromTotals(size, together, together1, together2)
+        values[:, p] = pairCriteria(counts, criteria)
+    return values
@@ -24,6 +24,20 @@ SOFTWARE.
 from enum import Enum
 
 
+class BestRule(Enum):
+    '''How the best of several values of a criterion is selected. `Max` and
+    `Min` select the largest and smallest value. `MaxDiff` and `MinDiff`
+    select the elbow of the curve: with V_i = Q_{i+1} - Q_i the difference
+    between consecutive values, the best index i is the one where the
+    second difference V_i - V_{i-1} is the largest (smallest). The first
+    and last values can never be selected by the difference rules.
+    '''
+    Max = 'max'
+    Min = 'min'
+    MaxDiff = 'max diff'
+    MinDiff = 'min diff'
+
+
 class CriteriaInternal(Enum):
     '''All possible values that the Cran (R) package Cluster Crit can receive
     for the intCriteria. The `ALL` type is handled slightly differently as
@@ -74,6 +88,11 @@ class CriteriaInternal(Enum):
     Wemmert_Gancarski = 41
     Xie_Beni = 42
 
+    @property
+    def rule(self):
+        '''The `BestRule` used to select the best value of the criterion'''
+        return BestRules[self]
+
 
 class CriteriaExternal(Enum):
     '''All possible values that the Cran (R) package Cluster Crit can receive
@@ -97,6 +116,80 @@ class CriteriaExternal(Enum):
     Sokal_Sneath1 = 13
     Sokal_Sneath2 = 14
 
+    @property
+    def rule(self):
+        '''The `BestRule` used to select the best value of the criterion, None
+        when the criterion has no preferred direction.
+        '''
+        return BestRules[self]
+
+
+# Rules used by clusterCrit::bestCriterion to select the best value of each criterion
+BestRules = {c: BestRule.Max for c in CriteriaInternal if c.name.startswith("GDI")}
+BestRules.update({
+    CriteriaInternal.Ball_Hall: BestRule.MaxDiff,
+    CriteriaInternal.Banfeld_Raftery: BestRule.Min,
+    CriteriaInternal.C_index: BestRule.Min,
+    CriteriaInternal.Calinski_Harabasz: BestRule.Max,
+    CriteriaInternal.Davies_Bouldin: BestRule.Min,
+    CriteriaInternal.Det_Ratio: BestRule.MinDiff,
+    CriteriaInternal.Dunn: BestRule.Max,
+    CriteriaInternal.Gamma: BestRule.Max,
+    CriteriaInternal.G_plus: BestRule.Min,
+    CriteriaInternal.Ksq_DetW: BestRule.MaxDiff,
+    CriteriaInternal.Log_Det_Ratio: BestRule.MinDiff,
+    CriteriaInternal.Log_SS_Ratio: BestRule.MinDiff,
+    CriteriaInternal.McClain_Rao: BestRule.Min,
+    CriteriaInternal.PBM: BestRule.Max,
+    CriteriaInternal.Point_Biserial: BestRule.Max,
+    CriteriaInternal.Ray_Turi: BestRule.Min,
+    CriteriaInternal.Ratkowsky_Lance: BestRule.Max,
+    CriteriaInternal.Scott_Symons: BestRule.Min,
+    CriteriaInternal.SD_Scat: BestRule.Min,
+    CriteriaInternal.SD_Dis: BestRule.Min,
+    CriteriaInternal.S_Dbw: BestRule.Min,
+    CriteriaInternal.Silhouette: BestRule.Max,
+    CriteriaInternal.Tau: BestRule.Max,
+    CriteriaInternal.Trace_W: BestRule.MaxDiff,
+    CriteriaInternal.Trace_WiB: BestRule.MaxDiff,
+    CriteriaInternal.Wemmert_Gancarski: BestRule.Max,
+    CriteriaInternal.Xie_Beni: BestRule.Min,
+})
+# the external indices measure the agreement of two partitions, the larger the
+# better. The McNemar statistic is signed and has no preferred direction.
+BestRules.update({c: BestRule.Max for c in CriteriaExternal if c != CriteriaExternal.ALL})
+BestRules[CriteriaExternal.McNemar] = None
+BestRules[CriteriaInternal.ALL] = None
+BestRules[CriteriaExternal.ALL] = None
+
+
+def matchCriterion(name):
+    '''Find the criterion with the given name. Like clusterCrit, the name is
+    case insensitive and can be abbreviated to any prefix that is unique
+    among the internal and external criteria.
+
+    :param name [string] : name of the criterion, or a CriteriaInternal or
+    CriteriaExternal member.
+
+    :return: the CriteriaInternal or CriteriaExternal member
+    '''
+    if isinstance(name, (CriteriaInternal, CriteriaExternal)):
+        return name
+
+    candidates = [c for c in list(CriteriaInternal) + list(CriteriaExternal) if c.name != "ALL"]
+    key = str(name).lower()
+
+    exact = [c for c in candidates if c.name.lower() == key]
+    if exact:
+        return exact[0]
+
+    partial = [c for c in candidates if c.name.lower().startswith(key)]
+    if len(partial) != 1 or not key:
+        raise ValueError("'{}' does not match {} criterion".format(
+            name, "any" if not partial else "a unique"
+        ))
+    return partial[0]
+
 def getCriteriaNames(internal=True, includeGDI=False, returnEnumerations=True):
     '''Get a list of the available internal clustering indices.
 
@@ -0,0 +1,98 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import itertools
+import weakref
+from . import session
+from .scatter import asMatrix
+
+
+_ids = itertools.count()
+
+
+class Dataset:
+    '''Handle to a matrix of observations that is converted and copied into
+    R only once. The handle can be passed to `intCriteria` and
+    `intCriteriaBatch` in place of the matrix, so that evaluating new
+    partitions only sends the labels to R.
+
+    The R copy is created on first use and released when the handle is
+    closed or garbage collected. The handle can be used as a context manager.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    '''
+
+    def __init__(self, traj):
+        self.traj = asMatrix(traj)
+        self.name = 'dataset{}'.format(next(_ids))
+        self._finalizer = None
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.traj
+        return self.traj.astype(dtype, copy=False)
+
+    def __len__(self):
+        return self.traj.shape[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def shape(self):
+        return self.traj.shape
+
+    @property
+    def assigned(self):
+        '''
+        :return: True when the observations are currently held by R.
+        '''
+        return self._finalizer is not None and self._finalizer.alive
+
+    def assign(self):
+        '''Copy the observations into R when they are not already there.
+
+        :return: name of the R variable holding the observations
+        '''
+        if not self.assigned:
+            session.assign(self.name, self.traj)
+            self._finalizer = weakref.finalize(self, _release, self.name)
+        return self.name
+
+    def close(self):
+        '''Release the R copy of the observations. The handle can still be
+        used afterwards, the observations are copied again when needed.
+        '''
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+def _release(name):
+    try:
+        session.release(name)
+    except Exception:
+        # R may already be shutting down when the interpreter exits
+        pass
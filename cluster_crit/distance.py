@@ -0,0 +1,354 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+from .scatter import asMatrix
+
+
+# Upper bound on the number of values held by a single block of distances
+BlockEntries = 1 << 22
+
+# Approximate number of bytes of temporary memory used for each pair of
+# points in a block: the distances, the point indices, the cluster codes
+# and the intermediate values used to accumulate the statistics.
+PairBytes = 96
+
+# Default limits of the shared distance cache
+DefaultCacheBytes = 1 << 30
+DefaultCacheEntries = 8
+
+
+def condensedOffsets(n):
+    '''Position of the first distance of each row in a condensed distance
+    vector, where row i holds the distances d(i, j) for all j > i.
+
+    :param n [int] : number of observations.
+
+    :return: vector of n + 1 offsets, the last one is the number of pairs
+    '''
+    rows = np.arange(n + 1, dtype=np.int64)
+    offsets = rows * n - rows * (rows + 1) // 2
+    offsets[-1] = n * (n - 1) // 2
+    return offsets
+
+
+def rowBlocks(n, entries=None):
+    '''Split the rows of the upper triangle of an n x n distance matrix into
+    contiguous blocks holding roughly `entries` distances each.
+
+    :param n [int] : number of observations.
+    :param entries [int] : target number of distances per block, `BlockEntries`
+    when not provided.
+
+    :return: generator of (first row, last row + 1)
+    '''
+    entries = entries or BlockEntries
+    start = 0
+    while start < n - 1:
+        stop = start + 1
+        size = n - 1 - start
+        while stop < n - 1 and size + (n - 1 - stop) <= entries:
+            size += n - 1 - stop
+            stop += 1
+        yield start, stop
+        start = stop
+
+
+def pairIndices(n, start, stop, offsets=None):
+    '''Point indices of the pairs (i, j), i < j, found in rows start to stop
+    of the upper triangle, in condensed order.
+
+    :param n [int] : number of observations.
+    :param start [int] : first row.
+    :param stop [int] : last row + 1.
+    :param offsets [vector] : result of `condensedOffsets`, computed when missing.
+
+    :return: tuple of (i, j) index vectors
+    '''
+    if offsets is None:
+        offsets = condensedOffsets(n)
+
+    rows = np.arange(start, stop)
+    lengths = n - 1 - rows
+    i = np.repeat(rows, lengths)
+    shift = np.repeat(offsets[start:stop] - offsets[start] - rows - 1, lengths)
+    j = np.arange(offsets[stop] - offsets[start]) - shift
+    return i, j
+
+
+def euclidean(a, b):
+    '''Euclidean distances between the rows of a and the rows of b. The
+    squared differences are accumulated one variable at a time, in float64,
+    so that the temporary memory is proportional to len(a) x len(b).
+
+    :param a [matrix] : first set of observations.
+    :param b [matrix] : second set of observations.
+
+    :return: len(a) x len(b) matrix of distances
+    '''
+    sq = np.zeros((a.shape[0], b.shape[0]))
+    for col in range(a.shape[1]):
+        diff = a[:, col, None].astype(np.float64, copy=False) - b[None, :, col].astype(np.float64, copy=False)
+        diff *= diff
+        sq += diff
+    return np.sqrt(sq, out=sq)
+
+
+def sqeuclidean(a, b):
+    '''Squared Euclidean distances between the rows of a and the rows of b.'''
+    return euclidean(a, b) ** 2
+
+
+def cityblock(a, b):
+    '''Manhattan distances between the rows of a and the rows of b.'''
+    total = np.zeros((a.shape[0], b.shape[0]))
+    for col in range(a.shape[1]):
+        total += np.abs(a[:, col, None].astype(np.float64, copy=False) - b[None, :, col])
+    return total
+
+
+def chebyshev(a, b):
+    '''Chebyshev (maximum coordinate difference) distances between the rows of a
+    and the rows of b.
+    '''
+    largest = np.zeros((a.shape[0], b.shape[0]))
+    for col in range(a.shape[1]):
+        np.maximum(largest, np.abs(a[:, col, None].astype(np.float64, copy=False) - b[None, :, col]),
+                   out=largest)
+    return largest
+
+
+def cosine(a, b):
+    '''Cosine distances (1 - cosine similarity) between the rows of a and the rows of b.'''
+    a, b = a.astype(np.float64, copy=False), b.astype(np.float64, copy=False)
+    norms = np.outer(np.linalg.norm(a, axis=1), np.linalg.norm(b, axis=1))
+    return np.clip(1.0 - (a @ b.T) / norms, 0.0, 2.0)
+
+
+# Metrics that can be computed from the observations, by name. A metric is
+# called with two blocks of observations and returns the matrix of their distances.
+Metrics = {
+    'euclidean': euclidean,
+    'sqeuclidean': sqeuclidean,
+    'cityblock': cityblock,
+    'manhattan': cityblock,
+    'chebyshev': chebyshev,
+    'cosine': cosine,
+}
+
+# Metric of the observations given as a distance matrix
+Precomputed = 'precomputed'
+
+
+def resolveMetric(metric):
+    '''
+    :param metric [string] : name of a metric found in `Metrics`, or a callable
+    returning the len(a) x len(b) matrix of distances between the rows of a and b.
+
+    :return: the function computing the distances
+    '''
+    if callable(metric):
+        return metric
+    if metric not in Metrics:
+        raise ValueError(
+            "unknown metric '{}', expected a callable or one of {}".format(metric, sorted(Metrics))
+        )
+    return Metrics[metric]
+
+
+def distanceBlocks(traj, entries=None, metric=euclidean):
+    '''Compute the condensed pairwise distances one block of rows at a time,
+    without holding the full distance matrix.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param entries [int] : target number of distances per block, `BlockEntries`
+    when not provided.
+    :param metric [callable] : computes the distances of two blocks of observations.
+
+    :return: generator of (first row, last row + 1, distances) where distances
+    is the slice of the condensed vector for these rows
+    '''
+    traj = asMatrix(traj)
+    for start, stop in rowBlocks(traj.shape[0], entries):
+        block = np.asarray(metric(traj[start:stop], traj[start + 1:]), dtype=np.float64)
+        yield start, stop, block[np.triu(np.ones(block.shape, dtype=bool), 0)]
+
+
+def pairwiseDistances(traj, metric=euclidean):
+    '''Compute the condensed vector of the distances between every pair of
+    observations. The distances are computed by blocks of rows so that the
+    temporary memory stays bounded.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param metric [callable] : computes the distances of two blocks of observations.
+
+    :return: vector of N(N-1)/2 distances ordered as d(0, 1), d(0, 2), ... d(N-2, N-1)
+    '''
+    traj = asMatrix(traj)
+    offsets = condensedOffsets(traj.shape[0])
+    distances = np.empty(offsets[-1])
+
+    for start, stop, block in distanceBlocks(traj, metric=metric):
+        distances[offsets[start]:offsets[stop]] = block
+    return distances
+
+
+def condensedSize(count):
+    '''Number of observations of a condensed distance vector.
+
+    :param count [int] : number of distances.
+
+    :raises ValueError: count is not N(N-1)/2 for any N.
+    '''
+    n = int((1 + np.sqrt(1 + 8 * count)) // 2)
+    if n * (n - 1) // 2 != count:
+        raise ValueError("{} distances do not form a condensed distance vector".format(count))
+    return n
+
+
+def precomputedBlocks(distances, entries=None):
+    '''Split a precomputed condensed distance vector, or a square distance
+    matrix, into blocks of rows of the condensed vector. Only one block is read
+    at a time, so that a memory mapped matrix is never loaded entirely.
+
+    :param distances [matrix] : condensed vector or N x N distance matrix.
+    :param entries [int] : target number of distances per block, `BlockEntries`
+    when not provided.
+
+    :return: generator of (first row, last row + 1, distances)
+    '''
+    if distances.ndim == 1:
+        n = condensedSize(len(distances))
+        offsets = condensedOffsets(n)
+        for start, stop in rowBlocks(n, entries):
+            yield start, stop, np.asarray(distances[offsets[start]:offsets[stop]], dtype=np.float64)
+    else:
+        n = distances.shape[0]
+        for start, stop in rowBlocks(n, entries):
+            rows = distances[start:stop]
+            yield start, stop, np.concatenate(
+                [rows[i, start + i + 1:] for i in range(stop - start)]
+            ).astype(np.float64, copy=False)
+
+
+class DistanceCache:
+    '''Least recently used cache of condensed pairwise distances. Entries are
+    keyed by the identity of the observations object (numpy array or
+    `Dataset`) and are dropped when that object is garbage collected, so the
+    observations must not be modified in place while they are cached.
+
+    :param maxBytes [int] : total size of the cached distances.
+    :param maxEntries [int] : number of data sets that can be cached.
+    '''
+
+    def __init__(self, maxBytes=DefaultCacheBytes, maxEntries=DefaultCacheEntries):
+        self.maxBytes = maxBytes
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, traj):
+        return id(traj) in self._entries
+
+    @property
+    def nbytes(self):
+        '''
+        :return: size of all cached distances
+        '''
+        return sum(d.nbytes for _, d in self._entries.values())
+
+    def get(self, traj):
+        '''Get the condensed distances of the observations, computing and
+        caching them when they are not found.
+
+        :param traj [matrix] : the matrix of observations (trajectories).
+
+        :return: condensed distance vector (see `pairwiseDistances`)
+        '''
+        key = id(traj)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][1]
+            self.misses += 1
+
+        distances = pairwiseDistances(traj)
+        self.put(traj, distances)
+        return distances
+
+    def put(self, traj, distances):
+        '''Store the distances of the observations. Objects that cannot be
+        weakly referenced (e.g. lists) and distances larger than the cache
+        are not stored.
+
+        :param traj [matrix] : the matrix of observations (trajectories).
+        :param distances [vector] : condensed distances of the observations.
+        '''
+        if distances.nbytes > self.maxBytes or self.maxEntries < 1:
+            return
+
+        key = id(traj)
+        try:
+            ref = weakref.ref(traj, lambda _: self._discard(key))
+        except TypeError:
+            return
+
+        with self._lock:
+            self._entries[key] = (ref, distances)
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def discard(self, traj):
+        '''Remove the distances of the observations from the cache.
+
+        :param traj [matrix] : the matrix of observations (trajectories).
+        '''
+        self._discard(id(traj))
+
+    def clear(self):
+        '''Remove every entry from the cache.'''
+        with self._lock:
+            self._entries.clear()
+
+    def _discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _evict(self):
+        total = sum(d.nbytes for _, d in self._entries.values())
+        while self._entries and (len(self._entries) > self.maxEntries or total > self.maxBytes):
+            _, (_, distances) = self._entries.popitem(last=False)
+            total -= distances.nbytes
+
+
+# cache shared by every call to the native backend
+distanceCache = DistanceCache()
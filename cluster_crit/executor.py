@@ -0,0 +1,355 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import queue
+import threading
+import numpy as np
+
+
+# Number of requests that may wait for the executor before new requests are refused
+DefaultQueueSize = 64
+
+# Largest number of waiting requests taken (and merged) by the executor at once
+CoalesceLimit = 256
+
+
+class ExecutorBusyError(RuntimeError):
+    '''Raised when a request is submitted while the queue of the executor is
+    full. Callers should shed load or retry later.
+    '''
+
+
+class _Request:
+    '''A call waiting for the executor. Requests with the same `key` (not
+    None) are merged into a single call.
+    '''
+    __slots__ = ('function', 'args', 'key', 'loop', 'future', 'cancelled')
+
+    def __init__(self, function, args, key=None):
+        self.function = function
+        self.args = args
+        self.key = key
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.cancelled = threading.Event()
+        # a request cancelled (or timed out) while waiting is never run
+        self.future.add_done_callback(lambda f: f.cancelled() and self.cancelled.set())
+
+    def settle(self, value=None, error=None):
+        '''Pass the outcome to the waiting coroutine, from the executor thread.'''
+        def _settle():
+            if self.future.done():
+                return
+            if error is not None:
+                self.future.set_exception(error)
+            else:
+                self.future.set_result(value)
+
+        try:
+            self.loop.call_soon_threadsafe(_settle)
+        except RuntimeError:
+            # the event loop of the caller is closed, nobody is waiting
+            pass
+
+
+def _intCriteriaGroup(requests):
+    '''Compute the internal criteria of several requests on the same data set
+    with a single call to `intCriteriaBatch`. The criteria are the union of
+    the requested criteria, and each request receives its own.
+    '''
+    from .cluster import intCriteriaBatch
+
+    traj, _, _, backend = requests[0].args
+    criteria = list(dict.fromkeys(c for r in requests for c in r.args[2]))
+    table = intCriteriaBatch(traj, [r.args[1] for r in requests], criteria, backend)
+
+    return [
+        {c.name: table.at[c.name, j] for c in r.args[2]}
+        for j, r in enumerate(requests)
+    ]
+
+
+class RExecutor:
+    '''Run the criteria functions for asyncio code. The embedded R session is
+    shared by the whole process and cannot be used by several threads, so a
+    single thread owned by the executor makes every call while the event loop
+    keeps running. Requests wait in a bounded queue: when it is full, new
+    requests are refused with `ExecutorBusyError` rather than piling up.
+
+    Concurrent `intCriteria` requests against the same data set (the same
+    array or `Dataset` object) and backend are merged into one call to
+    `intCriteriaBatch`, so the data set is converted and sent to R once.
+
+    A request can be cancelled, or given a timeout, while it waits. A call that
+    has started cannot be interrupted: its result is dropped. Code that also
+    calls the blocking functions should do it through `run` so that R is never
+    used by two threads.
+
+    :param maxQueue [int] : number of requests that may wait.
+    :param coalesce [bool] : merge the requests against the same data set.
+    '''
+
+    def __init__(self, maxQueue=DefaultQueueSize, coalesce=True):
+        self.maxQueue = maxQueue
+        self.coalesce = coalesce
+        # number of calls made by the executor, merged requests count once
+        self.calls = 0
+        self._queue = queue.Queue(maxQueue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def pending(self):
+        '''Number of requests waiting in the queue'''
+        return self._queue.qsize()
+
+    def close(self, wait=True):
+        '''Stop the executor once the waiting requests have been processed.
+
+        :param wait [bool] : block until the executor thread has stopped.
+        '''
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None:
+            self._queue.put(None)
+            if wait:
+                thread.join()
+
+    def _submit(self, function, args, key=None):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("the executor is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cluster-crit-executor', daemon=True)
+                self._thread.start()
+
+        request = _Request(function, args, key if self.coalesce else None)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            request.future.cancel()
+            raise ExecutorBusyError(
+                "the executor queue is full ({} requests waiting)".format(self.maxQueue)
+            ) from None
+        return request.future
+
+    async def _wait(self, future, timeout):
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(future, timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # take every request already waiting, so that they can be merged
+            while len(batch) < CoalesceLimit:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                stopping = True
+                batch = [r for r in batch if r is not None]
+
+            groups = {}
+            for request in batch:
+                if request.cancelled.is_set():
+                    continue
+                key = request.key if request.key is not None else id(request)
+                groups.setdefault(key, []).append(request)
+
+            for group in groups.values():
+                self._execute(group)
+
+    def _execute(self, group):
+        # requests cancelled while the previous groups were running are dropped
+        group = [r for r in group if not r.cancelled.is_set()]
+        if not group:
+            return
+
+        self.calls += 1
+        try:
+            if len(group) == 1:
+                values = [group[0].function(*group[0].args)]
+            else:
+                values = _intCriteriaGroup(group)
+        except Exception as e:
+            for request in group:
+                request.settle(error=e)
+            return
+
+        for request, value in zip(group, values):
+            request.settle(value)
+
+    async def run(self, function, *args, timeout=None):
+        '''Call any function on the executor thread, e.g. a blocking function of
+        this package.
+
+        :param function [callable] : the function to call.
+        :param args : arguments of the function.
+        :param timeout [float] : seconds to wait for the result.
+
+        :return: value returned by the function
+        :raises ExecutorBusyError: the queue is full.
+        :raises asyncio.TimeoutError: the result did not arrive within `timeout`.
+        '''
+        return await self._wait(self._submit(function, args), timeout)
+
+    async def intCriteria(self, traj, part, crit, backend='r', timeout=None):
+        '''Asynchronous `intCriteria`. Requests against the same data set are merged.
+
+        :param traj [matrix] : the matrix of observations (trajectories) or a `Dataset`.
+        :param part [vector] : the partition vector.
+        :param crit [vector] : a list containing CriteriaInternal indices to compute
+        :param backend [string] : see `intCriteria`.
+        :param timeout [float] : seconds to wait for the result.
+
+        :return: Map of the criteria to the value
+        :raises ExecutorBusyError: the queue is full.
+        :raises asyncio.TimeoutError: the result did not arrive within `timeout`.
+        '''
+        from .cluster import _resolveCriteria, _validateBackend, intCriteria
+        from .criteria import CriteriaInternal
+        from .native import NativeCriteria
+
+        _criteria = _resolveCriteria(crit, CriteriaInternal)
+
+        if not _criteria:
+            return None
+
+        # refuse invalid requests here rather than failing the requests merged with them
+        _validateBackend(backend, NativeCriteria, _criteria)
+
+        part = np.asarray(part)
+        key = ('intCriteria', id(traj), len(part), backend)
+        future = self._submit(intCriteria, (traj, part, _criteria, backend), key)
+        return await self._wait(future, timeout)
+
+    async def extCriteria(self, part1, part2, crit, backend='r', timeout=None):
+        '''Asynchronous `extCriteria`.
+
+        :param part1 [vector] : the first partition vector.
+        :param part2 [vector] : the second partition vector.
+        :param crit [vector]  : a list containing CriteriaExternal indices to compute
+        :param backend [string] : see `extCriteria`.
+        :param timeout [float] : seconds to wait for the result.
+
+        :return: Map of the criteria to the value
+        '''
+        from .cluster import extCriteria
+        return await self.run(extCriteria, part1, part2, crit, backend, timeout=timeout)
+
+    async def bestCriterion(self, x, crit=None, backend='numpy', timeout=None):
+        '''Asynchronous `bestCriterion`.
+
+        :param x [matrix] : see `bestCriterion`.
+        :param crit [string] : see `bestCriterion`.
+        :param backend [string] : see `bestCriterion`.
+        :param timeout [float] : seconds to wait for the result.
+
+        :return: see `bestCriterion`
+        '''
+        from .cluster import bestCriterion
+        return await self.run(bestCriterion, x, crit, backend, timeout=timeout)
+
+
+_default = None
+_defaultLock = threading.Lock()
+
+
+def defaultExecutor():
+    '''
+    :return: the `RExecutor` shared by `aintCriteria`, `aextCriteria` and
+    `abestCriterion`, created on first use.
+    '''
+    global _default
+    with _defaultLock:
+        if _default is None or _default._closed:
+            _default = RExecutor()
+        return _default
+
+
+async def aintCriteria(traj, part, crit, backend='r', timeout=None, executor=None):
+    '''Asynchronous `intCriteria`, computed by an `RExecutor` so that the event
+    loop is never blocked. Concurrent requests against the same data set are
+    merged into a single call.
+
+    :param traj [matrix] : the matrix of observations (trajectories) or a `Dataset`.
+    :param part [vector] : the partition vector.
+    :param crit [vector] : a list containing CriteriaInternal indices to compute
+    :param backend [string] : see `intCriteria`.
+    :param timeout [float] : seconds to wait for the result.
+    :param executor [RExecutor] : executor running the request, `defaultExecutor()`
+    when not provided.
+
+    :return: Map of the criteria to the value
+    :raises ExecutorBusyError: the queue of the executor is full.
+    :raises asyncio.TimeoutError: the result did not arrive within `timeout`.
+    '''
+    executor = executor or defaultExecutor()
+    return await executor.intCriteria(traj, part, crit, backend, timeout)
+
+
+async def aextCriteria(part1, part2, crit, backend='r', timeout=None, executor=None):
+    '''Asynchronous `extCriteria`, see `aintCriteria`.
+
+    :param part1 [vector] : the first partition vector.
+    :param part2 [vector] : the second partition vector.
+    :param crit [vector]  : a list containing CriteriaExternal indices to compute
+    :param backend [string] : see `extCriteria`.
+    :param timeout [float] : seconds to wait for the result.
+    :param executor [RExecutor] : see `aintCriteria`.
+
+    :return: Map of the criteria to the value
+    '''
+    executor = executor or defaultExecutor()
+    return await executor.extCriteria(part1, part2, crit, backend, timeout)
+
+
+async def abestCriterion(x, crit=None, backend='numpy', timeout=None, executor=None):
+    '''Asynchronous `bestCriterion`, see `aintCriteria`.
+
+    :param x [matrix] : see `bestCriterion`.
+    :param crit [string] : see `bestCriterion`.
+    :param backend [string] : see `bestCriterion`.
+    :param timeout [float] : seconds to wait for the result.
+    :param executor [RExecutor] : see `aintCriteria`.
+
+    :return: see `bestCriterion`
+    '''
+    executor = executor or defaultExecutor()
+    return await executor.bestCriterion(x, crit, backend, timeout)
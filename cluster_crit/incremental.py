@@ -0,0 +1,309 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+from .criteria import CriteriaInternal
+from .scatter import ScatterCriteria, ScatterStatistics, asMatrix, daviesBouldin, factorize
+
+
+# Criteria that only depend on the size, barycenter and scatter matrix of
+# each cluster. The criteria that need every observation are left out.
+MomentCriteria = {
+    c: f for c, f in ScatterCriteria.items()
+    if c not in (CriteriaInternal.PBM, CriteriaInternal.Xie_Beni, CriteriaInternal.Davies_Bouldin,
+                 CriteriaInternal.S_Dbw, CriteriaInternal.Wemmert_Gancarski)
+}
+
+IncrementalSupported = set(MomentCriteria) | {CriteriaInternal.Davies_Bouldin}
+
+
+def _combine(count, mean, m2, points, sign):
+    '''Add (sign = 1) or remove (sign = -1) a group of points from the size,
+    mean and scatter matrix of a set of points. The group statistics are merged
+    with the pairwise update of Chan et al., which is stable for small groups.
+
+    :return: tuple of the updated (count, mean, scatter matrix)
+    '''
+    size = len(points)
+    center = points.mean(axis=0, dtype=np.float64)
+    centered = points - center
+    scatter = centered.T @ centered
+
+    if sign > 0:
+        total = count + size
+        delta = center - mean
+        mean = mean + delta * (size / total)
+        m2 = m2 + scatter + np.outer(delta, delta) * (count * size / total)
+        return total, mean, m2
+
+    total = count - size
+    if total == 0:
+        return 0, np.zeros_like(mean), np.zeros_like(m2)
+    rest = (count * mean - size * center) / total
+    delta = center - rest
+    m2 = m2 - scatter - np.outer(delta, delta) * (total * size / count)
+    return total, rest, m2
+
+
+class IncrementalCriteria:
+    '''Internal criteria of a partition that changes one point or a few points
+    at a time. The size, barycenter and scatter matrix of every cluster and of
+    the whole data set are kept up to date, so that moving, adding or removing
+    m points costs O(m.p^2) and the centroid based criteria are read without
+    visiting the observations. Davies_Bouldin also needs the mean distance of
+    each cluster to its barycenter, which is recomputed on the next read for
+    the clusters changed since the previous one, in a single pass over the
+    cluster code of each observation.
+
+    Points are identified by their index: the rows of `traj` are 0 to N-1
+    and `add` returns the indices of the new points. Removed indices are not
+    reused.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param part [vector] : the partition vector, any hashable labels.
+    '''
+
+    def __init__(self, traj, part):
+        traj = asMatrix(traj)
+        codes, labels = factorize(part)
+
+        if len(codes) != traj.shape[0]:
+            raise ValueError(
+                "partition length {} does not match the number of observations {}".format(
+                    len(codes), traj.shape[0]
+                )
+            )
+
+        self._size = traj.shape[0]
+        self._traj = traj.copy()
+        self._codes = codes.astype(np.int64)
+        self._active = np.ones(self._size, dtype=bool)
+
+        self._labels = list(labels)
+        self._lookup = {label: code for code, label in enumerate(self._labels)}
+
+        k, p = len(self._labels), traj.shape[1]
+        self._counts = np.zeros(k, dtype=np.int64)
+        self._means = np.zeros((k, p))
+        self._m2 = np.zeros((k, p, p))
+        self._spread = np.zeros(k)
+        self._dirty = set(range(k))
+
+        self._n, self._center, self._t = 0, np.zeros(p), np.zeros((p, p))
+        self._apply(np.arange(self._size), 1)
+
+    @property
+    def n(self):
+        '''
+        :return: number of observations in the partition
+        '''
+        return self._n
+
+    @property
+    def k(self):
+        '''
+        :return: number of non-empty clusters
+        '''
+        return int(np.count_nonzero(self._counts))
+
+    @property
+    def indices(self):
+        '''
+        :return: sorted indices of the observations in the partition
+        '''
+        return np.flatnonzero(self._active[:self._size])
+
+    @property
+    def part(self):
+        '''
+        :return: label of each observation, in the order of `indices`
+        '''
+        labels = np.asarray(self._labels, dtype=object)
+        return labels[self._codes[self.indices]].tolist()
+
+    def move(self, idx, label):
+        '''Assign observations to another cluster. New labels create new clusters.
+
+        :param idx [vector] : index, or indices, of the observations to move.
+        :param label [vector] : new label, either one for all the observations
+        or one per observation.
+        '''
+        idx = self._checkIndices(idx)
+        codes = np.broadcast_to(self._encode(label), idx.shape)
+
+        changed = self._codes[idx] != codes
+        idx, codes = idx[changed], codes[changed]
+        if len(idx) == 0:
+            return
+
+        # the barycenter and the total scatter do not change
+        self._update(idx, -1)
+        self._codes[idx] = codes
+        self._update(idx, 1)
+
+    def add(self, points, labels):
+        '''Add observations to the partition.
+
+        :param points [matrix] : the new observations, with the same number of variables.
+        :param labels [vector] : the label of each new observation.
+
+        :return: indices of the new observations
+        '''
+        points = asMatrix(points)
+        if points.shape[1] != self._traj.shape[1]:
+            raise ValueError(
+                "expected {} variables, found {}".format(self._traj.shape[1], points.shape[1])
+            )
+
+        codes = np.broadcast_to(self._encode(labels), (points.shape[0],))
+        idx = np.arange(self._size, self._size + points.shape[0])
+        self._reserve(self._size + points.shape[0])
+
+        self._traj[idx] = points
+        self._codes[idx] = codes
+        self._active[idx] = True
+        self._size += points.shape[0]
+        self._apply(idx, 1)
+        return idx
+
+    def remove(self, idx):
+        '''Remove observations from the partition.
+
+        :param idx [vector] : index, or indices, of the observations to remove.
+        '''
+        idx = self._checkIndices(idx)
+        self._apply(idx, -1)
+        self._active[idx] = False
+
+    def statistics(self):
+        '''Scatter statistics of the current partition, restricted to the
+        non-empty clusters.
+
+        :return: ScatterStatistics (see `ScatterStatistics.fromMoments`)
+        '''
+        used = self._counts > 0
+        return ScatterStatistics.fromMoments(
+            self._counts[used], self._means[used], self._m2[used], self._center, self._t
+        )
+
+    def criteria(self, crit):
+        '''Compute internal criteria of the current partition.
+
+        :param crit [vector] : a list containing CriteriaInternal indices to compute,
+        members of `IncrementalSupported` or ALL for every one of them.
+
+        :return: Map of the criteria to the value
+        '''
+        if CriteriaInternal.ALL in crit:
+            crit = [c for c in CriteriaInternal if c in IncrementalSupported]
+
+        unsupported = [c.name for c in crit if c not in IncrementalSupported]
+        if unsupported:
+            raise ValueError("incremental criteria do not support: {}".format(", ".join(unsupported)))
+
+        stats = self.statistics()
+        values = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for c in crit:
+                if c == CriteriaInternal.Davies_Bouldin:
+                    value = daviesBouldin(stats.centroids, self._spreads()[self._counts > 0])
+                else:
+                    value = MomentCriteria[c](stats)
+                values[c.name] = float(value)
+        return values
+
+    def _checkIndices(self, idx):
+        idx = np.atleast_1d(np.asarray(idx, dtype=np.int64))
+        if np.any((idx < 0) | (idx >= self._size)) or not np.all(self._active[idx]):
+            raise IndexError("unknown or removed observation index")
+        if len(np.unique(idx)) != len(idx):
+            raise IndexError("duplicate observation index")
+        return idx
+
+    def _encode(self, labels):
+        '''Convert labels to cluster codes, creating the clusters of new labels.'''
+        labels = np.asarray(labels, dtype=object)
+        codes = np.empty(labels.shape, dtype=np.int64)
+        for i, label in enumerate(labels.ravel().tolist()):
+            if label not in self._lookup:
+                self._newCluster(label)
+            codes.flat[i] = self._lookup[label]
+        return codes
+
+    def _newCluster(self, label):
+        self._lookup[label] = len(self._labels)
+        self._labels.append(label)
+        p = self._traj.shape[1]
+        self._counts = np.append(self._counts, 0)
+        self._means = np.concatenate((self._means, np.zeros((1, p))))
+        self._m2 = np.concatenate((self._m2, np.zeros((1, p, p))))
+        self._spread = np.append(self._spread, 0.0)
+
+    def _reserve(self, size):
+        '''Grow the storage of the observations geometrically.'''
+        capacity = self._traj.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        grow = capacity - self._traj.shape[0]
+        self._traj = np.concatenate((self._traj, np.empty((grow, self._traj.shape[1]))))
+        self._codes = np.concatenate((self._codes, np.zeros(grow, dtype=np.int64)))
+        self._active = np.concatenate((self._active, np.zeros(grow, dtype=bool)))
+
+    def _apply(self, idx, sign):
+        '''Add or remove observations from the clusters and from the totals.'''
+        if len(idx) == 0:
+            return
+        self._n, self._center, self._t = _combine(
+            self._n, self._center, self._t, self._traj[idx], sign
+        )
+        self._update(idx, sign)
+
+    def _update(self, idx, sign):
+        '''Add or remove observations from the clusters they are assigned to.'''
+        codes = self._codes[idx]
+        for code in np.unique(codes).tolist():
+            group = idx[codes == code]
+            self._counts[code], self._means[code], self._m2[code] = _combine(
+                self._counts[code], self._means[code], self._m2[code], self._traj[group], sign
+            )
+            self._dirty.add(code)
+
+    def _spreads(self):
+        '''Mean distance of each cluster to its barycenter, refreshing the
+        clusters that changed since the last call.
+        '''
+        if not self._dirty:
+            return self._spread
+
+        dirty = np.zeros(len(self._labels), dtype=bool)
+        dirty[list(self._dirty)] = True
+        codes = self._codes[:self._size]
+        members = np.flatnonzero(self._active[:self._size] & dirty[codes])
+        codes = codes[members]
+
+        diff = self._traj[members] - self._means[codes]
+        sums = np.bincount(codes, np.sqrt((diff ** 2).sum(axis=1)), len(self._labels))
+        self._spread[dirty] = sums[dirty] / np.maximum(self._counts[dirty], 1)
+        self._dirty.clear()
+        return self._spread
@@ -0,0 +1,336 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import bisect
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+import numpy as np
+
+
+# Upper bounds (seconds) of the buckets of the duration histograms
+DefaultBuckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+# Prefix of the metric names exported by `MetricsCollector.toPrometheus`
+MetricPrefix = 'cluster_crit'
+
+_hooks = []
+_lock = threading.Lock()
+_logger = logging.getLogger('cluster_crit')
+_current = contextvars.ContextVar('cluster_crit_record', default=None)
+
+
+class CallRecord:
+    '''Measurements of a single call to a public entry point: the size of the
+    data, the criteria, the backend, the time spent in each phase and the
+    number of bytes converted for R. Phases are `bootstrap` (R start up),
+    `conversion` (numpy to R, or to shared memory for the parallel workers),
+    `compute` and `flatten` (R results to python). For a batch, `k` is the
+    largest number of clusters of the partitions. `k` is counted from the
+    partitions the first time it is read, so that the clusters are never
+    counted when no hook reads it.
+    '''
+
+    __slots__ = ('entry', 'backend', 'n', 'd', '_k', '_part', 'partitions', 'criteria',
+                 'phases', 'bytes', 'seconds', 'error')
+
+    def __init__(self, entry, backend, n=None, d=None, k=None, partitions=1, criteria=(), part=None):
+        self.entry = entry
+        self.backend = backend
+        self.n = n
+        self.d = d
+        self._k = k
+        self._part = part
+        self.partitions = partitions
+        self.criteria = list(criteria)
+        self.phases = {}
+        self.bytes = 0
+        self.seconds = 0.0
+        self.error = None
+
+    @property
+    def k(self):
+        if self._part is not None:
+            self._k, self._part = _clusters(self._part), None
+        return self._k
+
+    def __repr__(self):
+        phases = ' '.join('{}={:.6f}s'.format(p, s) for p, s in self.phases.items())
+        return '{} backend={} n={} d={} k={} partitions={} criteria={} bytes={} seconds={:.6f} {}{}'.format(
+            self.entry, self.backend, self.n, self.d, self.k, self.partitions,
+            ','.join(self.criteria), self.bytes, self.seconds, phases,
+            '' if self.error is None else ' error={}'.format(self.error)
+        )
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''Add the time spent in the block to the phase `name`.'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def addBytes(self, count):
+        '''Count bytes converted and sent to R.'''
+        self.bytes += int(count)
+
+
+class _NullRecord:
+    '''Record used when no hook is registered, every measurement is skipped.'''
+
+    def phase(self, name):
+        return contextlib.nullcontext()
+
+    def addBytes(self, count):
+        pass
+
+
+_null = _NullRecord()
+
+
+def addHook(callback):
+    '''Register a callback receiving a `CallRecord` after every call to
+    `intCriteria`, `intCriteriaBatch`, `extCriteria`, `extCriteriaBatch` and `bestCriterion`.
+
+    :param callback [callable] : function of a `CallRecord`.
+    '''
+    with _lock:
+        _hooks.append(callback)
+
+
+def removeHook(callback):
+    '''Unregister a callback added with `addHook`.
+
+    :param callback [callable] : the registered function.
+    '''
+    with _lock:
+        if callback in _hooks:
+            _hooks.remove(callback)
+
+
+@contextlib.contextmanager
+def instrument(callback):
+    '''Register the callback for the duration of the block.
+
+    :param callback [callable] : function of a `CallRecord`.
+
+    :return: the callback
+    '''
+    addHook(callback)
+    try:
+        yield callback
+    finally:
+        removeHook(callback)
+
+
+def currentRecord():
+    '''
+    :return: the record of the call in progress, or a record discarding every
+    measurement when nothing is instrumented
+    '''
+    return _current.get() or _null
+
+
+def _clusters(part):
+    part = np.asarray(part)
+    if part.ndim == 2:
+        return max((len(np.unique(p)) for p in part), default=0)
+    return len(np.unique(part))
+
+
+def _precomputedSize(shape, part):
+    '''Number of points of a call given precomputed distances of this shape.'''
+    if part is not None:
+        return np.shape(part)[-1]
+    if len(shape) == 2:
+        return shape[0]
+    if len(shape) == 1:
+        from .distance import condensedSize
+        return condensedSize(shape[0])
+    return None
+
+
+@contextlib.contextmanager
+def record(entry, backend, traj=None, part=None, criteria=(), partitions=1, metric=None):
+    '''Measure a call to a public entry point and pass its record to every
+    hook. Nothing is measured when no hook is registered, and calls made
+    while another call is measured are added to the outer record. A hook
+    raising an error is logged and never changes the result of the call.
+
+    :param entry [string] : name of the entry point.
+    :param backend [string] : backend used.
+    :param traj [matrix] : the observations, used for N and d.
+    :param part [vector] : the partition vector, or 2-D array of partitions, used for N and K.
+    :param criteria [vector] : names of the criteria.
+    :param partitions [int] : number of partitions evaluated.
+    :param metric [string] : metric of the call. With `precomputed`, traj holds the
+    distances: N is found from the partitions (or the distances) and d is unknown.
+
+    :return: the CallRecord
+    '''
+    if _current.get() is not None:
+        yield _current.get()
+        return
+
+    with _lock:
+        hooks = list(_hooks)
+    if not hooks:
+        yield _null
+        return
+
+    shape = np.shape(traj) if traj is not None else ()
+    if metric == 'precomputed':
+        n, d = _precomputedSize(shape, part), None
+    else:
+        n = shape[0] if shape else (np.shape(part)[-1] if part is not None else None)
+        d = (shape[1] if len(shape) > 1 else 1) if shape else None
+    rec = CallRecord(entry, backend, n=n, d=d, partitions=partitions, criteria=criteria, part=part)
+
+    token = _current.set(rec)
+    start = time.perf_counter()
+    try:
+        yield rec
+    except Exception as e:
+        rec.error = type(e).__name__
+        raise
+    finally:
+        rec.seconds = time.perf_counter() - start
+        _current.reset(token)
+        for hook in hooks:
+            try:
+                hook(rec)
+            except Exception:
+                _logger.exception('instrumentation hook %r failed', hook)
+
+
+class Histogram:
+    '''Cumulative histogram of durations with fixed bucket bounds.
+
+    :param buckets [vector] : sorted upper bounds of the buckets, in seconds.
+    '''
+
+    def __init__(self, buckets=DefaultBuckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        '''
+        :return: list of (upper bound, number of values <= bound), the last
+        bound is +Inf
+        '''
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsCollector:
+    '''Hook aggregating the records into duration histograms per entry point,
+    backend and phase (the whole call is the phase `total`), and counters of
+    calls, errors and bytes sent to R.
+
+    :param buckets [vector] : upper bounds of the histogram buckets, in seconds.
+    '''
+
+    def __init__(self, buckets=DefaultBuckets):
+        self.buckets = tuple(buckets)
+        self.histograms = {}
+        self.calls = {}
+        self.errors = {}
+        self.bytes = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, rec):
+        key = (rec.entry, rec.backend)
+        with self._lock:
+            for phase, seconds in list(rec.phases.items()) + [('total', rec.seconds)]:
+                if (key + (phase,)) not in self.histograms:
+                    self.histograms[key + (phase,)] = Histogram(self.buckets)
+                self.histograms[key + (phase,)].observe(seconds)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            self.bytes[key] = self.bytes.get(key, 0) + rec.bytes
+            if rec.error is not None:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def histogram(self, entry, backend, phase='total'):
+        '''
+        :return: the Histogram of a phase, None when it was never recorded
+        '''
+        return self.histograms.get((entry, backend, phase))
+
+    def toPrometheus(self):
+        '''Export the metrics in the Prometheus text exposition format.
+
+        :return: string
+        '''
+        name = MetricPrefix + '_phase_seconds'
+        lines = [
+            '# HELP {} Time spent in each phase of the criteria calls.'.format(name),
+            '# TYPE {} histogram'.format(name),
+        ]
+        with self._lock:
+            for (entry, backend, phase), h in sorted(self.histograms.items()):
+                labels = 'entry="{}",backend="{}",phase="{}"'.format(entry, backend, phase)
+                for bound, count in h.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, le, count))
+                lines.append('{}_sum{{{}}} {!r}'.format(name, labels, h.sum))
+                lines.append('{}_count{{{}}} {}'.format(name, labels, h.count))
+
+            for metric, values, text in (
+                ('calls_total', self.calls, 'Number of criteria calls.'),
+                ('errors_total', self.errors, 'Number of criteria calls that raised an error.'),
+                ('bytes_total', self.bytes, 'Bytes converted and sent to R.'),
+            ):
+                metric = '{}_{}'.format(MetricPrefix, metric)
+                lines.append('# HELP {} {}'.format(metric, text))
+                lines.append('# TYPE {} counter'.format(metric))
+                for (entry, backend), value in sorted(values.items()):
+                    lines.append('{}{{entry="{}",backend="{}"}} {}'.format(metric, entry, backend, value))
+        return '\n'.join(lines) + '\n'
+
+
+def loggingHook(logger=None, level=logging.INFO):
+    '''Hook writing one log line per call.
+
+    :param logger [Logger] : destination, the `cluster_crit` logger by default.
+    :param level [int] : logging level of the records.
+
+    :return: callback to register with `addHook` or `instrument`
+    '''
+    logger = logger or logging.getLogger('cluster_crit')
+
+    def _log(rec):
+        logger.log(level, '%r', rec)
+    return _log
@@ -0,0 +1,333 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+from .concordance import ConcordanceCriteria
+from .criteria import CriteriaInternal
+from .distance import (
+    PairBytes, Precomputed, condensedOffsets, condensedSize, distanceBlocks, distanceCache,
+    euclidean, pairwiseDistances, precomputedBlocks, resolveMetric
+)
+from .pairwise import PairwiseCriteria, condensedBlocks, sumSmallest
+from .planner import Intermediates, Plan
+from .scatter import ScatterCriteria, asMatrix, totalScatter
+
+
+def _scatterCriterion(function):
+    def _index(ctx):
+        return function(ctx.scatter)
+    return _index
+
+
+# every criterion that the numpy backend can compute
+NativeCriteria = {c: _scatterCriterion(f) for c, f in ScatterCriteria.items()}
+NativeCriteria.update(PairwiseCriteria)
+NativeCriteria.update(ConcordanceCriteria)
+
+
+def _xieBeni(ctx):
+    # the smallest between-cluster distance comes from the pairwise statistics
+    # when the distances are at hand (cached, tiled, precomputed or already
+    # walked by another criterion), otherwise it is found block by block from
+    # the observations rather than computing every distance
+    s = ctx.scatter
+    if 'pairwise' not in ctx.values and not ctx.source.available:
+        return s.wgss / s.n / s.minBetweenSqDistance()
+    p = ctx.pairwise
+    return s.wgss / p.n / p.pairMin[p.betweenMask()].min() ** 2
+
+
+NativeCriteria[CriteriaInternal.Xie_Beni] = _xieBeni
+
+
+class PartitionStatistics:
+    '''Statistics of a single partition. Each intermediate statistic (see
+    `cluster_crit.planner.Intermediates`) is computed the first time it is
+    needed, after the intermediates it depends on, and is then shared with
+    every criterion. Intermediates are read with `get` or as attributes.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param part [vector] : the partition vector.
+    :param distances [DistanceSource] : provides the pairwise distances.
+    :param total [tuple] : see `ScatterStatistics`.
+    '''
+
+    def __init__(self, traj, part, distances, total=None):
+        self.traj = traj
+        self.part = part
+        self.source = distances
+        self.total = total
+        self.values = {}
+        self.steps = ()
+
+    def __getattr__(self, name):
+        if name in Intermediates:
+            return self.get(name)
+        raise AttributeError(name)
+
+    def get(self, name):
+        '''
+        :param name [string] : name of an intermediate statistic.
+
+        :return: value of the intermediate
+        '''
+        if name not in self.values:
+            requires, compute = Intermediates[name]
+            for required in requires:
+                self.get(required)
+            self.values[name] = compute(self)
+        return self.values[name]
+
+    def planned(self, name):
+        '''
+        :param name [string] : name of an intermediate statistic.
+
+        :return: True when the plan being evaluated computes the intermediate
+        '''
+        return name in self.steps
+
+    def evaluate(self, plan):
+        '''Compute the intermediates of the plan, in order, then its criteria.
+
+        :param plan [Plan] : the criteria and their intermediates.
+
+        :return: list of values in the same order as the criteria of the plan
+        '''
+        self.steps = plan.steps
+        for name in plan.steps:
+            self.get(name)
+        return [NativeCriteria[c](self) for c in plan.criteria]
+
+
+class DistanceSource:
+    '''Provide the pairwise distances of a data set. By default the condensed
+    distances are computed at most once, using the shared `distanceCache`
+    when `cache` is true. When `maxMemory` is set the distances are instead
+    recomputed in blocks every time they are needed, and the full distance
+    matrix is never held in memory.
+
+    :param original [object] : observations as given by the caller, used as the cache key.
+    :param traj [matrix] : the matrix of observations.
+    :param cache [bool] : use the shared distance cache. Only the Euclidean
+    distances are cached.
+    :param maxMemory [int] : bytes of temporary memory used for each block of distances.
+    :param metric [callable] : computes the distances of two blocks of observations,
+    see `cluster_crit.distance.resolveMetric`.
+    '''
+
+    def __init__(self, original, traj, cache=True, maxMemory=None, metric=euclidean):
+        self.original = original
+        self.traj = traj
+        self.cache = cache and metric is euclidean
+        self.maxMemory = maxMemory
+        self.metric = metric
+        self._distances = None
+
+    @property
+    def tiled(self):
+        return self.maxMemory is not None
+
+    @property
+    def entries(self):
+        '''Number of distances held by a single block'''
+        return max(1, self.maxMemory // PairBytes)
+
+    @property
+    def available(self):
+        '''Whether the distances can be walked without computing and holding
+        the full distance vector: they are held, cached, computed in blocks or
+        are not the Euclidean distances of the observations.
+        '''
+        return (
+            self._distances is not None or self.tiled or self.metric is not euclidean or
+            (self.cache and self.original in distanceCache)
+        )
+
+    def get(self):
+        '''
+        :return: condensed distance vector
+        '''
+        if self._distances is None:
+            if self.cache:
+                self._distances = distanceCache.get(self.original)
+            else:
+                self._distances = pairwiseDistances(self.traj, self.metric)
+        return self._distances
+
+    def blocks(self):
+        '''
+        :return: iterable of (first row, last row + 1, distances) for every block of rows
+        '''
+        if self.tiled:
+            return distanceBlocks(self.traj, self.entries, self.metric)
+        return condensedBlocks(self.get(), self.traj.shape[0])
+
+    def sumExtremes(self, count):
+        '''Sum of the `count` smallest and of the `count` largest distances.
+
+        :param count [int] : number of distances to select.
+
+        :return: tuple of (smallest, largest)
+        '''
+        if count <= 0:
+            return 0.0, 0.0
+
+        if self.tiled:
+            def values():
+                return (d for _, _, d in self.blocks())
+            return (
+                sumSmallest(values, count, self.entries),
+                sumSmallest(values, count, self.entries, largest=True)
+            )
+
+        distances = self.get()
+        last = len(distances) - count
+        return (
+            np.partition(distances, count - 1)[:count].sum(),
+            np.partition(distances, last)[last:].sum()
+        )
+
+
+class PrecomputedSource(DistanceSource):
+    '''Provide the distances of a precomputed distance matrix. When `maxMemory`
+    is set the matrix is read one block of rows at a time, so that a memory
+    mapped matrix is never loaded entirely.
+
+    :param distances [matrix] : condensed distance vector (see `pairwiseDistances`)
+    or N x N distance matrix, possibly an `np.memmap`.
+    :param maxMemory [int] : bytes of temporary memory used for each block of distances.
+    '''
+
+    def __init__(self, distances, maxMemory=None):
+        distances = distances if isinstance(distances, np.memmap) else np.asarray(distances)
+        if distances.ndim == 1:
+            n = condensedSize(len(distances))
+        elif distances.ndim == 2 and distances.shape[0] == distances.shape[1]:
+            n = distances.shape[0]
+        else:
+            raise ValueError(
+                "precomputed distances must be a condensed vector or a square matrix, got shape {}".format(
+                    distances.shape
+                )
+            )
+        super().__init__(distances, None, cache=False, maxMemory=maxMemory)
+        self.distances = distances
+        self.n = n
+
+    @property
+    def available(self):
+        return True
+
+    def get(self):
+        '''
+        :return: condensed distance vector
+        '''
+        if self._distances is None:
+            if self.distances.ndim == 1:
+                self._distances = np.asarray(self.distances, dtype=np.float64)
+            else:
+                offsets = condensedOffsets(self.n)
+                self._distances = np.empty(offsets[-1])
+                for start, stop, d in precomputedBlocks(self.distances):
+                    self._distances[offsets[start]:offsets[stop]] = d
+        return self._distances
+
+    def blocks(self):
+        '''
+        :return: iterable of (first row, last row + 1, distances) for every block of rows
+        '''
+        if self.tiled:
+            return precomputedBlocks(self.distances, self.entries)
+        return condensedBlocks(self.get(), self.n)
+
+
+def distanceSource(traj, matrix, cache=True, maxMemory=None, metric='euclidean'):
+    '''
+    :param traj [object] : observations as given by the caller, or the precomputed
+    distances when `metric` is `precomputed`.
+    :param matrix [matrix] : the matrix of observations, None with precomputed distances.
+    :param cache [bool] : see `DistanceSource`.
+    :param maxMemory [int] : see `DistanceSource`.
+    :param metric [string] : `precomputed`, or see `cluster_crit.distance.resolveMetric`.
+
+    :return: the `DistanceSource` of the observations
+    '''
+    if metric == Precomputed:
+        return PrecomputedSource(traj, maxMemory)
+    return DistanceSource(traj, matrix, cache, maxMemory, resolveMetric(metric))
+
+
+def nativeCriteria(traj, part, criteria, maxMemory=None, cache=True, metric='euclidean'):
+    '''Compute internal criteria with NumPy. Intermediate statistics are
+    computed once, following a `Plan`, and shared by all of the requested
+    criteria, and pairwise distances are reused from the shared distance cache.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param part [vector] : the partition vector.
+    :param criteria [vector] : list of CriteriaInternal members found in `NativeCriteria`
+    :param maxMemory [int] : see `nativeCriteriaBatch`.
+    :param cache [bool] : see `nativeCriteriaBatch`.
+    :param metric [string] : see `nativeCriteriaBatch`.
+
+    :return: list of values in the same order as `criteria`
+    '''
+    return nativeCriteriaBatch(traj, [part], criteria, maxMemory, cache, metric)[:, 0].tolist()
+
+
+def nativeCriteriaBatch(traj, partitions, criteria, maxMemory=None, cache=True, metric='euclidean'):
+    '''Compute internal criteria for several partitions of the same data set.
+    Statistics that do not depend on the partition, such as the pairwise
+    distances and the total scatter matrix, are computed only once.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param partitions [matrix] : 2-D array with one partition per row.
+    :param criteria [vector] : list of CriteriaInternal members found in `NativeCriteria`
+    :param maxMemory [int] : when set, the pairwise distances are computed in blocks
+    using at most (roughly) this many bytes of temporary memory, rather than being
+    computed once and cached. Use this when the N(N-1)/2 distances do not fit in memory.
+    :param cache [bool] : keep the pairwise distances in the shared `distanceCache`.
+    Disable for temporary data sets, such as subsamples, that will not be seen again.
+    :param metric [string] : distance between the observations, see
+    `cluster_crit.distance.resolveMetric`. With `precomputed`, `traj` is a condensed
+    distance vector or a square distance matrix and only the criteria that are not
+    found in `cluster_crit.planner.CoordinateCriteria` can be computed.
+
+    :return: array with one row per criterion and one column per partition
+    '''
+    plan = Plan(criteria)
+    matrix = None if metric == Precomputed else asMatrix(traj)
+    source = distanceSource(traj, matrix, cache, maxMemory, metric)
+    total = totalScatter(matrix) if 'scatter' in plan.steps else None
+
+    if matrix is None and len(partitions) and len(partitions[0]) != source.n:
+        raise ValueError(
+            "partition of {} points does not match {} precomputed distances".format(
+                len(partitions[0]), source.n
+            )
+        )
+
+    values = np.empty((len(criteria), len(partitions)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j, part in enumerate(partitions):
+            values[:, j] = PartitionStatistics(matrix, part, source, total).evaluate(plan)
+    return values
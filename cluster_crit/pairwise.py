@@ -0,0 +1,343 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+from .criteria import CriteriaInternal
+from .distance import condensedOffsets, pairIndices, rowBlocks
+
+
+class PairwiseStatistics:
+    '''Statistics of the distances between pairs of points of a partition.
+    The statistics are accumulated from blocks of pairs (see `update`) so that
+    the same code can consume cached distances or distances computed on the fly.
+
+    :param codes [vector] : cluster code (0-K-1) of every point.
+    :param k [int] : number of clusters.
+    :param pointSums [bool] : also accumulate the N x K sums of the distances
+    between every point and every cluster (used by Silhouette only).
+    '''
+
+    def __init__(self, codes, k, pointSums=True):
+        self.codes = np.asarray(codes)
+        self.n = len(self.codes)
+        self.k = k
+        self.counts = np.bincount(self.codes, minlength=k)
+
+        # sum of the distances between every point and every cluster
+        self.pointSums = np.zeros((self.n, k)) if pointSums else None
+        # min, max and sum of the distances between every pair of clusters,
+        # the diagonal holds the within-cluster values
+        self.pairMin = np.full((k, k), np.inf)
+        self.pairMax = np.full((k, k), -np.inf)
+        self.pairSum = np.zeros((k, k))
+
+    @classmethod
+    def fromBlocks(cls, blocks, codes, k, pointSums=True):
+        '''Accumulate the statistics from blocks of rows of the condensed
+        distances.
+
+        :param blocks [iterable] : (first row, last row + 1, distances) for
+        every block of rows, as returned by `distanceBlocks`.
+        :param codes [vector] : cluster code (0-K-1) of every point.
+        :param k [int] : number of clusters.
+        :param pointSums [bool] : see `PairwiseStatistics`.
+        '''
+        stats = cls(codes, k, pointSums)
+        offsets = condensedOffsets(stats.n)
+        for start, stop, d in blocks:
+            i, j = pairIndices(stats.n, start, stop, offsets)
+            stats.update(i, j, d)
+        stats.finalize()
+        return stats
+
+    @classmethod
+    def fromDistances(cls, distances, codes, k):
+        '''Accumulate the statistics from a condensed distance vector.
+
+        :param distances [vector] : condensed distances (see `pairwiseDistances`).
+        :param codes [vector] : cluster code (0-K-1) of every point.
+        :param k [int] : number of clusters.
+        '''
+        return cls.fromBlocks(condensedBlocks(distances, len(codes)), codes, k)
+
+    def update(self, i, j, d):
+        '''Add the distances of a block of pairs of points.
+
+        :param i [vector] : index of the first point of each pair.
+        :param j [vector] : index of the second point of each pair.
+        :param d [vector] : distance between the points of each pair.
+        '''
+        ci, cj = self.codes[i], self.codes[j]
+
+        if self.pointSums is not None:
+            self.pointSums += (
+                np.bincount(i * self.k + cj, d, self.n * self.k) +
+                np.bincount(j * self.k + ci, d, self.n * self.k)
+            ).reshape(self.n, self.k)
+
+        pair = np.minimum(ci, cj) * self.k + np.maximum(ci, cj)
+        np.minimum.at(self.pairMin.ravel(), pair, d)
+        np.maximum.at(self.pairMax.ravel(), pair, d)
+        self.pairSum += np.bincount(pair, d, self.k * self.k).reshape(self.k, self.k)
+
+    def finalize(self):
+        '''Mirror the upper triangle of the cluster pair statistics once every
+        block has been added.
+        '''
+        lower = np.tril_indices(self.k, -1)
+        for values in (self.pairMin, self.pairMax, self.pairSum):
+            values[lower] = values.T[lower]
+
+    @property
+    def nw(self):
+        '''Number of pairs of points in the same cluster'''
+        return int((self.counts * (self.counts - 1) // 2).sum())
+
+    @property
+    def nt(self):
+        '''Number of pairs of points'''
+        return self.n * (self.n - 1) // 2
+
+    @property
+    def nb(self):
+        '''Number of pairs of points in different clusters'''
+        return self.nt - self.nw
+
+    @property
+    def sw(self):
+        '''Sum of the within-cluster distances'''
+        return np.trace(self.pairSum)
+
+    @property
+    def sb(self):
+        '''Sum of the between-cluster distances'''
+        return self.pairSum[np.triu_indices(self.k, 1)].sum()
+
+    def betweenMask(self):
+        '''
+        :return: K x K mask selecting every pair of distinct clusters
+        '''
+        return ~np.eye(self.k, dtype=bool)
+
+
+def condensedBlocks(distances, n):
+    '''Split a condensed distance vector into blocks of rows.
+
+    :param distances [vector] : condensed distances (see `pairwiseDistances`).
+    :param n [int] : number of observations.
+
+    :return: generator of (first row, last row + 1, distances)
+    '''
+    offsets = condensedOffsets(n)
+    for start, stop in rowBlocks(n):
+        yield start, stop, distances[offsets[start]:offsets[stop]]
+
+
+# Number of bins of the histograms used to select the smallest distances
+SelectionBins = 4096
+
+
+def sumSmallest(blocks, count, capacity, largest=False):
+    '''Sum of the `count` smallest (or largest) distances without holding
+    every distance in memory. Each pass over the distances builds a histogram
+    of the values that may still be selected and narrows the search to the
+    bin holding the last selected value, until that bin is small enough to
+    be sorted (at most `capacity` values) or only contains ties.
+
+    :param blocks [callable] : returns a new iterable of distance vectors on every call.
+    :param count [int] : number of distances to select.
+    :param capacity [int] : number of candidate values that can be held in memory.
+    :param largest [bool] : select the largest distances rather than the smallest.
+
+    :return: sum of the selected distances
+    '''
+    if count <= 0:
+        return 0.0
+
+    sign = -1.0 if largest else 1.0
+
+    lo, hi = np.inf, -np.inf
+    for d in blocks():
+        if len(d):
+            v = sign * d
+            lo, hi = min(lo, v.min()), max(hi, v.max())
+
+    # each level narrows the candidates to a bin of the previous histogram
+    levels = []
+
+    def _classify(v):
+        region = np.ones(len(v), dtype=bool)
+        below = np.zeros(len(v), dtype=bool)
+        for (levelLo, levelHi, b) in levels:
+            idx = _binIndex(v, levelLo, levelHi)
+            below |= region & (idx < b)
+            region &= idx == b
+        return region, below
+
+    while True:
+        countBelow, sumBelow = 0, 0.0
+        counts = np.zeros(SelectionBins, dtype=np.int64)
+        sums = np.zeros(SelectionBins)
+        mins = np.full(SelectionBins, np.inf)
+        maxs = np.full(SelectionBins, -np.inf)
+
+        for d in blocks():
+            v = sign * d
+            region, below = _classify(v)
+            countBelow += int(below.sum())
+            sumBelow += v[below].sum()
+
+            r = v[region]
+            idx = _binIndex(r, lo, hi)
+            counts += np.bincount(idx, minlength=SelectionBins)
+            sums += np.bincount(idx, r, SelectionBins)
+            np.minimum.at(mins, idx, r)
+            np.maximum.at(maxs, idx, r)
+
+        need = count - countBelow
+        cumulative = np.cumsum(counts)
+        b = int(np.searchsorted(cumulative, need))
+        before = int(cumulative[b - 1]) if b else 0
+        selected = sumBelow + sums[:b].sum()
+        remaining = need - before
+
+        if remaining == counts[b]:
+            return sign * (selected + sums[b])
+
+        if mins[b] == maxs[b]:
+            return sign * (selected + remaining * mins[b])
+
+        if counts[b] <= capacity:
+            levels.append((lo, hi, b))
+            candidates = np.concatenate([(sign * d)[_classify(sign * d)[0]] for d in blocks()])
+            return sign * (selected + np.sort(candidates)[:remaining].sum())
+
+        levels.append((lo, hi, b))
+        lo, hi = mins[b], maxs[b]
+
+
+def _binIndex(v, lo, hi):
+    if hi <= lo:
+        return np.zeros(len(v), dtype=np.intp)
+    idx = ((v - lo) * (SelectionBins / (hi - lo))).astype(np.intp)
+    return np.clip(idx, 0, SelectionBins - 1)
+
+
+def _cIndex(ctx):
+    p = ctx.pairwise
+    smallest, largest = ctx.extremes
+    return (p.sw - smallest) / (largest - smallest)
+
+
+def _dunn(ctx):
+    p = ctx.pairwise
+    return p.pairMin[p.betweenMask()].min() / np.diag(p.pairMax).max()
+
+
+def _mcClainRao(ctx):
+    p = ctx.pairwise
+    return (p.sw / p.nw) / (p.sb / p.nb)
+
+
+def _pointBiserial(ctx):
+    p = ctx.pairwise
+    return (p.sw / p.nw - p.sb / p.nb) * np.sqrt(p.nw * p.nb) / p.nt
+
+
+def _silhouette(ctx):
+    p = ctx.pairwise
+    pointSums = ctx.get('pointSums')
+    own = pointSums[np.arange(p.n), p.codes]
+    # a point alone in its cluster has a silhouette width of 0
+    a = own / np.maximum(p.counts[p.codes] - 1, 1)
+
+    means = pointSums / p.counts
+    means[np.arange(p.n), p.codes] = np.inf
+    b = means.min(axis=1)
+
+    s = np.where(p.counts[p.codes] > 1, (b - a) / np.maximum(a, b), 0.0)
+    return np.mean(np.bincount(p.codes, s, p.k) / p.counts)
+
+
+def _betweenSingle(ctx):
+    return ctx.pairwise.pairMin
+
+
+def _betweenComplete(ctx):
+    return ctx.pairwise.pairMax
+
+
+def _betweenAverage(ctx):
+    p = ctx.pairwise
+    return p.pairSum / np.outer(p.counts, p.counts)
+
+
+def _betweenCentroid(ctx):
+    return ctx.scatter.centroidDistances()
+
+
+def _betweenWeighted(ctx):
+    s = ctx.scatter
+    sums = s.spread() * s.counts
+    return (sums[:, None] + sums[None, :]) / (s.counts[:, None] + s.counts[None, :])
+
+
+def _diameterMax(ctx):
+    return np.diag(ctx.pairwise.pairMax)
+
+
+def _diameterAverage(ctx):
+    p = ctx.pairwise
+    return 2.0 * np.diag(p.pairSum) / (p.counts * (p.counts - 1))
+
+
+def _diameterCentroid(ctx):
+    return 2.0 * ctx.scatter.spread()
+
+
+# between-cluster distances (delta) and diameters (Delta) of the GDI indices,
+# GDIuv uses the u-th between-cluster distance and the v-th diameter
+GDIBetween = (_betweenSingle, _betweenComplete, _betweenAverage, _betweenCentroid, _betweenWeighted)
+GDIDiameter = (_diameterMax, _diameterAverage, _diameterCentroid)
+
+
+def _gdi(u, v):
+    # the distances and diameters are intermediates shared by the GDI grid
+    # (see `cluster_crit.planner`)
+    def _index(ctx):
+        between = ctx.get('gdiBetween{}'.format(u))
+        mask = ~np.eye(len(between), dtype=bool)
+        return between[mask].min() / np.nanmax(ctx.get('gdiDiameter{}'.format(v)))
+    return _index
+
+
+PairwiseCriteria = {
+    CriteriaInternal.C_index: _cIndex,
+    CriteriaInternal.Dunn: _dunn,
+    CriteriaInternal.McClain_Rao: _mcClainRao,
+    CriteriaInternal.Point_Biserial: _pointBiserial,
+    CriteriaInternal.Silhouette: _silhouette,
+}
+PairwiseCriteria.update({
+    CriteriaInternal['GDI{}{}'.format(u, v)]: _gdi(u, v) for u in range(1, 6) for v in range(1, 4)
+})
@@ -0,0 +1,397 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import gc
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from . import session
+from .distance import Precomputed
+from .instrument import currentRecord, record
+from .scatter import asMatrix
+
+
+# Number of jobs submitted per worker so that the partitions are balanced
+# between the workers when some partitions are slower than others.
+ChunksPerWorker = 4
+
+# State of a worker process: the backend it evaluates with and the data set
+# currently attached from shared memory.
+_worker = {'backend': None, 'name': None, 'memory': None, 'data': None, 'context': None}
+
+
+def _initWorker(backend, offline):
+    '''Prepare a worker process. With the R backend the embedded R session,
+    the clusterCrit namespace and the R functions are loaded once here.
+    '''
+    _worker['backend'] = backend
+    if offline is not None:
+        session.setOffline(offline)
+
+    if backend == 'r':
+        try:
+            session.warmup()
+        except session.RUnavailableError:
+            # raised again, and returned to the caller, by the first job
+            pass
+
+
+def _detach():
+    '''Drop the data set attached by the worker.'''
+    memory = _worker['memory']
+    _worker['name'] = _worker['memory'] = _worker['data'] = _worker['context'] = None
+    if memory is not None:
+        gc.collect()
+        try:
+            memory.close()
+        except BufferError:
+            # a view is still alive, the mapping is released with the process
+            pass
+
+
+def _attach(name, shape, dtype, wrap=True):
+    '''Map the shared observations of the evaluator. The data set stays
+    attached between jobs, so it is converted (and copied into R) only once
+    per worker. Arrays that are not observations (`wrap` false) are never
+    wrapped in a `Dataset`.
+    '''
+    if _worker['name'] == name:
+        return _worker['data']
+
+    from multiprocessing import shared_memory
+    from .dataset import Dataset
+
+    _detach()
+    memory = shared_memory.SharedMemory(name=name)
+    data = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+    data.flags.writeable = False
+
+    _worker['name'], _worker['memory'] = name, memory
+    _worker['data'] = Dataset(data) if wrap and _worker['backend'] == 'r' else data
+    return _worker['data']
+
+
+def _evaluate(name, shape, dtype, partitions, criteria, maxMemory, metric='euclidean'):
+    '''Job run by a worker: compute the criteria of a chunk of partitions.'''
+    from .cluster import intCriteriaBatch
+
+    data = _attach(name, shape, dtype, wrap=metric != Precomputed)
+    return intCriteriaBatch(
+        data, partitions, criteria, _worker['backend'], maxMemory, metric=metric
+    ).values
+
+
+def _agreement(name, shape, dtype, sizes, together, start, stop, criteria):
+    '''Job run by a worker: compare a block of rows of the agreement matrix.'''
+    from .contingency import agreementRows
+
+    codes = _attach(name, shape, dtype, wrap=False)
+    return agreementRows(codes, sizes, together, start, stop, criteria)
+
+
+def _sweep(name, shape, dtype, clusterer, k, criteria, maxMemory, metric='euclidean'):
+    '''Job run by a worker: cluster the observations for k clusters and evaluate
+    the partition. The statistics that do not depend on k are computed by the
+    first job of the worker and reused by the next ones.
+    '''
+    from .selection import SweepContext
+
+    data = _attach(name, shape, dtype, wrap=metric != Precomputed)
+    context = _worker['context']
+    if context is None or context.criteria != criteria:
+        context = _worker['context'] = SweepContext(data, criteria, _worker['backend'], maxMemory, metric)
+    return context.cluster(clusterer, k)
+
+
+def _clusterSubset(name, shape, dtype, clusterer, k, index):
+    '''Job run by a worker: cluster a subset of the shared observations.'''
+    data = _attach(name, shape, dtype, wrap=False)
+    return np.asarray(clusterer(data[index], k))
+
+
+def _share(data, rec):
+    '''Copy an array into a new block of shared memory.
+
+    :return: SharedMemory, to be closed and unlinked by the caller
+    '''
+    from multiprocessing import shared_memory
+
+    memory = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    with rec.phase('conversion'):
+        shared = np.ndarray(data.shape, dtype=data.dtype, buffer=memory.buf)
+        shared[:] = data
+        del shared
+    return memory
+
+
+class ParallelEvaluator:
+    '''Pool of worker processes that evaluate the criteria of many partitions
+    in parallel. The embedded R session is single threaded and shared by the
+    whole process, so every worker starts its own R session and loads the R
+    functions once. The observations are copied once into shared memory and
+    mapped by the workers rather than pickled with every job.
+
+    The workers are started with the `spawn` method because the embedded R
+    session cannot be safely forked. The evaluator can be used as a context
+    manager and should be closed when it is no longer needed.
+
+    :param nJobs [int] : number of worker processes, every core when not provided.
+    :param backend [string] : `r` (default) or `numpy`, see `intCriteria`.
+    :param offline [bool] : offline mode of the workers (see `setOffline`).
+    '''
+
+    def __init__(self, nJobs=None, backend='r', offline=None):
+        from .cluster import Backends
+
+        if backend not in Backends:
+            raise ValueError("unknown backend '{}', expected one of {}".format(backend, Backends))
+
+        self.nJobs = nJobs or os.cpu_count() or 1
+        self.backend = backend
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.nJobs,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_initWorker,
+            initargs=(backend, offline),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        '''Stop the worker processes.'''
+        self._pool.shutdown()
+
+    def intCriteriaBatch(self, traj, partitions, crit, maxMemory=None, metric='euclidean'):
+        '''Calculate internal clustering criteria for several partitions of the
+        same data set, spreading the partitions over the workers.
+
+        :param traj [matrix] : the matrix of observations (trajectories) or a `Dataset`.
+        :param partitions [matrix] : list of partition vectors, or a 2-D array with
+        one partition per row.
+        :param crit [vector] : a list containing CriteriaInternal indices to compute
+        :param maxMemory [int] : see `intCriteria`, the limit applies to each worker.
+        :param metric [string] : see `intCriteria`, a callable metric must be picklable.
+        The precomputed distances are copied into shared memory like the observations.
+
+        :return: pandas.DataFrame with one row per criterion and one column per partition
+        '''
+        import pandas as pd
+        from .cluster import _asPartitions, _resolveCriteria, _validateBackend, _validateMetric
+        from .criteria import CriteriaInternal
+        from .native import NativeCriteria
+
+        _criteria = _resolveCriteria(crit, CriteriaInternal)
+
+        if not _criteria:
+            return None
+
+        _validateBackend(self.backend, NativeCriteria, _criteria, maxMemory)
+        _validateMetric(self.backend, metric, _criteria)
+
+        data = np.asarray(traj) if metric == Precomputed else asMatrix(traj)
+        partitions = _asPartitions(partitions)
+        chunks = np.array_split(
+            np.arange(len(partitions)), min(len(partitions), self.nJobs * ChunksPerWorker)
+        )
+
+        indices = [x.name for x in _criteria]
+        with record('ParallelEvaluator.intCriteriaBatch', self.backend, data, partitions,
+                    indices, len(partitions), metric) as rec:
+            memory = _share(data, rec)
+            try:
+                with rec.phase('compute'):
+                    futures = [
+                        self._pool.submit(
+                            _evaluate, memory.name, data.shape, data.dtype.str,
+                            partitions[chunk], _criteria, maxMemory, metric
+                        )
+                        for chunk in chunks
+                    ]
+                    values = np.concatenate([f.result() for f in futures], axis=1)
+            finally:
+                memory.close()
+                memory.unlink()
+
+        return pd.DataFrame(values, index=indices)
+
+    def extCriteriaMatrix(self, partitions, crit):
+        '''Calculate external clustering criteria between every pair of partitions
+        of an ensemble, spreading the rows of the upper triangle over the workers.
+        The cluster codes of the partitions are copied once into shared memory, so
+        every worker holds a single copy of the ensemble whatever the number of jobs.
+
+        :param partitions [matrix] : list of partition vectors, or a 2-D array with
+        one partition per row.
+        :param crit [vector] : a list containing CriteriaExternal indices to compute
+
+        :return: Map of the criteria to a pandas.DataFrame of M x M values, see `extCriteriaMatrix`
+        '''
+        import pandas as pd
+        from .cluster import _asPartitions, _resolveCriteria
+        from .contingency import agreementMatrices, partitionCodes
+        from .criteria import CriteriaExternal
+        from .distance import rowBlocks
+
+        _criteria = _resolveCriteria(crit, CriteriaExternal)
+
+        if not _criteria:
+            return None
+
+        partitions = _asPartitions(partitions)
+        m = len(partitions)
+        indices = [x.name for x in _criteria]
+
+        with record('ParallelEvaluator.extCriteriaMatrix', 'numpy', part=partitions,
+                    criteria=indices, partitions=m) as rec:
+            with rec.phase('compute'):
+                codes, sizes, together = partitionCodes(partitions)
+
+            # blocks of rows holding about the same number of pairs
+            pairs = m * (m - 1) // 2
+            blocks = rowBlocks(m, max(1, pairs // (self.nJobs * ChunksPerWorker)))
+
+            memory = _share(codes, rec)
+            try:
+                with rec.phase('compute'):
+                    futures = [
+                        self._pool.submit(
+                            _agreement, memory.name, codes.shape, codes.dtype.str,
+                            sizes, together, start, stop, _criteria
+                        )
+                        for start, stop in blocks
+                    ]
+                    results = [f.result() for f in futures]
+            finally:
+                memory.close()
+                memory.unlink()
+
+            empty = np.empty((len(_criteria), 0))
+            upper = np.concatenate([empty] + [u for u, _ in results], axis=1)
+            lower = np.concatenate([empty] + [l for _, l in results], axis=1)
+            values = agreementMatrices(upper, lower, codes, together, _criteria)
+
+        return {name: pd.DataFrame(v) for name, v in zip(indices, values)}
+
+    def sweepK(self, traj, clusterer, ks, criteria, maxMemory=None, patience=None, rows=(), rules=(),
+               metric='euclidean'):
+        '''Cluster the observations and evaluate the criteria for every value of
+        `ks`, one job per value, see `cluster_crit.selection.sweepK`. At most two
+        jobs per worker are pending so that few clusterings are wasted when the
+        sweep stops early.
+
+        :param traj [matrix] : the matrix of observations (trajectories) or a `Dataset`.
+        :param clusterer [callable] : picklable callable, see `sweepK`.
+        :param ks [vector] : the numbers of clusters in increasing order.
+        :param criteria [vector] : list of CriteriaInternal members
+        :param maxMemory [int] : see `intCriteria`, the limit applies to each worker.
+        :param patience [int] : see `sweepK`.
+        :param rows [vector] : rows of the criteria watched by the early stopping rule.
+        :param rules [vector] : the `BestRule` of the watched criteria.
+        :param metric [string] : see `intCriteria`, a callable metric must be picklable.
+
+        :return: generator of (k, pandas.Series of the values indexed by criterion)
+        '''
+        import pandas as pd
+        from concurrent.futures import FIRST_COMPLETED, wait
+        from .selection import hasPeaked
+
+        indices = [x.name for x in criteria]
+        data = np.asarray(traj) if metric == Precomputed else asMatrix(traj)
+        memory = _share(data, currentRecord())
+        pending, done, values = {}, {}, []
+        try:
+            remaining = iter(ks)
+            while True:
+                for k in remaining:
+                    pending[self._pool.submit(
+                        _sweep, memory.name, data.shape, data.dtype.str, clusterer, k, criteria,
+                        maxMemory, metric
+                    )] = k
+                    if len(pending) >= 2 * self.nJobs:
+                        break
+                if not pending:
+                    return
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done[pending.pop(future)] = future.result()
+
+                # yield in increasing order of k, the early stopping rule needs
+                # every value below the last one
+                while ks[len(values)] in done:
+                    k = ks[len(values)]
+                    values.append(done.pop(k))
+                    yield k, pd.Series(values[-1], index=indices)
+                    if len(values) == len(ks):
+                        return
+                    if patience is not None and hasPeaked(np.transpose(values)[rows], rules, patience):
+                        return
+        finally:
+            for future in pending:
+                future.cancel()
+            wait(pending)
+            memory.close()
+            memory.unlink()
+
+    def clusterSubsets(self, traj, clusterer, jobs):
+        '''Run a clustering algorithm on subsets of the observations, one job per
+        subset. The observations are copied once into shared memory and only the
+        index of each subset is sent to the workers. At most two jobs per worker
+        are pending, so the memory does not grow with the number of jobs.
+
+        :param traj [matrix] : the matrix of observations (trajectories).
+        :param clusterer [callable] : picklable callable, called as `clusterer(traj, k)`
+        with the observations of a subset.
+        :param jobs [iterable] : (k, index vector of the subset) of every job.
+
+        :return: generator of the partition vectors, in the order of `jobs`
+        '''
+        from collections import deque
+        from concurrent.futures import wait
+
+        data = asMatrix(traj)
+        memory = _share(data, currentRecord())
+        futures = deque()
+        try:
+            remaining = iter(jobs)
+            while True:
+                for k, index in remaining:
+                    futures.append(self._pool.submit(
+                        _clusterSubset, memory.name, data.shape, data.dtype.str, clusterer, k, index
+                    ))
+                    if len(futures) >= 2 * self.nJobs:
+                        break
+                if not futures:
+                    return
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            memory.close()
+            memory.unlink()
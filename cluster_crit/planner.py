@@ -0,0 +1,128 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from .concordance import ConcordanceCounts, ConcordanceCriteria
+from .criteria import CriteriaInternal
+from .pairwise import GDIBetween, GDIDiameter, PairwiseCriteria, PairwiseStatistics
+from .scatter import ScatterCriteria, ScatterStatistics, factorize
+
+
+def _pairwise(ctx):
+    # the N x K point sums are only accumulated when they are planned
+    codes, labels = ctx.codes
+    return PairwiseStatistics.fromBlocks(
+        ctx.source.blocks(), codes, len(labels), pointSums=ctx.planned('pointSums')
+    )
+
+
+def _pointSums(ctx):
+    if ctx.pairwise.pointSums is not None:
+        return ctx.pairwise.pointSums
+    # the pairwise statistics were computed outside of a plan needing the sums
+    codes, labels = ctx.codes
+    return PairwiseStatistics.fromBlocks(ctx.source.blocks(), codes, len(labels)).pointSums
+
+
+def _concordance(ctx):
+    codes, _ = ctx.codes
+    return ConcordanceCounts.fromBlocks(ctx.source.blocks, codes, ctx.source.maxMemory)
+
+
+# Intermediate statistics shared by the criteria: name -> (names of the
+# intermediates it is computed from, function of the `PartitionStatistics`).
+# Every intermediate is computed at most once per partition.
+Intermediates = {
+    'codes': ((), lambda ctx: factorize(ctx.part)),
+    'scatter': ((), lambda ctx: ScatterStatistics(ctx.traj, ctx.part, ctx.total)),
+    'pairwise': (('codes',), _pairwise),
+    'pointSums': (('pairwise',), _pointSums),
+    'concordance': (('codes',), _concordance),
+    'extremes': (('pairwise',), lambda ctx: ctx.source.sumExtremes(ctx.pairwise.nw)),
+    'centroidDistances': (('scatter',), lambda ctx: ctx.scatter.centroidDistances()),
+    'pointCentroidDistances': (('scatter',), lambda ctx: ctx.scatter.pointCentroidDistances()),
+    'spread': (('pointCentroidDistances',), lambda ctx: ctx.scatter.spread()),
+    'variances': (('scatter',), lambda ctx: ctx.scatter.variances()),
+}
+
+# the 5 between-cluster distances and the 3 diameters of the GDI grid
+_betweenRequires = (('pairwise',), ('pairwise',), ('pairwise',), ('centroidDistances',), ('spread',))
+_diameterRequires = (('pairwise',), ('pairwise',), ('spread',))
+for _u, (_function, _requires) in enumerate(zip(GDIBetween, _betweenRequires), 1):
+    Intermediates['gdiBetween{}'.format(_u)] = (_requires, _function)
+for _v, (_function, _requires) in enumerate(zip(GDIDiameter, _diameterRequires), 1):
+    Intermediates['gdiDiameter{}'.format(_v)] = (_requires, _function)
+
+
+# Intermediates needed by each criterion of the numpy backend
+Requirements = {c: ('scatter',) for c in ScatterCriteria}
+Requirements.update({
+    CriteriaInternal.Davies_Bouldin: ('spread',),
+    CriteriaInternal.PBM: ('pointCentroidDistances', 'centroidDistances'),
+    CriteriaInternal.Ray_Turi: ('centroidDistances',),
+    CriteriaInternal.SD_Scat: ('variances',),
+    CriteriaInternal.SD_Dis: ('centroidDistances',),
+    CriteriaInternal.S_Dbw: ('variances',),
+})
+Requirements.update({c: ('pairwise',) for c in PairwiseCriteria})
+Requirements[CriteriaInternal.C_index] = ('pairwise', 'extremes')
+Requirements[CriteriaInternal.Silhouette] = ('pairwise', 'pointSums')
+Requirements.update({
+    CriteriaInternal['GDI{}{}'.format(u, v)]: ('gdiBetween{}'.format(u), 'gdiDiameter{}'.format(v))
+    for u in range(1, 6) for v in range(1, 4)
+})
+Requirements.update({c: ('concordance',) for c in ConcordanceCriteria})
+
+
+class Plan:
+    '''Order in which the intermediate statistics of a set of criteria are
+    computed. The intermediates needed by the criteria, and the ones they are
+    computed from, form a graph that is walked once in dependency order, so
+    that every intermediate is computed once however many criteria use it.
+    Evaluating every criterion costs about as much as the most expensive
+    intermediate rather than the sum of the criteria.
+
+    :param criteria [vector] : list of CriteriaInternal members found in `Requirements`.
+    '''
+
+    def __init__(self, criteria):
+        self.criteria = list(criteria)
+        self.steps = []
+        for c in self.criteria:
+            for name in Requirements[c]:
+                self._visit(name)
+
+    def __repr__(self):
+        return 'Plan({})'.format(' -> '.join(self.steps))
+
+    def _visit(self, name):
+        if name in self.steps:
+            return
+        for required in Intermediates[name][0]:
+            self._visit(required)
+        self.steps.append(name)
+
+
+# Criteria computed from the coordinates of the observations (centroids and
+# scatter matrices) rather than from the distances between them. They cannot
+# be computed from precomputed distances, and always use the Euclidean geometry.
+CoordinateCriteria = frozenset(c for c in Requirements if 'scatter' in Plan([c]).steps)
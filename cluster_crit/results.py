@@ -0,0 +1,206 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+# Approximate number of bytes held by one entry of the memory tier: the key,
+# the value and the bookkeeping of the ordered dictionary
+EntryBytes = 200
+
+# Default size of the memory tier
+DefaultResultBytes = 64 << 20
+
+# Name of the sqlite database of the disk tier
+DatabaseName = 'results.sqlite'
+
+
+def digest(*values):
+    '''Content hash of strings and arrays. Arrays are hashed from their bytes,
+    shape and type, so equal data gives the same digest whatever its origin.
+
+    :param values : strings, numpy arrays or values convertible to arrays
+    (lists of labels, `Dataset` handles).
+
+    :return: hexadecimal digest
+    '''
+    h = hashlib.blake2b(digest_size=20)
+    for value in values:
+        if isinstance(value, str):
+            h.update(b's' + value.encode())
+            continue
+
+        array = np.ascontiguousarray(value)
+        h.update('a{}{}'.format(array.dtype.str, array.shape).encode())
+        if array.dtype.kind == 'O':
+            h.update(repr(array.tolist()).encode())
+        else:
+            h.update(array.data)
+    return h.hexdigest()
+
+
+class ResultCache:
+    '''Cache of criteria values keyed by the content of the data: the bytes of
+    the observations (or partitions), the labels, the backend and the name of
+    the criterion. Values are kept in a least recently used memory tier and,
+    when a directory is given, in a sqlite database that persists between
+    processes. Pass the cache to `intCriteria` or `extCriteria` as `resultCache`.
+
+    :param maxBytes [int] : approximate size of the memory tier.
+    :param directory [string] : directory of the disk tier, no disk tier when not provided.
+    '''
+
+    def __init__(self, maxBytes=DefaultResultBytes, directory=None):
+        self.maxBytes = maxBytes
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._db = None
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(
+                os.path.join(directory, DatabaseName), check_same_thread=False
+            )
+            with self._db:
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value REAL)'
+                )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def nbytes(self):
+        '''
+        :return: approximate size of the memory tier
+        '''
+        return len(self._entries) * EntryBytes
+
+    def scope(self, *values):
+        '''Key prefix shared by the criteria of one evaluation.
+
+        :param values : the evaluation kind, the backend and the data (see `digest`).
+
+        :return: key prefix
+        '''
+        return digest(*values)
+
+    def fetch(self, scope, names, compute):
+        '''Look up the values of the criteria, computing only the missing ones.
+
+        :param scope [string] : key prefix returned by `scope`.
+        :param names [vector] : names of the criteria.
+        :param compute [callable] : computes the values of a list of names, in order.
+
+        :return: list of values in the same order as `names`
+        '''
+        keys = ['{}:{}'.format(scope, name) for name in names]
+        found = self._get(keys)
+
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            values = compute([names[i] for i in missing])
+            computed = {keys[i]: _asFloat(v) for i, v in zip(missing, values)}
+            self._put(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def clear(self, disk=False):
+        '''Remove every entry from the memory tier.
+
+        :param disk [bool] : also remove every entry from the disk tier.
+        '''
+        with self._lock:
+            self._entries.clear()
+            if disk and self._db is not None:
+                with self._db:
+                    self._db.execute('DELETE FROM results')
+
+    def close(self):
+        '''Close the disk tier. The memory tier can still be used.'''
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _get(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+
+            remaining = [key for key in keys if key not in found]
+            if remaining and self._db is not None:
+                rows = self._db.execute(
+                    'SELECT key, value FROM results WHERE key IN ({})'.format(
+                        ', '.join('?' * len(remaining))
+                    ),
+                    remaining,
+                ).fetchall()
+                # sqlite stores NaN as NULL
+                stored = {key: math.nan if value is None else value for key, value in rows}
+                found.update(stored)
+                self._remember(stored)
+        return found
+
+    def _put(self, values):
+        with self._lock:
+            self._remember(values)
+            if self._db is not None:
+                with self._db:
+                    self._db.executemany(
+                        'INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)',
+                        [(key, None if math.isnan(v) else v) for key, v in values.items()],
+                    )
+
+    def _remember(self, values):
+        self._entries.update(values)
+        for key in values:
+            self._entries.move_to_end(key)
+        while self._entries and len(self._entries) * EntryBytes > self.maxBytes:
+            self._entries.popitem(last=False)
+
+
+def _asFloat(value):
+    return math.nan if value is None else float(value)
@@ -0,0 +1,118 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+from collections import namedtuple
+import numpy as np
+from .scatter import asMatrix, factorize
+
+
+# Number of bootstrap resamples of the repeated estimates used to build the
+# confidence interval of their mean
+BootstrapResamples = 1000
+
+
+Estimate = namedtuple('Estimate', ['value', 'lower', 'upper'])
+Estimate.__doc__ = '''Approximate value of a criterion: the mean of the values found on
+every subsample and the bounds of its confidence interval.'''
+
+
+def stratifiedSample(codes, size, rng):
+    '''Draw a random subsample that preserves the proportion of each cluster.
+    Every cluster keeps at least two points (when it has them) so that its
+    within-cluster distances remain defined.
+
+    :param codes [vector] : cluster code (0-K-1) of every point.
+    :param size [int] : number of points to draw.
+    :param rng [Generator] : numpy random generator.
+
+    :return: sorted vector of the indices of the selected points
+    '''
+    codes = np.asarray(codes)
+    n = len(codes)
+    counts = np.bincount(codes)
+
+    # largest remainder apportionment of `size` between the clusters
+    quota = size * counts / n
+    taken = np.floor(quota).astype(np.int64)
+    short = size - taken.sum()
+    if short > 0:
+        taken[np.argsort(taken - quota)[:short]] += 1
+    taken = np.minimum(np.maximum(taken, np.minimum(2, counts)), counts)
+
+    # shuffle, then group by cluster, and keep the first points of each cluster
+    order = rng.permutation(n)
+    order = order[np.argsort(codes[order], kind='stable')]
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    sortedCodes = codes[order]
+    rank = np.arange(n) - offsets[sortedCodes]
+    return np.sort(order[rank < taken[sortedCodes]])
+
+
+def _estimate(values, confidence, rng):
+    value = values.mean()
+    if len(values) < 2:
+        return Estimate(value, value, value)
+
+    means = rng.choice(values, (BootstrapResamples, len(values))).mean(axis=1)
+    alpha = (1.0 - confidence) / 2.0
+    lower, upper = np.quantile(means, [alpha, 1.0 - alpha])
+    return Estimate(value, lower, upper)
+
+
+def approximateCriteria(traj, part, criteria, evaluate, sampleSize, nRepeats=10,
+                        seed=None, confidence=0.95):
+    '''Approximate internal criteria by evaluating them on `nRepeats`
+    stratified subsamples of `sampleSize` points. When the data set is not
+    larger than `sampleSize` the criteria are computed exactly.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param part [vector] : the partition vector.
+    :param criteria [vector] : list of CriteriaInternal members.
+    :param evaluate [callable] : computes the criteria of (traj, part), where
+    part contains the cluster numbers 1-K, and returns their values in the
+    order of `criteria`.
+    :param sampleSize [int] : number of points in each subsample.
+    :param nRepeats [int] : number of subsamples.
+    :param seed [int] : seed of the random generator.
+    :param confidence [float] : confidence level of the intervals.
+
+    :return: list of `Estimate` in the same order as `criteria`
+    '''
+    matrix = asMatrix(traj)
+    codes, _ = factorize(part)
+    rng = np.random.default_rng(seed)
+
+    if len(codes) <= sampleSize:
+        nRepeats = 1
+
+    values = np.empty((nRepeats, len(criteria)))
+    for r in range(nRepeats):
+        if len(codes) <= sampleSize:
+            sample = np.arange(len(codes))
+        else:
+            sample = stratifiedSample(codes, sampleSize, rng)
+        # renumber the clusters in case a cluster is missing from the subsample
+        _, sampleCodes = np.unique(codes[sample], return_inverse=True)
+        values[r] = evaluate(matrix[sample], sampleCodes.ravel() + 1)
+
+    return [_estimate(values[:, c], confidence, rng) for c in range(len(criteria))]
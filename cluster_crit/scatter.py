@@ -0,0 +1,522 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import functools
+import numpy as np
+from .criteria import CriteriaInternal
+
+
+# Upper bound on the number of distances computed at once when the smallest
+# between-cluster point distance is needed (Xie_Beni).
+BlockEntries = 1 << 22
+
+
+def _memoized(method):
+    '''Compute the statistic on first use and keep it for the following
+    calls, so that every criterion sharing it reuses the same value.
+    '''
+    @functools.wraps(method)
+    def _statistic(self):
+        if method.__name__ not in self._memo:
+            self._memo[method.__name__] = method(self)
+        return self._memo[method.__name__]
+    return _statistic
+
+
+# Floating point types of the observations that are used without conversion.
+# float32 observations take half the memory, the statistics are still
+# accumulated in float64.
+CompactTypes = (np.float32, np.float64)
+
+
+def factorize(part):
+    '''Convert a partition vector into contiguous cluster codes. The labels
+    can be any sortable values: integers of any width and starting value,
+    strings, ... Integer labels spanning a small range are mapped with a
+    lookup table in O(N), other labels are sorted.
+
+    :param part [vector] : the partition vector.
+
+    :return: tuple of (codes, labels) where codes is an integer array with
+    values 0-K-1 and labels contains the original label of each code.
+    '''
+    part = np.asarray(part).ravel()
+
+    if part.dtype.kind in 'iu' and len(part):
+        low = part.min()
+        span = int(part.max()) - int(low) + 1
+        if span <= 2 * len(part):
+            # widen the narrow signed types so that the offsets cannot overflow
+            base = part.astype(np.int64) if part.dtype.kind == 'i' else part
+            offsets = (base - low).astype(np.intp)
+            present = np.bincount(offsets, minlength=span) > 0
+            codes = (np.cumsum(present) - 1)[offsets]
+            labels = np.empty(int(present.sum()), dtype=part.dtype)
+            labels[codes] = part
+            return codes, labels
+
+    labels, codes = np.unique(part, return_inverse=True)
+    return codes.ravel(), labels
+
+
+def asMatrix(traj):
+    '''Convert the observations to a 2-D floating point matrix. float32 and
+    float64 observations are used as they are, other types are converted to
+    float64. 1-D data sets are treated as a single column of observations.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+
+    :return: numpy array with shape (N, p)
+    '''
+    traj = np.asarray(traj)
+    if traj.dtype.type not in CompactTypes:
+        traj = traj.astype(np.float64)
+    if traj.ndim == 1:
+        traj = traj.reshape(-1, 1)
+    return traj
+
+
+def rowChunks(traj):
+    '''Split the observations into blocks of rows converted to float64, so
+    that float32 observations are never converted all at once.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+
+    :return: generator of (first row, float64 block of rows)
+    '''
+    rows = max(1, BlockEntries // max(traj.shape[1], 1))
+    for start in range(0, traj.shape[0], rows):
+        yield start, traj[start:start + rows].astype(np.float64, copy=False)
+
+
+def totalScatter(traj):
+    '''Barycenter and total scatter matrix (T) of the observations.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+
+    :return: tuple of (center, T)
+    '''
+    traj = asMatrix(traj)
+    center = traj.mean(axis=0, dtype=np.float64)
+    t = np.zeros((traj.shape[1], traj.shape[1]))
+    for _, block in rowChunks(traj):
+        centered = block - center
+        t += centered.T @ centered
+    return center, t
+
+
+class ScatterStatistics:
+    '''Centroids and scatter matrices of a single partition. All values are
+    computed once so that every criterion of the scatter family can be derived
+    from the same set of statistics.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param part [vector] : the partition vector.
+    :param total [tuple] : optional (center, T) of the observations as returned
+    by `totalScatter`. These do not depend on the partition and can be shared
+    between partitions of the same data set.
+    '''
+
+    def __init__(self, traj, part, total=None):
+        self.traj = asMatrix(traj)
+        self.codes, self.labels = factorize(part)
+
+        if len(self.codes) != self.traj.shape[0]:
+            raise ValueError(
+                "partition length {} does not match the number of observations {}".format(
+                    len(self.codes), self.traj.shape[0]
+                )
+            )
+
+        self.n, self.p = self.traj.shape
+        self.k = len(self.labels)
+        self.counts = np.bincount(self.codes, minlength=self.k)
+
+        # sort the observations by cluster so that every cluster is a contiguous
+        # block of rows that can be reduced at once
+        self.order = np.argsort(self.codes, kind="stable")
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)))
+        ordered = self.traj[self.order]
+
+        center, t = total if total is not None else totalScatter(self.traj)
+        centroids = np.add.reduceat(ordered, self.offsets[:-1], axis=0, dtype=np.float64) / self.counts[:, None]
+
+        # within-group scatter matrix of each cluster (WG{k})
+        wgk = np.empty((self.k, self.p, self.p))
+        for i in range(self.k):
+            centered = ordered[self.offsets[i]:self.offsets[i + 1]] - centroids[i]
+            wgk[i] = centered.T @ centered
+
+        self._setMoments(centroids, wgk, center, t)
+
+    @classmethod
+    def fromMoments(cls, counts, centroids, wgk, center, t):
+        '''Build the statistics from the cluster sizes, barycenters and scatter
+        matrices without the observations. Criteria that need the individual
+        observations (PBM, Xie_Beni) cannot be computed from these statistics.
+
+        :param counts [vector] : size of each cluster.
+        :param centroids [matrix] : K x p barycenters of the clusters.
+        :param wgk [array] : K x p x p within-group scatter matrix of each cluster.
+        :param center [vector] : barycenter of the observations.
+        :param t [matrix] : total scatter matrix of the observations.
+
+        :return: ScatterStatistics
+        '''
+        stats = cls.__new__(cls)
+        stats.traj = stats.codes = stats.labels = None
+        stats.counts = np.asarray(counts)
+        stats.n = int(stats.counts.sum())
+        stats.k, stats.p = np.shape(centroids)
+        stats._setMoments(np.asarray(centroids), np.asarray(wgk), np.asarray(center), np.asarray(t))
+        return stats
+
+    def _setMoments(self, centroids, wgk, center, t):
+        '''Derive the group matrices and their traces from the barycenters and
+        the scatter matrices of the clusters.
+        '''
+        self._memo = {}
+        self.centroids = centroids
+        self.wgk = wgk
+        self.center = center
+        self.t = t
+
+        self.wg = self.wgk.sum(axis=0)
+        diff = self.centroids - self.center
+        self.bg = (diff * self.counts[:, None]).T @ diff
+
+        self.wgssk = np.trace(self.wgk, axis1=1, axis2=2)
+        self.wgss = self.wgssk.sum()
+        self.bgss = np.trace(self.bg)
+
+    @_memoized
+    def centroidDistances(self):
+        '''Euclidean distances between every pair of cluster barycenters.
+
+        :return: K x K matrix of distances
+        '''
+        diff = self.centroids[:, None, :] - self.centroids[None, :, :]
+        return np.sqrt((diff ** 2).sum(axis=-1))
+
+    def centroidSeparation(self):
+        '''Distances between the barycenters of distinct clusters.
+
+        :return: condensed vector of the K(K-1)/2 barycenter distances
+        '''
+        return self.centroidDistances()[np.triu_indices(self.k, 1)]
+
+    @_memoized
+    def pointCentroidDistances(self):
+        '''Distance of each observation to the barycenter of its own cluster.
+
+        :return: vector of N distances
+        '''
+        distances = np.empty(self.n)
+        for start, block in rowChunks(self.traj):
+            stop = start + len(block)
+            distances[start:stop] = np.sqrt(((block - self.centroids[self.codes[start:stop]]) ** 2).sum(axis=1))
+        return distances
+
+    @_memoized
+    def spread(self):
+        '''Mean distance of the points of each cluster to its barycenter.
+
+        :return: vector of K mean distances
+        '''
+        return np.bincount(self.codes, self.pointCentroidDistances(), self.k) / self.counts
+
+    @_memoized
+    def variances(self):
+        '''Variance of every variable within each cluster, V{k}.
+
+        :return: K x p matrix of variances
+        '''
+        return np.diagonal(self.wgk, axis1=1, axis2=2) / self.counts[:, None]
+
+    def centroidBlocks(self, centers=None):
+        '''Distances between the observations and a set of centers, by blocks
+        of rows so that the N x K matrix is never held in memory.
+
+        :param centers [matrix] : the centers, the cluster barycenters by default.
+
+        :return: generator of (first row, last row + 1, distances)
+        '''
+        centers = self.centroids if centers is None else centers
+        norms = (centers ** 2).sum(axis=1)
+        rows = max(1, BlockEntries // len(centers))
+        for start in range(0, self.n, rows):
+            block = self.traj[start:start + rows].astype(np.float64, copy=False)
+            sq = (block ** 2).sum(axis=1)[:, None] + norms[None, :] - 2.0 * (block @ centers.T)
+            yield start, start + len(block), np.sqrt(np.maximum(sq, 0.0))
+
+    def minBetweenSqDistance(self):
+        '''Smallest squared distance between two points that do not belong
+        to the same cluster. The distance matrix is walked in blocks of rows
+        so the full N x N matrix is never held in memory.
+
+        :return: smallest squared between-cluster distance
+        '''
+        norms = np.einsum('ij,ij->i', self.traj, self.traj, dtype=np.float64)
+        best = np.inf
+        rows = max(1, BlockEntries // self.n)
+        for start in range(0, self.n, rows):
+            stop = min(start + rows, self.n)
+            block = self.traj[start:stop].astype(np.float64, copy=False)
+            for other, columns in rowChunks(self.traj):
+                last = other + len(columns)
+                sq = norms[start:stop, None] + norms[None, other:last] - 2.0 * (block @ columns.T)
+                sq[self.codes[start:stop, None] == self.codes[None, other:last]] = np.inf
+                best = min(best, sq.min(initial=np.inf))
+        return max(best, 0.0)
+
+
+def daviesBouldin(centroids, spread):
+    '''Davies-Bouldin index from the barycenters of the clusters and the mean
+    distance of the points of each cluster to its barycenter.
+
+    :param centroids [matrix] : K x p barycenters of the clusters.
+    :param spread [vector] : mean distance of the points of each cluster to its barycenter.
+
+    :return: mean over the clusters of the largest (d_k + d_k') / D_kk'
+    '''
+    diff = centroids[:, None, :] - centroids[None, :, :]
+    separation = np.sqrt((diff ** 2).sum(axis=-1))
+    np.fill_diagonal(separation, np.nan)
+    ratios = (spread[:, None] + spread[None, :]) / separation
+    return np.mean(np.nanmax(ratios, axis=1))
+
+
+def _daviesBouldin(s):
+    return daviesBouldin(s.centroids, s.spread())
+
+
+def _sdScat(s):
+    total = np.diag(s.t) / s.n
+    return np.mean(np.linalg.norm(s.variances(), axis=1)) / np.linalg.norm(total)
+
+
+def _sdDis(s):
+    distances = s.centroidDistances()
+    separation = s.centroidSeparation()
+    return separation.max() / separation.min() * np.sum(1.0 / distances.sum(axis=1))
+
+
+def densityRadius(s):
+    '''Radius of the neighbourhoods used by S_Dbw: the square root of the summed
+    norms of the cluster variance vectors, divided by K.
+    '''
+    return np.sqrt(np.linalg.norm(s.variances(), axis=1).sum()) / s.k
+
+
+def sDbw(s, near, middle):
+    '''S_Dbw index from the neighbourhood counts of the clusters.
+
+    :param s [ScatterStatistics] : statistics of the partition.
+    :param near [matrix] : K x K, points of cluster c closer than the radius to the barycenter j.
+    :param middle [matrix] : K x K, points of cluster c closer than the radius to the
+    midpoint of the barycenters c and j.
+
+    :return: scattering plus the mean density between the clusters
+    '''
+    norms = np.linalg.norm(s.variances(), axis=1)
+    scat = np.mean(norms) / np.linalg.norm(np.diag(s.t) / s.n)
+
+    # density of the union of clusters k and k' at the barycenter of k
+    atCentroid = np.diag(near)[:, None] + near.T
+    atMidpoint = middle + middle.T
+
+    upper = np.triu_indices(s.k, 1)
+    ratios = atMidpoint[upper] / np.maximum(atCentroid[upper], atCentroid.T[upper])
+    return scat + np.mean(ratios)
+
+
+def _sDbw(s):
+    sigma = densityRadius(s)
+
+    # near[c, j]: points of cluster c closer than sigma to the barycenter j
+    near = np.zeros(s.k * s.k)
+    for start, stop, d in s.centroidBlocks():
+        cells = s.codes[start:stop, None] * s.k + np.arange(s.k)
+        near += np.bincount(cells.ravel(), (d < sigma).ravel(), s.k * s.k)
+    near = near.reshape(s.k, s.k)
+
+    # middle[c, j]: points of cluster c closer than sigma to the midpoint of c and j
+    middle = np.zeros((s.k, s.k))
+    rows = max(1, BlockEntries // s.k)
+    for c in range(s.k):
+        midpoints = (s.centroids[c] + s.centroids) / 2.0
+        norms2 = (midpoints ** 2).sum(axis=1)
+        members = s.traj[s.order[s.offsets[c]:s.offsets[c + 1]]]
+        for start in range(0, len(members), rows):
+            block = members[start:start + rows]
+            sq = (block ** 2).sum(axis=1)[:, None] + norms2[None, :] - 2.0 * (block @ midpoints.T)
+            middle[c] += (sq < sigma ** 2).sum(axis=0)
+
+    return sDbw(s, near, middle)
+
+
+def centroidRatios(codes, d, k):
+    '''Sum over the points of each cluster of the distance to their own barycenter
+    divided by the distance to the closest other barycenter (Wemmert_Gancarski).
+
+    :param codes [vector] : cluster code of each point of the block.
+    :param d [matrix] : distances of the points of the block to the K barycenters.
+    :param k [int] : number of clusters.
+
+    :return: vector of K sums
+    '''
+    rows = np.arange(len(codes))
+    own = d[rows, codes].copy()
+    d[rows, codes] = np.inf
+    return np.bincount(codes, own / d.min(axis=1), k)
+
+
+def wemmertGancarski(s, sums):
+    '''
+    :param s [ScatterStatistics] : statistics of the partition.
+    :param sums [vector] : the sums of `centroidRatios` over every point.
+
+    :return: Wemmert_Gancarski index
+    '''
+    return np.sum(s.counts * np.maximum(0.0, 1.0 - sums / s.counts)) / s.n
+
+
+def _wemmertGancarski(s):
+    sums = np.zeros(s.k)
+    for start, stop, d in s.centroidBlocks():
+        sums += centroidRatios(s.codes[start:stop], d, s.k)
+    return wemmertGancarski(s, sums)
+
+
+def _ballHall(s):
+    return np.mean(s.wgssk / s.counts)
+
+
+def _banfeldRaftery(s):
+    return np.sum(s.counts * np.log(s.wgssk / s.counts))
+
+
+def _calinskiHarabasz(s):
+    return (s.n - s.k) / (s.k - 1) * s.bgss / s.wgss
+
+
+def _detRatio(s):
+    return np.linalg.det(s.t) / np.linalg.det(s.wg)
+
+
+def _logDetRatio(s):
+    return s.n * np.log(np.linalg.det(s.t) / np.linalg.det(s.wg))
+
+
+def _ksqDetW(s):
+    return s.k ** 2 * np.linalg.det(s.wg)
+
+
+def _logSSRatio(s):
+    return np.log(s.bgss / s.wgss)
+
+
+def _scottSymons(s):
+    dets = np.linalg.det(s.wgk / s.counts[:, None, None])
+    return np.sum(s.counts * np.log(dets))
+
+
+def _traceW(s):
+    return s.wgss
+
+
+def _traceWiB(s):
+    try:
+        return np.trace(np.linalg.solve(s.wg, s.bg))
+    except np.linalg.LinAlgError:
+        # singular within-group scatter matrix, the index is undefined
+        return np.nan
+
+
+def _ratkowskyLance(s):
+    ratio = np.mean(np.diag(s.bg) / np.diag(s.t))
+    return np.sqrt(ratio / s.k)
+
+
+def pbm(s, ew, et):
+    '''
+    :param s [ScatterStatistics] : statistics of the partition.
+    :param ew [float] : sum of the distances of the points to their barycenter.
+    :param et [float] : sum of the distances of the points to the barycenter of the data set.
+
+    :return: PBM index
+    '''
+    return (et / (s.k * ew) * s.centroidSeparation().max()) ** 2
+
+
+def _pbm(s):
+    et = sum(np.sqrt(((block - s.center) ** 2).sum(axis=1)).sum() for _, block in rowChunks(s.traj))
+    return pbm(s, s.pointCentroidDistances().sum(), et)
+
+
+def _xieBeni(s):
+    return s.wgss / s.n / s.minBetweenSqDistance()
+
+
+def _rayTuri(s):
+    return s.wgss / s.n / np.min(s.centroidSeparation() ** 2)
+
+
+ScatterCriteria = {
+    CriteriaInternal.Ball_Hall: _ballHall,
+    CriteriaInternal.Banfeld_Raftery: _banfeldRaftery,
+    CriteriaInternal.Calinski_Harabasz: _calinskiHarabasz,
+    CriteriaInternal.Davies_Bouldin: _daviesBouldin,
+    CriteriaInternal.Det_Ratio: _detRatio,
+    CriteriaInternal.Log_Det_Ratio: _logDetRatio,
+    CriteriaInternal.Ksq_DetW: _ksqDetW,
+    CriteriaInternal.Log_SS_Ratio: _logSSRatio,
+    CriteriaInternal.Scott_Symons: _scottSymons,
+    CriteriaInternal.Trace_W: _traceW,
+    CriteriaInternal.Trace_WiB: _traceWiB,
+    CriteriaInternal.Ratkowsky_Lance: _ratkowskyLance,
+    CriteriaInternal.PBM: _pbm,
+    CriteriaInternal.Xie_Beni: _xieBeni,
+    CriteriaInternal.Ray_Turi: _rayTuri,
+    CriteriaInternal.SD_Scat: _sdScat,
+    CriteriaInternal.SD_Dis: _sdDis,
+    CriteriaInternal.S_Dbw: _sDbw,
+    CriteriaInternal.Wemmert_Gancarski: _wemmertGancarski,
+}
+
+
+def scatterCriteria(traj, part, criteria):
+    '''Compute criteria of the scatter family with NumPy. The centroids and the
+    within/between group scatter matrices are computed once per partition
+    and shared by every requested criterion.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param part [vector] : the partition vector.
+    :param criteria [vector] : list of CriteriaInternal members found in `ScatterCriteria`
+
+    :return: list of values in the same order as `criteria`
+    '''
+    stats = ScatterStatistics(traj, part)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return [float(ScatterCriteria[c](stats)) for c in criteria]
+
@@ -0,0 +1,219 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+from .best import bestIndices
+from .criteria import CriteriaInternal, matchCriterion
+from .instrument import record
+from .distance import Precomputed
+from .native import NativeCriteria, PartitionStatistics, distanceSource
+from .planner import Plan
+from .scatter import asMatrix, totalScatter
+
+
+class SweepContext:
+    '''Everything about the observations that does not depend on the number of
+    clusters: the converted matrix, the pairwise distances, the total scatter
+    and the plan of the criteria with the numpy backend, or the copy of the
+    observations held by R. Each partition of the sweep only computes its own
+    statistics.
+
+    :param traj [matrix] : the matrix of observations (trajectories) or a `Dataset`.
+    :param criteria [vector] : list of CriteriaInternal members
+    :param backend [string] : see `intCriteria`.
+    :param maxMemory [int] : see `intCriteria`.
+    :param metric [string] : see `intCriteria`.
+    '''
+
+    def __init__(self, traj, criteria, backend, maxMemory=None, metric='euclidean'):
+        from .dataset import Dataset
+
+        self.criteria = criteria
+        self.backend = backend
+        if backend == 'numpy':
+            self.plan = Plan(criteria)
+            self.traj = traj if metric == Precomputed else asMatrix(traj)
+            matrix = None if metric == Precomputed else self.traj
+            # the distances are held by the context for the whole sweep
+            self.source = distanceSource(self.traj, matrix, False, maxMemory, metric)
+            self.total = totalScatter(matrix) if 'scatter' in self.plan.steps else None
+            self.matrix = matrix
+        else:
+            self.traj = traj if isinstance(traj, Dataset) else Dataset(traj)
+
+    @property
+    def observations(self):
+        '''The observations, or the precomputed distances, given to the clusterer'''
+        return np.asarray(self.traj)
+
+    def evaluate(self, part):
+        '''
+        :param part [vector] : the partition vector.
+
+        :return: array of values in the same order as the criteria
+        '''
+        if self.backend == 'numpy':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                stats = PartitionStatistics(self.matrix, part, self.source, self.total)
+                return np.asarray(stats.evaluate(self.plan), dtype=np.float64)
+
+        from .cluster import _rIntCriteria
+        values = _rIntCriteria(self.traj, part, [c.name for c in self.criteria])
+        return np.asarray([np.nan if v is None else v for v in values], dtype=np.float64)
+
+    def cluster(self, clusterer, k):
+        '''Run the clusterer for `k` clusters and evaluate its partition.
+
+        :return: array of values in the same order as the criteria
+        '''
+        return self.evaluate(np.asarray(clusterer(self.observations, k)))
+
+
+def hasPeaked(values, rules, patience):
+    '''Whether the sweep can stop: the best value of every criterion was found
+    at least `patience` values of k before the last evaluated one.
+
+    :param values [matrix] : 2-D array with one row per criterion and one column
+    per evaluated value of k, in increasing order of k.
+    :param rules [vector] : the `BestRule` of every row.
+    :param patience [int] : number of values of k evaluated after the best one.
+
+    :return: True when every criterion has a best value far enough from the end
+    '''
+    best = bestIndices(values, rules)
+    return bool(np.all((best >= 0) & (best <= np.shape(values)[1] - 1 - patience)))
+
+
+def _sweepSetup(kRange, crit, backend, maxMemory, metric, patience, stopOn):
+    from .cluster import _resolveCriteria, _validateBackend, _validateMetric
+
+    _criteria = _resolveCriteria(crit, CriteriaInternal)
+    if not _criteria:
+        raise ValueError("no internal criteria to evaluate")
+
+    _validateBackend(backend, NativeCriteria, _criteria, maxMemory)
+    _validateMetric(backend, metric, _criteria)
+
+    ks = sorted(set(int(k) for k in kRange))
+    if not ks:
+        raise ValueError("kRange is empty")
+
+    if patience is not None and patience < 1:
+        raise ValueError("patience must be at least 1")
+
+    stopOn = _criteria if stopOn is None else [matchCriterion(c) for c in stopOn]
+    missing = [c.name for c in stopOn if c not in _criteria]
+    if missing:
+        raise ValueError("stopOn criteria are not evaluated: {}".format(", ".join(missing)))
+
+    rows = [_criteria.index(c) for c in stopOn]
+    rules = [c.rule for c in stopOn]
+    return _criteria, ks, rows, rules
+
+
+def sweepK(traj, clusterer, kRange, crit, backend='r', maxMemory=None, nJobs=1,
+           patience=None, stopOn=None, metric='euclidean'):
+    '''Cluster the observations for every number of clusters of `kRange` and
+    evaluate the internal criteria of each partition. The values are yielded
+    as soon as they are known, in increasing order of k.
+
+    :param traj [matrix] : the matrix of observations (trajectories) or a `Dataset`.
+    :param clusterer [callable] : called as `clusterer(traj, k)` with the matrix of
+    observations, returns the partition vector. With several jobs the clusterer
+    runs in the worker processes and must be picklable (e.g. a module level function).
+    :param kRange [vector] : the numbers of clusters to evaluate.
+    :param crit [vector] : a list containing CriteriaInternal indices to compute
+    :param backend [string] : see `intCriteria`.
+    :param maxMemory [int] : see `intCriteria`, the limit applies to each worker.
+    :param nJobs [int] : number of worker processes, None for every core. When
+    greater than one the clusterings and their criteria run in a temporary
+    `ParallelEvaluator`.
+    :param patience [int] : stop the sweep once the best value of every criterion
+    of `stopOn` was found at least `patience` values of k before the last one.
+    The whole range is evaluated when not provided.
+    :param stopOn [vector] : criteria (members or names) watched by the early
+    stopping rule, every evaluated criterion when not provided.
+    :param metric [string] : see `intCriteria`. With `precomputed` the clusterer is
+    given the distances rather than the observations.
+
+    :return: generator of (k, pandas.Series of the values indexed by criterion)
+    '''
+    import pandas as pd
+
+    _criteria, ks, rows, rules = _sweepSetup(kRange, crit, backend, maxMemory, metric, patience, stopOn)
+    indices = [x.name for x in _criteria]
+
+    if nJobs != 1:
+        from .parallel import ParallelEvaluator
+        with ParallelEvaluator(nJobs, backend) as evaluator:
+            yield from evaluator.sweepK(
+                traj, clusterer, ks, _criteria, maxMemory, patience, rows, rules, metric
+            )
+        return
+
+    context = SweepContext(traj, _criteria, backend, maxMemory, metric)
+    values = []
+    for k in ks:
+        values.append(context.cluster(clusterer, k))
+        yield k, pd.Series(values[-1], index=indices)
+        if patience is not None and hasPeaked(np.transpose(values)[rows], rules, patience):
+            return
+
+
+def selectK(traj, clusterer, kRange, crit, backend='r', maxMemory=None, nJobs=1,
+            patience=None, stopOn=None, metric='euclidean'):
+    '''Select the number of clusters: cluster the observations for every value
+    of `kRange`, evaluate the internal criteria of every partition and select
+    the best k of each criterion with the rules of `bestCriterion`. The
+    observations are converted (and the pairwise distances computed or the
+    observations copied into R) once for the whole sweep.
+
+    :param traj [matrix] : see `sweepK`.
+    :param clusterer [callable] : see `sweepK`.
+    :param kRange [vector] : see `sweepK`.
+    :param crit [vector] : see `sweepK`.
+    :param backend [string] : see `sweepK`.
+    :param maxMemory [int] : see `sweepK`.
+    :param nJobs [int] : see `sweepK`.
+    :param patience [int] : see `sweepK`.
+    :param stopOn [vector] : see `sweepK`.
+    :param metric [string] : see `sweepK`.
+
+    :return: tuple of (Map of the criteria to the best k, None when the criterion
+    has no best value, pandas.DataFrame with one row per criterion and one column
+    per evaluated k)
+    '''
+    import pandas as pd
+
+    kRange = list(kRange)
+    with record('selectK', backend, traj, criteria=[getattr(c, 'name', c) for c in crit],
+                partitions=len(kRange), metric=metric) as rec:
+        with rec.phase('compute'):
+            results = list(sweepK(traj, clusterer, kRange, crit, backend, maxMemory, nJobs,
+                                  patience, stopOn, metric))
+
+        table = pd.DataFrame({k: v for k, v in results})
+        criteria = [CriteriaInternal[name] for name in table.index]
+        best = bestIndices(table.to_numpy(dtype=np.float64), [c.rule for c in criteria])
+        ks = list(table.columns)
+        return {c.name: (ks[b] if b >= 0 else None) for c, b in zip(criteria, best)}, table
@@ -0,0 +1,290 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import os
+import threading
+import numpy as np
+from .instrument import currentRecord
+
+
+PackageNameR = 'clusterCrit'
+
+# Set this environment variable to a true value ("1", "true", "yes") to
+# prevent the R package from being installed from CRAN.
+OfflineEnvironmentVariable = 'CLUSTER_CRIT_OFFLINE'
+
+# R environment holding the observations of every `Dataset` handle
+EnvironmentNameR = '.clusterCritData'
+
+# R functions defined in the global environment on initialization. A dataset
+# given as a string is the name of a matrix assigned in `EnvironmentNameR`.
+RFunctions = '''
+.clusterCritData <- new.env()
+
+rDataset <- function(dataset) {
+    if (is.character(dataset)) {
+        dataset <- get(dataset, envir = .clusterCritData)
+    }
+    return(dataset)
+}
+
+rIntCriteria <- function(dataset, labels, criteria) {
+    dataset <- rDataset(dataset)
+    ccData <- clusterCrit::intCriteria(dataset, as.vector(labels), criteria)
+    return(ccData)
+}
+
+rIntCriteriaBatch <- function(dataset, partitions, criteria) {
+    dataset <- rDataset(dataset)
+    ccData <- vapply(seq_len(ncol(partitions)), function(j) {
+        unlist(clusterCrit::intCriteria(dataset, partitions[, j], criteria), use.names = FALSE)
+    }, numeric(length(criteria)))
+    return(ccData)
+}
+
+rExtCriteria <- function(part1, part2, criteria) {
+    ccData <- clusterCrit::extCriteria(as.vector(part1), as.vector(part2), criteria)
+    return(ccData)
+}
+
+rExtCriteriaBatch <- function(reference, candidates, criteria) {
+    reference <- as.vector(reference)
+    ccData <- vapply(seq_len(ncol(candidates)), function(j) {
+        unlist(clusterCrit::extCriteria(reference, candidates[, j], criteria), use.names = FALSE)
+    }, numeric(length(criteria)))
+    return(ccData)
+}
+
+rBestCriterion <- function(x, crit) {
+    ccData <- clusterCrit::bestCriterion(as.vector(x), crit)
+    return(ccData)
+}
+'''
+
+_lock = threading.RLock()
+_initialized = False
+_offline = None
+
+# rpy2 converter used for every call: the default conversion rules plus the
+# numpy rules, applied in a local scope rather than activated globally
+_converter = None
+
+
+class RUnavailableError(RuntimeError):
+    '''Raised when the R environment or the clusterCrit package cannot
+    be used to compute the criteria.
+    '''
+
+
+def setOffline(offline=True):
+    '''Control whether the clusterCrit package may be installed from CRAN
+    when R is initialized. This overrides `CLUSTER_CRIT_OFFLINE`.
+
+    :param offline [bool] : when true, never reach for the network.
+    '''
+    global _offline
+    _offline = offline
+
+
+def isOffline():
+    '''Offline mode is enabled through `setOffline` or the
+    `CLUSTER_CRIT_OFFLINE` environment variable.
+
+    :return: True when the R package must not be installed.
+    '''
+    if _offline is not None:
+        return _offline
+    return os.environ.get(OfflineEnvironmentVariable, '').lower() in ('1', 'true', 'yes')
+
+
+def isInitialized():
+    '''
+    :return: True when the R environment has been initialized.
+    '''
+    return _initialized
+
+
+def init(offline=None):
+    '''Initialize the R environment: load rpy2, install the clusterCrit
+    package when it is missing (unless running offline) and define the R
+    functions used by this package. Nothing is done when the environment has
+    already been initialized. This is called automatically by the first
+    function that requires R.
+
+    :param offline [bool] : when provided, set the offline mode (see `setOffline`)
+    before initializing.
+
+    :raises RUnavailableError: rpy2/R cannot be loaded, or clusterCrit is not
+    installed and offline mode is enabled.
+    '''
+    global _initialized, _converter
+
+    if offline is not None:
+        setOffline(offline)
+
+    with _lock:
+        if _initialized:
+            return
+
+        try:
+            from rpy2 import robjects
+            from rpy2.robjects import numpy2ri
+            from rpy2.robjects.packages import importr, isinstalled
+            from rpy2.robjects.vectors import StrVector
+        except Exception as e:
+            raise RUnavailableError(
+                "R is not available, rpy2 failed to load: {}".format(e)
+            ) from e
+
+        if not isinstalled(PackageNameR):
+            if isOffline():
+                raise RUnavailableError(
+                    "the R package {} is not installed and offline mode is enabled".format(
+                        PackageNameR
+                    )
+                )
+
+            utils = importr('utils')
+            utils.chooseCRANmirror(ind=1)
+            utils.install_packages(StrVector((PackageNameR,)))
+
+        robjects.r(RFunctions)
+        _converter = robjects.default_converter + numpy2ri.converter
+        _initialized = True
+
+
+def warmup(offline=None):
+    '''Initialize the R environment and load the clusterCrit namespace so
+    that the first call to a criteria function does not pay the cost. This
+    is useful at the start of a worker process.
+
+    :param offline [bool] : see `init`.
+    '''
+    init(offline)
+
+    from rpy2 import robjects
+    robjects.r('invisible(loadNamespace("{}"))'.format(PackageNameR))
+
+
+def toR(value):
+    '''Prepare a value for the conversion to R. Numeric arrays are made
+    column-major (the layout of R matrices) so that rpy2 copies their buffer
+    directly: int32 arrays, the labels prepared for R, are kept as R integers
+    and every other numeric array becomes float64, so that observations of
+    wider integer types are never truncated. Lists and tuples of strings
+    become string arrays.
+
+    :param value : value passed to an R function.
+
+    :return: converted value, or the value itself when no conversion applies
+    '''
+    if isinstance(value, (list, tuple)):
+        array = np.asarray(value)
+        if array.dtype.kind not in 'biufUS':
+            return value
+        value = array
+
+    if not isinstance(value, np.ndarray):
+        return value
+
+    if value.dtype == np.int32:
+        return np.asfortranarray(value)
+    if value.dtype.kind in 'biuf':
+        return np.asfortranarray(value, dtype=np.float64)
+    if value.dtype.kind == 'S':
+        return value.astype(str)
+    return value
+
+
+def converter():
+    '''Scoped conversion rules between numpy and R. Use as
+    `with localconverter(converter()):` around calls into R.
+
+    :return: rpy2 converter
+    '''
+    init()
+    return _converter
+
+
+def assign(name, value):
+    '''Convert a numpy array and store it in the R environment that holds
+    the data sets, initializing R first when needed.
+
+    :param name [string] : name of the R variable.
+    :param value [matrix] : numpy array to convert.
+    '''
+    init()
+
+    from rpy2 import robjects
+    from rpy2.robjects.conversion import localconverter
+
+    value = toR(value)
+    rec = currentRecord()
+    rec.addBytes(value.nbytes)
+    with rec.phase('conversion'), localconverter(_converter):
+        robjects.globalenv[EnvironmentNameR][name] = value
+
+
+def release(name):
+    '''Remove a variable assigned with `assign` so that R can reclaim its
+    memory. Nothing is done when R has not been initialized.
+
+    :param name [string] : name of the R variable.
+    '''
+    if not _initialized:
+        return
+
+    from rpy2 import robjects
+    robjects.r['rm'](list=name, envir=robjects.globalenv[EnvironmentNameR])
+
+
+def call(name, *args):
+    '''Call one of the R functions defined in `RFunctions`, initializing
+    R first when needed. Arguments are prepared with `toR` and converted
+    with the scoped numpy converter, and `Dataset` handles are passed by the
+    name of their R variable.
+
+    :param name [string] : name of the R function.
+    :param args : arguments passed to the R function.
+
+    :return: R object returned by the function
+    '''
+    rec = currentRecord()
+    if not _initialized:
+        with rec.phase('bootstrap'):
+            init()
+
+    from rpy2 import robjects
+    from rpy2.robjects.conversion import localconverter
+    from .dataset import Dataset
+
+    # Dataset.assign measures its own conversion
+    args = [a.assign() if isinstance(a, Dataset) else toR(a) for a in args]
+
+    with localconverter(_converter) as cv:
+        with rec.phase('conversion'):
+            rec.addBytes(sum(a.nbytes for a in args if isinstance(a, np.ndarray)))
+            args = [cv.py2rpy(a) for a in args]
+
+        with rec.phase('compute'):
+            return robjects.globalenv[name](*args)
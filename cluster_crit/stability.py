@@ -0,0 +1,149 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import warnings
+import numpy as np
+from .contingency import overlapCriteria
+from .criteria import CriteriaExternal
+from .instrument import record
+from .scatter import asMatrix, factorize
+
+
+# Statistics of the stability reported for every criterion
+StabilityStatistics = ('mean', 'var')
+
+
+def resamples(n, nBoot, fraction=0.8, replace=False, seed=None):
+    '''Draw random subsets of the observations as index arrays, the observations
+    themselves are never copied.
+
+    :param n [int] : number of observations.
+    :param nBoot [int] : number of subsets.
+    :param fraction [float] : size of each subset as a fraction of n.
+    :param replace [bool] : draw with replacement (bootstrap) rather than without.
+    The points drawn several times are kept once: a bootstrap subset is the set of
+    its distinct points (about 63% of the draws), and every point has the same
+    weight when the partitions are compared.
+    :param seed [int] : seed of the random subsets.
+
+    :return: list of `nBoot` sorted index vectors without duplicates
+    '''
+    if not 0.0 < fraction <= (np.inf if replace else 1.0):
+        raise ValueError("fraction must be in (0, 1] when sampling without replacement")
+
+    rng = np.random.default_rng(seed)
+    size = max(2, int(round(fraction * n)))
+    # np.unique sorts the draws and removes the duplicates of the bootstrap
+    return [np.unique(rng.choice(n, size=size, replace=replace)) for _ in range(nBoot)]
+
+
+def _overlapCodes(n, indices, partitions):
+    '''Cluster codes of every subset on the full set of points, -1 for the
+    points missing from the subset.
+    '''
+    codes = np.full((len(indices), n), -1, dtype=np.int32)
+    for row, index, part in zip(codes, indices, partitions):
+        part = np.asarray(part).ravel()
+        if len(part) != len(index):
+            raise ValueError(
+                "the clusterer returned {} labels for {} observations".format(len(part), len(index))
+            )
+        row[index] = factorize(part)[0]
+    return codes
+
+
+def stability(traj, clusterer, kRange, nBoot=20, seed=None, crit=(CriteriaExternal.Jaccard,),
+              fraction=0.8, replace=False, nJobs=1):
+    '''Measure the stability of a clustering algorithm for every number of
+    clusters of `kRange`. The observations are clustered on `nBoot` random
+    subsets (the same subsets for every k), and the partitions of every pair of
+    subsets are compared with external criteria on the points both subsets
+    contain. A stable number of clusters gives similar partitions of the
+    overlapping points.
+
+    :param traj [matrix] : the matrix of observations (trajectories).
+    :param clusterer [callable] : called as `clusterer(traj, k)` with the observations
+    of a subset, returns the partition vector. With several jobs the clusterer runs
+    in the worker processes and must be picklable (e.g. a module level function).
+    :param kRange [vector] : the numbers of clusters to evaluate.
+    :param nBoot [int] : number of subsets, every one of the nBoot(nBoot-1)/2 pairs
+    of subsets is compared.
+    :param seed [int] : seed of the random subsets.
+    :param crit [vector] : a list containing CriteriaExternal indices to compute
+    :param fraction [float] : see `resamples`.
+    :param replace [bool] : see `resamples`, the points drawn several times are
+    clustered once.
+    :param nJobs [int] : number of worker processes, None for every core. When
+    greater than one the clusterings run in a temporary `ParallelEvaluator`.
+
+    :return: pandas.DataFrame with one row per k and, for every criterion, the mean
+    and the variance of the criterion over the pairs of subsets (missing values are
+    ignored), e.g. `table["Jaccard"]["mean"]`
+    '''
+    import pandas as pd
+    from .cluster import _resolveCriteria
+
+    _criteria = _resolveCriteria(crit, CriteriaExternal)
+
+    if not _criteria:
+        return None
+
+    if nBoot < 2:
+        raise ValueError("nBoot must be at least 2 to compare the subsets")
+
+    matrix = asMatrix(traj)
+    n = matrix.shape[0]
+    ks = sorted(set(int(k) for k in kRange))
+    indices = resamples(n, nBoot, fraction, replace, seed)
+    names = [x.name for x in _criteria]
+
+    with record('stability', 'numpy', matrix, criteria=names, partitions=len(ks) * nBoot) as rec:
+        jobs = ((k, index) for k in ks for index in indices)
+        if nJobs != 1:
+            from .parallel import ParallelEvaluator
+            evaluator = ParallelEvaluator(nJobs, 'numpy')
+            partitions = evaluator.clusterSubsets(matrix, clusterer, jobs)
+        else:
+            evaluator = None
+            partitions = (clusterer(matrix[index], k) for k, index in jobs)
+
+        rows = []
+        try:
+            for k in ks:
+                with rec.phase('compute'):
+                    # the partitions of the next k are clustered by the workers meanwhile
+                    codes = _overlapCodes(n, indices, [next(partitions) for _ in indices])
+                    values = overlapCriteria(codes, _criteria)
+                with warnings.catch_warnings():
+                    # criteria without any value (degenerate partitions) are NaN
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    rows.append(np.column_stack([
+                        np.nanmean(values, axis=1), np.nanvar(values, axis=1)
+                    ]).ravel())
+        finally:
+            partitions.close()
+            if evaluator is not None:
+                evaluator.close()
+
+    columns = pd.MultiIndex.from_product([names, StabilityStatistics])
+    return pd.DataFrame(rows, index=pd.Index(ks, name='k'), columns=columns)
@@ -0,0 +1,361 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import os
+import numpy as np
+from .criteria import CriteriaInternal
+from .scatter import (
+    BlockEntries, ScatterCriteria, ScatterStatistics, centroidRatios, densityRadius, pbm,
+    sDbw, wemmertGancarski
+)
+
+
+# Default number of bytes of observations read at once
+ChunkBytes = 64 << 20
+
+# Number of temporary arrays, as large as a chunk of observations or as its
+# distances to the barycenters, held while a chunk is processed
+ChunkTemporaries = 8
+
+# File extensions read as Parquet files
+ParquetExtensions = ('.parquet', '.pq')
+
+# File extensions read as HDF5 files
+HDF5Extensions = ('.h5', '.hdf5')
+
+# Every criterion that can be computed with a fixed number of passes over the
+# observations. Xie_Beni needs the closest pair of points of distinct clusters.
+StreamCriteria = {c: f for c, f in ScatterCriteria.items() if c != CriteriaInternal.Xie_Beni}
+
+
+class ParquetSource:
+    '''Observations stored in a Parquet file, read one batch of rows at a
+    time with pyarrow. Every column is a variable.
+
+    :param path [string] : path of the Parquet file.
+    '''
+
+    def __init__(self, path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("reading Parquet files requires pyarrow") from e
+
+        self.path = path
+        self._file = pq.ParquetFile(path)
+        self.shape = (self._file.metadata.num_rows, len(self._file.schema_arrow))
+
+    def chunks(self, rows):
+        '''
+        :param rows [int] : number of rows per chunk.
+
+        :return: generator of (first row, float64 matrix of the rows)
+        '''
+        start = 0
+        for batch in self._file.iter_batches(batch_size=rows):
+            block = np.column_stack([
+                c.to_numpy(zero_copy_only=False).astype(np.float64, copy=False) for c in batch.columns
+            ])
+            yield start, block
+            start += len(block)
+
+
+class ArraySource:
+    '''Observations held by an array-like object that can be sliced by rows
+    without being loaded: an `np.memmap`, an h5py dataset, or an array.
+
+    :param array [matrix] : the observations.
+    '''
+
+    def __init__(self, array):
+        self.array = array
+        shape = tuple(array.shape)
+        self.shape = shape if len(shape) == 2 else (shape[0], 1)
+
+    def chunks(self, rows):
+        '''
+        :param rows [int] : number of rows per chunk.
+
+        :return: generator of (first row, float64 matrix of the rows)
+        '''
+        for start in range(0, self.shape[0], rows):
+            block = np.asarray(self.array[start:start + rows], dtype=np.float64)
+            yield start, block.reshape(len(block), -1)
+
+
+def isOutOfCore(value):
+    '''
+    :param value : observations or labels given by the caller.
+
+    :return: True when the value is read from disk: a path, an `np.memmap` or
+    another object sliced by rows without being loaded, such as an h5py dataset.
+    Arrays and pandas objects are in memory.
+    '''
+    if isinstance(value, (str, os.PathLike, np.memmap)):
+        return True
+    if isinstance(value, np.ndarray) or hasattr(value, 'iloc'):
+        return False
+    return hasattr(value, 'shape') and hasattr(value, '__getitem__')
+
+
+def openHDF5(path):
+    '''Open the dataset of an HDF5 file with h5py, its rows are read when sliced.
+
+    :param path [string] : path of a file holding a single dataset.
+
+    :return: h5py Dataset
+    '''
+    try:
+        import h5py
+    except ImportError as e:
+        raise ImportError("reading HDF5 files requires h5py") from e
+
+    handle = h5py.File(os.fspath(path), 'r')
+    datasets = []
+    handle.visititems(lambda name, item: datasets.append(item) if isinstance(item, h5py.Dataset) else None)
+    if len(datasets) != 1:
+        handle.close()
+        raise ValueError("expected a single dataset in {}, found {}".format(path, len(datasets)))
+    return datasets[0]
+
+
+def openArray(path):
+    '''Memory map a `.npy` file, or open the dataset of an HDF5 file.
+
+    :param path [string] : path of the file.
+
+    :return: read only `np.memmap` or h5py Dataset
+    '''
+    if os.fspath(path).lower().endswith(HDF5Extensions):
+        return openHDF5(path)
+    return np.load(os.fspath(path), mmap_mode='r')
+
+
+def openObservations(traj):
+    '''Open observations that are read in chunks of rows.
+
+    :param traj [matrix] : path of a `.npy`, HDF5 or Parquet file, `np.memmap`,
+    h5py dataset or array.
+
+    :return: ParquetSource or ArraySource
+    '''
+    if isinstance(traj, (ParquetSource, ArraySource)):
+        return traj
+    if isinstance(traj, (str, os.PathLike)):
+        if os.fspath(traj).lower().endswith(ParquetExtensions):
+            return ParquetSource(traj)
+        return ArraySource(openArray(traj))
+    return ArraySource(traj)
+
+
+def openLabels(part):
+    '''Open labels that are read in chunks, the path of a `.npy` file is memory
+    mapped and the path of an HDF5 file opened with h5py.
+
+    :param part [vector] : the partition vector, or the path of a `.npy` or HDF5 file.
+
+    :return: vector that can be sliced
+    '''
+    if isinstance(part, (str, os.PathLike)):
+        return openArray(part)
+    return part
+
+
+def mapArray(value):
+    '''Memory map the path of a `.npy` file, or open the path of an HDF5 file, so
+    that it can be used as an array. Other values are returned unchanged.
+
+    :param value : observations or labels given by the caller.
+
+    :return: `np.memmap`, h5py Dataset or the value
+    '''
+    if not isinstance(value, (str, os.PathLike)):
+        return value
+    if os.fspath(value).lower().endswith(ParquetExtensions):
+        raise ValueError(
+            "only the criteria found in StreamCriteria can be computed from a Parquet file"
+        )
+    return openArray(value)
+
+
+class StreamStatistics:
+    '''Scatter statistics of a partition accumulated over chunks of rows, so
+    that only one chunk of observations is held in memory at a time. The
+    first pass finds the cluster sizes and barycenters, the second pass the
+    scatter matrices (centered on the barycenters found by the first pass,
+    which is numerically stable) and the point to barycenter distances. A
+    third pass counts the neighbourhoods of S_Dbw when it is requested.
+    Besides the chunk, memory is O(K.p^2).
+
+    :param source [ArraySource] : the observations, see `openObservations`.
+    :param part [vector] : the partition vector, or a memory mapped vector.
+    :param maxMemory [int] : bytes of temporary memory used for each chunk of rows.
+    '''
+
+    def __init__(self, source, part, maxMemory=None):
+        self.source = source
+        self.part = part
+        self.n, self.p = source.shape
+        if len(part) != self.n:
+            raise ValueError(
+                "partition length {} does not match the number of observations {}".format(
+                    len(part), self.n
+                )
+            )
+
+        maxMemory = maxMemory or ChunkBytes
+        self.labels = self._findLabels(max(1, maxMemory // 8))
+        self.k = len(self.labels)
+
+        # rows per chunk: the chunk and its temporaries fit in maxMemory
+        width = max(self.p, self.k, 1) * np.dtype(np.float64).itemsize * ChunkTemporaries
+        self.rows = max(1, min(maxMemory // width, BlockEntries // max(self.k, 1)))
+
+    def _findLabels(self, step):
+        labels = [np.unique(np.asarray(self.part[start:start + step])) for start in range(0, self.n, step)]
+        return np.unique(np.concatenate(labels)) if labels else np.empty(0)
+
+    def chunks(self):
+        '''
+        :return: generator of (cluster codes, observations) for every chunk of rows
+        '''
+        for start, block in self.source.chunks(self.rows):
+            codes = np.searchsorted(self.labels, np.asarray(self.part[start:start + len(block)]))
+            yield codes, block
+
+    def moments(self, ratios=False):
+        '''Accumulate the statistics of the first two passes.
+
+        :param ratios [bool] : also accumulate the sums of `centroidRatios` used by
+        Wemmert_Gancarski, kept in `ratios` (None otherwise).
+
+        :return: ScatterStatistics of the partition
+        '''
+        counts = np.zeros(self.k, dtype=np.int64)
+        sums = np.zeros((self.k, self.p))
+        for codes, block in self.chunks():
+            counts += np.bincount(codes, minlength=self.k)
+            for j in range(self.p):
+                sums[:, j] += np.bincount(codes, block[:, j], self.k)
+
+        centroids = sums / counts[:, None]
+        center = sums.sum(axis=0) / self.n
+
+        wgk = np.zeros((self.k, self.p, self.p))
+        t = np.zeros((self.p, self.p))
+        spread = np.zeros(self.k)
+        self.ratios = np.zeros(self.k) if ratios else None
+        self.et = 0.0
+        for codes, block in self.chunks():
+            centered = block - center
+            t += centered.T @ centered
+            self.et += np.sqrt((centered ** 2).sum(axis=1)).sum()
+
+            order = np.argsort(codes, kind='stable')
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=self.k))))
+            for c in np.flatnonzero(np.diff(offsets)):
+                members = block[order[offsets[c]:offsets[c + 1]]] - centroids[c]
+                wgk[c] += members.T @ members
+
+            d = _distances(block, centroids)
+            spread += np.bincount(codes, d[np.arange(len(codes)), codes], self.k)
+            if self.ratios is not None and self.k > 1:
+                self.ratios += centroidRatios(codes, d, self.k)
+
+        stats = ScatterStatistics.fromMoments(counts, centroids, wgk, center, t)
+        stats._memo['spread'] = spread / counts
+        return stats
+
+    def densities(self, stats):
+        '''Third pass, count the neighbourhoods of the barycenters and of their
+        midpoints used by S_Dbw.
+
+        :param stats [ScatterStatistics] : statistics returned by `moments`.
+
+        :return: tuple of the K x K (near, middle) counts, see `sDbw`
+        '''
+        sigma = densityRadius(stats)
+        centroids = stats.centroids
+        norms = (centroids ** 2).sum(axis=1)
+        # squared norms of the midpoints of every pair of barycenters
+        midpoints = ((centroids[:, None, :] + centroids[None, :, :]) ** 2).sum(axis=-1) / 4.0
+
+        near = np.zeros(self.k * self.k)
+        middle = np.zeros(self.k * self.k)
+        for codes, block in self.chunks():
+            dots = block @ centroids.T
+            sq = (block ** 2).sum(axis=1)[:, None]
+            cells = (codes[:, None] * self.k + np.arange(self.k)).ravel()
+
+            toCentroid = sq + norms[None, :] - 2.0 * dots
+            near += np.bincount(cells, (toCentroid < sigma ** 2).ravel(), self.k * self.k)
+
+            # x.m = (x.c_own + x.c_j) / 2 for the midpoint m of the own barycenter and c_j
+            own = dots[np.arange(len(codes)), codes][:, None]
+            toMidpoint = sq + midpoints[codes] - (own + dots)
+            middle += np.bincount(cells, (toMidpoint < sigma ** 2).ravel(), self.k * self.k)
+
+        return near.reshape(self.k, self.k), middle.reshape(self.k, self.k)
+
+
+def _distances(block, centroids):
+    sq = (
+        (block ** 2).sum(axis=1)[:, None] + (centroids ** 2).sum(axis=1)[None, :]
+        - 2.0 * (block @ centroids.T)
+    )
+    return np.sqrt(np.maximum(sq, 0.0))
+
+
+def streamCriteria(traj, part, criteria, maxMemory=None):
+    '''Compute the centroid and scatter based criteria of observations that do
+    not fit in memory, reading them in chunks of rows (see `StreamStatistics`).
+
+    :param traj [matrix] : path of a `.npy`, HDF5 or Parquet file, `np.memmap`, h5py
+    dataset or array.
+    :param part [vector] : the partition vector, or the path of a `.npy` or HDF5 file.
+    :param criteria [vector] : list of CriteriaInternal members found in `StreamCriteria`
+    :param maxMemory [int] : bytes of temporary memory used for each chunk of rows.
+
+    :return: list of values in the same order as `criteria`
+    '''
+    unsupported = [c.name for c in criteria if c not in StreamCriteria]
+    if unsupported:
+        raise ValueError(
+            "cannot compute from observations read in chunks: {}".format(", ".join(unsupported))
+        )
+
+    streamed = StreamStatistics(openObservations(traj), openLabels(part), maxMemory)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stats = streamed.moments(ratios=CriteriaInternal.Wemmert_Gancarski in criteria)
+
+        values = []
+        for c in criteria:
+            if c == CriteriaInternal.PBM:
+                values.append(pbm(stats, stats.spread() @ stats.counts, streamed.et))
+            elif c == CriteriaInternal.Wemmert_Gancarski:
+                values.append(wemmertGancarski(stats, streamed.ratios))
+            elif c == CriteriaInternal.S_Dbw:
+                values.append(sDbw(stats, *streamed.densities(stats)))
+            else:
+                values.append(StreamCriteria[c](stats))
+        return [float(v) for v in values]
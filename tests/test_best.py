@@ -0,0 +1,137 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from random import Random
+from cluster_crit import bestCriterion
+from cluster_crit.best import bestIndices
+from cluster_crit.criteria import BestRule, CriteriaExternal, CriteriaInternal, matchCriterion
+
+
+rand = Random(17)
+values = np.array([[rand.uniform(0, 10) for _ in range(8)] for _ in range(6)])
+
+
+def _naiveBest(x, rule):
+    '''Select the best value by following the definition of the rule.
+    '''
+    x = list(x)
+    if rule == BestRule.Max:
+        return x.index(max(x))
+    if rule == BestRule.Min:
+        return x.index(min(x))
+
+    if len(x) < 3:
+        return None
+    v = [x[i + 1] - x[i] for i in range(len(x) - 1)]
+    second = [v[i] - v[i - 1] for i in range(1, len(v))]
+    best = max(second) if rule == BestRule.MaxDiff else min(second)
+    return second.index(best) + 1
+
+
+def testEveryCriterionHasRule(subtests):
+    '''Every internal criterion should have a rule, as in clusterCrit.
+    '''
+    for c in CriteriaInternal:
+        if c != CriteriaInternal.ALL:
+            with subtests.test(c=c):
+                assert isinstance(c.rule, BestRule)
+
+
+def testBestIndicesMatchRules(subtests):
+    '''Each row should select the value found by the definition of its rule.
+    '''
+    rules = [BestRule.Max, BestRule.Min, BestRule.MaxDiff, BestRule.MinDiff, BestRule.Max, BestRule.MinDiff]
+    best = bestIndices(values, rules)
+
+    for row, rule in enumerate(rules):
+        with subtests.test(rule=rule):
+            assert best[row] == _naiveBest(values[row], rule)
+
+
+def testBestIndicesMissing(subtests):
+    '''Missing values are ignored, rows without a comparable value have no best value.
+    '''
+    x = np.array([[np.nan, 1.0, 3.0, np.nan], [np.nan] * 4, [1.0, 2.0, np.nan, np.nan]])
+    best = bestIndices(x, [BestRule.Max, BestRule.Min, BestRule.MaxDiff])
+
+    with subtests.test("ignored"):
+        assert best[0] == 2
+    with subtests.test("all missing"):
+        assert best[1] == -1
+    with subtests.test("missing differences"):
+        assert best[2] == -1
+
+
+def testBestCriterionTable(subtests):
+    '''A DataFrame of criteria should give the same indices as each row on its own.
+    '''
+    names = ["Ball_Hall", "Calinski_Harabasz", "Davies_Bouldin", "Log_SS_Ratio", "Silhouette", "Trace_WiB"]
+    table = pd.DataFrame(values, index=names)
+    output = bestCriterion(table)
+
+    for name, row in zip(names, values):
+        with subtests.test(name=name):
+            assert output[name] == bestCriterion(row, name)
+            assert output[name] == _naiveBest(row, CriteriaInternal[name].rule)
+
+
+def testBestCriterionSingleDiff():
+    '''A single value has no difference, so there is no best value.
+    '''
+    assert bestCriterion(np.array([3.0]), "Ball_Hall") is None
+    assert bestCriterion(np.array([3.0]), "Dunn") == 0
+
+
+def testMatchCriterion(subtests):
+    '''Names are case insensitive and can be abbreviated when the prefix is unique.
+    '''
+    with subtests.test("exact"):
+        assert matchCriterion("dunn") == CriteriaInternal.Dunn
+    with subtests.test("prefix"):
+        assert matchCriterion("calinski") == CriteriaInternal.Calinski_Harabasz
+        assert matchCriterion("folkes") == CriteriaExternal.Folkes_Mallows
+    with subtests.test("exact before prefix"):
+        assert matchCriterion("SD_Dis") == CriteriaInternal.SD_Dis
+    with subtests.test("ambiguous"):
+        with pytest.raises(ValueError):
+            matchCriterion("ra")
+    with subtests.test("unknown"):
+        with pytest.raises(ValueError):
+            matchCriterion("unknown")
+
+
+def testBestCriterionInvalid(subtests):
+    '''Tables must name the criterion of every row.
+    '''
+    with subtests.test("missing criteria"):
+        with pytest.raises(ValueError):
+            bestCriterion(values, "Dunn")
+    with subtests.test("row count"):
+        with pytest.raises(ValueError):
+            bestCriterion(values, ["Dunn"])
+    with subtests.test("no rule"):
+        with pytest.raises(ValueError):
+            bestCriterion(values[0], "McNemar")
@@ -21,7 +21,7 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
-from cluster_crit import intCriteria, extCriteria, bestCriterion
+from cluster_crit import intCriteria, intCriteriaBatch, extCriteria, bestCriterion
 from cluster_crit import CriteriaInternal, CriteriaExternal
 import pandas as pd
 import numpy as np
@@ -42,6 +42,16 @@ clusters = [2, 2, 2, 1, 2, 3, 1, 2, 1, 2, 4, 3, 4, 4, 2, 3, 2, 2, 3, 3, 3, 3, 3,
 assert len(original) == len(clusters)
 
 
+# k = 2 through 6
+sweep = [
+    [1, 1, 1, 1, 1, 2, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 1, 1, 2],
+    [2, 2, 2, 1, 2, 3, 1, 2, 1, 2, 3, 3, 3, 3, 2, 3, 2, 2, 3, 3, 3, 3, 3, 3, 3, 2, 1, 1, 1, 1, 1, 2, 2, 1, 3, 3, 3, 2, 2, 3],
+    [2, 2, 2, 1, 2, 3, 1, 2, 1, 2, 4, 3, 4, 4, 2, 3, 2, 2, 3, 3, 3, 3, 3, 3, 3, 2, 1, 1, 1, 1, 1, 2, 2, 1, 3, 3, 3, 2, 2, 4],
+    [2, 2, 3, 2, 3, 4, 2, 2, 2, 3, 5, 4, 5, 5, 3, 4, 2, 3, 4, 4, 4, 4, 4, 4, 4, 2, 1, 1, 2, 2, 2, 3, 3, 1, 4, 4, 4, 3, 3, 5],
+    [3, 2, 3, 2, 3, 4, 2, 2, 2, 3, 6, 4, 6, 6, 4, 5, 2, 3, 4, 5, 4, 5, 5, 5, 5, 2, 1, 1, 2, 2, 2, 3, 3, 1, 4, 5, 5, 3, 3, 6],
+]
+
+
 part1 = [randint(1,3) for _ in range(150)]
 part2 = [randint(1,5) for _ in range(150)]
 
@@ -114,6 +124,44 @@ def testMultValidMultInvalidIntCriteria(subtests):
             assert ex.name not in output
 
 
+def testIntCriteriaBatch(subtests):
+    '''Test that the batch evaluation of several partitions matches
+    the evaluation of each partition separately.
+    '''
+    expected = [CriteriaInternal.Ball_Hall, CriteriaInternal.Dunn]
+
+    output = intCriteriaBatch(original, sweep, expected)
+    assert output.shape == (len(expected), len(sweep))
+
+    for j, cluster in enumerate(sweep):
+        single = intCriteria(original, cluster, expected)
+        for ex in expected:
+            with subtests.test(ex=ex, j=j):
+                assert output.loc[ex.name, j] == single[ex.name]
+
+
+def testIntCriteriaBatchNumpy(subtests):
+    '''Test the batch evaluation with the numpy backend, the partitions
+    can be passed as a 2-D array.
+    '''
+    expected = [CriteriaInternal.Calinski_Harabasz, CriteriaInternal.Trace_W]
+
+    output = intCriteriaBatch(original, np.asarray(sweep), expected, backend='numpy')
+    assert output.shape == (len(expected), len(sweep))
+
+    for j, cluster in enumerate(sweep):
+        single = intCriteria(original, cluster, expected, backend='numpy')
+        for ex in expected:
+            with subtests.test(ex=ex, j=j):
+                assert np.isclose(output.loc[ex.name, j], single[ex.name])
+
+
+def testInvalidIntCriteriaBatch():
+    '''Test that invalid criteria will yield no results
+    '''
+    assert intCriteriaBatch(original, sweep, [CriteriaExternal.ALL]) is None
+
+
 def testInvalidExtCriteria():
     '''Test that invalid criteria will yield no results
     '''
@@ -0,0 +1,111 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import math
+import numpy as np
+import pytest
+from cluster_crit import distance
+from cluster_crit.concordance import ConcordanceCounts, ConcordanceCriteria
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.native import nativeCriteria
+
+
+rng = np.random.default_rng(2024)
+traj = np.round(rng.normal(size=(45, 2)), 1)
+part = rng.integers(1, 4, size=45)
+
+
+def _naiveCounts(x, labels):
+    '''Compare every within-cluster distance with every between-cluster distance.
+    The same distances are used so that ties are identical.
+    '''
+    distances = iter(distance.pairwiseDistances(x))
+    within, between = [], []
+    for i in range(len(x)):
+        for j in range(i + 1, len(x)):
+            d = next(distances)
+            (within if labels[i] == labels[j] else between).append(d)
+
+    within, between = np.asarray(within), np.asarray(between)
+    splus = int((within[:, None] < between[None, :]).sum())
+    sminus = int((within[:, None] > between[None, :]).sum())
+    return splus, sminus, len(within), len(between)
+
+
+def testConcordanceCounts(subtests):
+    '''The counts match a comparison of every pair of distances, whether the
+    within or the between distances are sorted.
+    '''
+    for labels in (part, rng.integers(1, 2 + 1, size=45), np.arange(45) % 20):
+        with subtests.test(k=len(np.unique(labels))):
+            splus, sminus, nw, nb = _naiveCounts(traj, labels)
+            _, codes = np.unique(labels, return_inverse=True)
+            counts = ConcordanceCounts.fromBlocks(
+                lambda: distance.distanceBlocks(traj), codes
+            )
+            assert (counts.splus, counts.sminus, counts.nw, counts.nb) == (splus, sminus, nw, nb)
+            assert counts.ties == nw * nb - splus - sminus
+
+
+def testConcordanceCriteriaMatchFormulas(subtests):
+    '''Gamma, G_plus and Tau match their definitions.
+    '''
+    splus, sminus, nw, nb = _naiveCounts(traj, part)
+    nt = nw + nb
+    expected = {
+        CriteriaInternal.Gamma: (splus - sminus) / (splus + sminus),
+        CriteriaInternal.G_plus: 2 * sminus / (nt * (nt - 1)),
+        CriteriaInternal.Tau: (splus - sminus) / math.sqrt(nb * nw * nt * (nt - 1) / 2),
+    }
+
+    criteria = list(ConcordanceCriteria)
+    output = nativeCriteria(traj, part, criteria)
+    tiled = nativeCriteria(traj, part, criteria, maxMemory=distance.PairBytes * 100)
+
+    for crit, value, blocked in zip(criteria, output, tiled):
+        with subtests.test(crit=crit):
+            assert value == pytest.approx(expected[crit], rel=1e-12)
+            assert blocked == pytest.approx(expected[crit], rel=1e-12)
+
+
+def testConcordanceMemoryBudget():
+    '''A clear error is raised when the sorted distances do not fit in the
+    memory budget.
+    '''
+    with pytest.raises(ValueError):
+        nativeCriteria(traj, part, [CriteriaInternal.Gamma], maxMemory=64)
+
+
+def testConcordanceMatchesR(subtests):
+    '''The numpy backend should agree with the clusterCrit R package.
+    '''
+    pytest.importorskip("rpy2")
+    from cluster_crit import intCriteria
+
+    criteria = list(ConcordanceCriteria)
+    fromR = intCriteria(traj, part, criteria)
+    fromNumpy = intCriteria(traj, part, criteria, backend='numpy')
+
+    for crit in criteria:
+        with subtests.test(crit=crit):
+            assert fromNumpy[crit.name] == pytest.approx(fromR[crit.name], rel=1e-6)
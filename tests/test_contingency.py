@@ -0,0 +1,214 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+import numpy as np
+from random import Random
+from cluster_crit import contingency, extCriteriaBatch, extCriteriaMatrix
+from cluster_crit.criteria import CriteriaExternal
+from cluster_crit.contingency import (
+    ContingencyCriteria, PairCounts, contingencyCriteria, contingencyCriteriaBatch, contingencyTable,
+    overlapCriteria
+)
+
+
+rand = Random(99)
+part1 = [rand.randint(1, 3) for _ in range(150)]
+part2 = [rand.randint(1, 5) for _ in range(150)]
+
+
+def _naiveCounts(p1, p2):
+    '''Count the pairs by comparing every pair of points.
+    '''
+    yy = yn = ny = nn = 0
+    for i in range(len(p1)):
+        for j in range(i + 1, len(p1)):
+            same1, same2 = p1[i] == p1[j], p2[i] == p2[j]
+            yy += same1 and same2
+            yn += same1 and not same2
+            ny += same2 and not same1
+            nn += not same1 and not same2
+    return yy, yn, ny, nn
+
+
+def testPairCountsMatchPairs():
+    '''The counts derived from the contingency table should match
+    the counts found by comparing every pair of points.
+    '''
+    counts = PairCounts(contingencyTable(part1, part2))
+    assert (counts.yy, counts.yn, counts.ny, counts.nn) == _naiveCounts(part1, part2)
+    assert counts.nt == 150 * 149 // 2
+
+
+def testContingencyTable():
+    '''The table has one row per cluster of the first partition and
+    one column per cluster of the second partition.
+    '''
+    table = contingencyTable([1, 1, 2, 2, 3], ['a', 'b', 'b', 'b', 'a'])
+    assert table.tolist() == [[1, 1], [0, 2], [1, 0]]
+
+
+def testContingencyCriteriaMatchFormulas(subtests):
+    '''Every criterion should match its definition in terms of the
+    pair counts.
+    '''
+    yy, yn, ny, nn = _naiveCounts(part1, part2)
+    nt = yy + yn + ny + nn
+    expected = {
+        CriteriaExternal.Czekanowski_Dice: 2 * yy / (2 * yy + yn + ny),
+        CriteriaExternal.Folkes_Mallows: yy / np.sqrt((yy + yn) * (yy + ny)),
+        CriteriaExternal.Hubert: (nt * yy - (yy + yn) * (yy + ny)) / np.sqrt(
+            (yy + yn) * (yy + ny) * (nn + yn) * (nn + ny)
+        ),
+        CriteriaExternal.Jaccard: yy / (yy + yn + ny),
+        CriteriaExternal.Kulczynski: 0.5 * (yy / (yy + ny) + yy / (yy + yn)),
+        CriteriaExternal.McNemar: (yn - ny) / np.sqrt(yn + ny),
+        CriteriaExternal.Phi: (yy * nn - yn * ny) / ((yy + yn) * (yy + ny) * (yn + nn) * (ny + nn)),
+        CriteriaExternal.Precision: yy / (yy + ny),
+        CriteriaExternal.Rand: (yy + nn) / nt,
+        CriteriaExternal.Recall: yy / (yy + yn),
+        CriteriaExternal.Rogers_Tanimoto: (yy + nn) / (yy + nn + 2 * (yn + ny)),
+        CriteriaExternal.Russel_Rao: yy / nt,
+        CriteriaExternal.Sokal_Sneath1: yy / (yy + 2 * (yn + ny)),
+        CriteriaExternal.Sokal_Sneath2: (yy + nn) / (yy + nn + 0.5 * (yn + ny)),
+    }
+
+    criteria = list(ContingencyCriteria)
+    output = contingencyCriteria(part1, part2, criteria)
+    for crit, value in zip(criteria, output):
+        with subtests.test(crit=crit):
+            assert value == pytest.approx(expected[crit], rel=1e-12)
+
+
+def testContingencyIdenticalPartitions():
+    '''Comparing a partition with itself yields a perfect agreement.
+    '''
+    output = contingencyCriteria(
+        part1, part1, [CriteriaExternal.Rand, CriteriaExternal.Jaccard, CriteriaExternal.Hubert]
+    )
+    assert output == pytest.approx([1.0, 1.0, 1.0])
+
+
+def testContingencyDegenerate():
+    '''Undefined values are reported as nan rather than raising.
+    '''
+    output = contingencyCriteria([1, 1, 1], [1, 1, 1], [CriteriaExternal.McNemar])
+    assert np.isnan(output[0])
+
+
+def testContingencyLengthMismatch():
+    '''Partitions must contain the same number of points.
+    '''
+    with pytest.raises(ValueError):
+        contingencyTable(part1, part2[:-1])
+
+
+def testContingencyBatch(subtests, monkeypatch):
+    '''Comparing the reference with many candidates at once gives the values of
+    every pair on its own, whether the tables are counted or the keys sorted.
+    '''
+    criteria = list(ContingencyCriteria)
+    candidates = [part2, part1, [rand.randint(0, 60) for _ in range(150)], list(range(150)), [7] * 150]
+    expected = np.array([contingencyCriteria(part1, c, criteria) for c in candidates]).T
+
+    for name, entries in (("counted", contingency.BlockEntries), ("sorted", 16)):
+        monkeypatch.setattr(contingency, "BlockEntries", entries)
+        with subtests.test(cells=name):
+            values = contingencyCriteriaBatch(part1, np.array(candidates), criteria)
+            np.testing.assert_allclose(values, expected, equal_nan=True)
+
+
+def testExtCriteriaBatch(subtests):
+    '''extCriteriaBatch returns one column per candidate, labels can be any values.'''
+    names = np.array(["a", "b", "c"])[np.array(part1) - 1]
+    table = extCriteriaBatch(names, [part2, part1], [CriteriaExternal.Rand, CriteriaExternal.Jaccard], backend='numpy')
+
+    with subtests.test("shape"):
+        assert list(table.index) == ["Rand", "Jaccard"]
+        assert table.shape == (2, 2)
+    with subtests.test("values"):
+        assert np.allclose(table[0], contingencyCriteria(part1, part2, [CriteriaExternal.Rand, CriteriaExternal.Jaccard]))
+        assert np.allclose(table[1], [1.0, 1.0])
+    with subtests.test("length"):
+        with pytest.raises(ValueError):
+            extCriteriaBatch(part1, [part2[:-1]], [CriteriaExternal.Rand], backend='numpy')
+
+
+def testExtCriteriaMatrix(subtests):
+    '''Entry (i, j) of every matrix compares partition i with partition j, including
+    the asymmetric criteria, and the parallel evaluation matches the serial one.'''
+    partitions = [part1, part2, [rand.randint(0, 2) for _ in range(150)], part1]
+    criteria = list(ContingencyCriteria)
+    matrices = extCriteriaMatrix(partitions, criteria)
+
+    with subtests.test("shape"):
+        assert set(matrices) == {c.name for c in criteria}
+        assert all(m.shape == (4, 4) for m in matrices.values())
+    for i in range(4):
+        for j in range(4):
+            with subtests.test(i=i, j=j):
+                expected = contingencyCriteria(partitions[i], partitions[j], criteria)
+                found = [matrices[c.name].iat[i, j] for c in criteria]
+                assert np.allclose(found, expected, equal_nan=True)
+    with subtests.test("parallel"):
+        parallel = extCriteriaMatrix(partitions, criteria, nJobs=2)
+        for c in criteria:
+            assert np.allclose(parallel[c.name], matrices[c.name], equal_nan=True)
+
+
+def testOverlapCriteria(subtests, monkeypatch):
+    '''Pairs of partitions of different subsets are compared on the points of
+    both subsets, whether the tables are counted together or pair by pair.'''
+    gen = np.random.default_rng(5)
+    subsets = [np.sort(gen.choice(150, 110, replace=False)) for _ in range(5)]
+    labels = [gen.integers(0, 15, size=110) for _ in subsets]
+    codes = np.full((5, 150), -1)
+    for row, index, part in zip(codes, subsets, labels):
+        row[index] = part
+
+    criteria = list(ContingencyCriteria)
+    expected = []
+    for i in range(5):
+        for j in range(i + 1, 5):
+            common = np.intersect1d(subsets[i], subsets[j])
+            expected.append(contingencyCriteria(codes[i, common], codes[j, common], criteria))
+    expected = np.asarray(expected).T
+
+    for entries in (contingency.BlockEntries, 300, 4):
+        with subtests.test(entries=entries):
+            monkeypatch.setattr(contingency, "BlockEntries", entries)
+            assert np.allclose(overlapCriteria(codes, criteria), expected, equal_nan=True)
+
+
+def testContingencyMatchesR(subtests):
+    '''The numpy backend should agree with the clusterCrit R package.
+    '''
+    pytest.importorskip("rpy2")
+    from cluster_crit import extCriteria
+
+    fromR = extCriteria(part1, part2, [CriteriaExternal.ALL])
+    fromNumpy = extCriteria(part1, part2, [CriteriaExternal.ALL], backend='numpy')
+
+    for name, value in fromR.items():
+        with subtests.test(name=name):
+            assert fromNumpy[name] == pytest.approx(value, rel=1e-6)
@@ -0,0 +1,95 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import gc
+import numpy as np
+import pytest
+from cluster_crit import Dataset, intCriteria, intCriteriaBatch
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.scatter import ScatterCriteria
+
+
+rng = np.random.default_rng(7)
+traj = rng.normal(size=(60, 2))
+parts = [rng.integers(1, k + 1, size=60) for k in (2, 3, 4)]
+
+
+def testDatasetNumpyBackend():
+    '''A handle can be used in place of the observations.
+    '''
+    criteria = list(ScatterCriteria)
+    dataset = Dataset(traj)
+
+    assert dataset.shape == traj.shape
+    assert np.array_equal(np.asarray(dataset), traj)
+
+    for part in parts:
+        assert intCriteria(dataset, part, criteria, backend='numpy') == pytest.approx(
+            intCriteria(traj, part, criteria, backend='numpy')
+        )
+
+    assert intCriteriaBatch(dataset, parts, criteria, backend='numpy').equals(
+        intCriteriaBatch(traj, parts, criteria, backend='numpy')
+    )
+
+
+def testDatasetNotAssignedUntilUsed():
+    '''Nothing is sent to R until the handle is used with R, and closing
+    an unused handle is harmless.
+    '''
+    with Dataset(traj) as dataset:
+        assert not dataset.assigned
+    dataset.close()
+    assert not dataset.assigned
+
+
+def testDatasetR():
+    '''The observations are copied into R once and released on close.
+    '''
+    pytest.importorskip("rpy2")
+    from rpy2 import robjects
+    from cluster_crit import session
+
+    criteria = [CriteriaInternal.Dunn, CriteriaInternal.Silhouette]
+    dataset = Dataset(traj)
+
+    for part in parts:
+        assert intCriteria(dataset, part, criteria) == pytest.approx(
+            intCriteria(traj, part, criteria)
+        )
+    assert dataset.assigned
+
+    env = robjects.globalenv[session.EnvironmentNameR]
+    name = dataset.name
+    assert name in env.keys()
+
+    dataset.close()
+    assert not dataset.assigned
+    assert name not in env.keys()
+
+    # garbage collection also releases the R copy
+    dataset = Dataset(traj)
+    name = dataset.assign()
+    del dataset
+    gc.collect()
+    assert name not in env.keys()
@@ -0,0 +1,219 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import gc
+import numpy as np
+import pytest
+from cluster_crit.distance import (
+    DistanceCache, condensedOffsets, condensedSize, pairIndices, pairwiseDistances,
+    precomputedBlocks, resolveMetric, rowBlocks
+)
+
+
+rng = np.random.default_rng(11)
+
+
+def _naiveDistances(x):
+    '''Compare every pair of points.
+    '''
+    return np.asarray([
+        np.linalg.norm(x[i] - x[j]) for i in range(len(x)) for j in range(i + 1, len(x))
+    ])
+
+
+def testPairwiseDistances():
+    '''The condensed distances match a direct computation.
+    '''
+    x = rng.normal(size=(57, 3))
+    assert np.allclose(pairwiseDistances(x), _naiveDistances(x))
+
+
+def testRowBlocksCoverUpperTriangle():
+    '''The blocks of rows cover every pair exactly once, in condensed order.
+    '''
+    n = 41
+    offsets = condensedOffsets(n)
+    pairs = [np.stack(pairIndices(n, start, stop, offsets)) for start, stop in rowBlocks(n, 30)]
+    pairs = np.concatenate(pairs, axis=1)
+    i, j = np.triu_indices(n, 1)
+    assert np.array_equal(pairs[0], i)
+    assert np.array_equal(pairs[1], j)
+
+
+def testCacheHit():
+    '''The distances of the same data set are computed only once.
+    '''
+    cache = DistanceCache()
+    x = rng.normal(size=(30, 2))
+
+    first = cache.get(x)
+    second = cache.get(x)
+    assert first is second
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert x in cache
+
+
+def testCacheLeastRecentlyUsed():
+    '''The least recently used data set is evicted first.
+    '''
+    cache = DistanceCache(maxEntries=2)
+    a, b, c = (rng.normal(size=(10, 2)) for _ in range(3))
+
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)
+    cache.get(c)
+    assert a in cache
+    assert b not in cache
+    assert c in cache
+
+
+def testCacheByteLimit():
+    '''The cache never holds more than its byte budget.
+    '''
+    x = rng.normal(size=(20, 2))
+    size = pairwiseDistances(x).nbytes
+
+    cache = DistanceCache(maxBytes=size)
+    y = rng.normal(size=(20, 2))
+    cache.get(x)
+    cache.get(y)
+    assert len(cache) == 1
+    assert cache.nbytes <= size
+
+    big = rng.normal(size=(40, 2))
+    cache.get(big)
+    assert big not in cache
+
+
+def testCacheReleasedWithData():
+    '''An entry is dropped when its data set is garbage collected.
+    '''
+    cache = DistanceCache()
+    x = rng.normal(size=(10, 2))
+    cache.get(x)
+    assert len(cache) == 1
+
+    del x
+    gc.collect()
+    assert len(cache) == 0
+
+
+def testCacheUnreferenceable():
+    '''Lists cannot be cached but their distances are still computed.
+    '''
+    cache = DistanceCache()
+    x = [[0.0], [1.0], [3.0]]
+    assert cache.get(x) == pytest.approx([1.0, 3.0, 2.0])
+    assert len(cache) == 0
+
+
+def testMetrics(subtests):
+    '''Every named metric matches a direct computation of its definition.
+    '''
+    x = rng.normal(size=(30, 3))
+    pairs = [(x[i], x[j]) for i in range(len(x)) for j in range(i + 1, len(x))]
+    expected = {
+        'sqeuclidean': [np.sum((a - b) ** 2) for a, b in pairs],
+        'cityblock': [np.sum(np.abs(a - b)) for a, b in pairs],
+        'chebyshev': [np.max(np.abs(a - b)) for a, b in pairs],
+        'cosine': [1 - a @ b / np.linalg.norm(a) / np.linalg.norm(b) for a, b in pairs],
+    }
+    for name, values in expected.items():
+        with subtests.test(metric=name):
+            assert np.allclose(pairwiseDistances(x, resolveMetric(name)), values)
+    with subtests.test("unknown"):
+        with pytest.raises(ValueError):
+            resolveMetric('dtw')
+
+
+def testPrecomputedBlocks(subtests):
+    '''Condensed vectors and square matrices give the same blocks of rows.
+    '''
+    x = rng.normal(size=(57, 2))
+    condensed = pairwiseDistances(x)
+    square = np.zeros((57, 57))
+    square[np.triu_indices(57, 1)] = condensed
+    square += square.T
+
+    for name, distances in (('condensed', condensed), ('square', square)):
+        with subtests.test(input=name):
+            blocks = list(precomputedBlocks(distances, entries=100))
+            assert len(blocks) > 1
+            assert np.array_equal(np.concatenate([d for _, _, d in blocks]), condensed)
+    with subtests.test("size"):
+        assert condensedSize(len(condensed)) == 57
+        with pytest.raises(ValueError):
+            condensedSize(len(condensed) - 1)
+
+
+def testPrecomputedCriteria(subtests, tmp_path):
+    '''The distance based criteria of precomputed distances match the values
+    computed from the observations, coordinate based criteria are rejected.
+    '''
+    from cluster_crit import intCriteria, intCriteriaBatch
+    from cluster_crit.criteria import CriteriaInternal
+    from cluster_crit.native import NativeCriteria
+    from cluster_crit.planner import CoordinateCriteria
+
+    x = rng.normal(size=(60, 3))
+    part = rng.integers(1, 4, size=60)
+    crit = [c for c in CriteriaInternal if c in NativeCriteria and c not in CoordinateCriteria]
+    expected = intCriteria(x, part, crit, backend='numpy')
+
+    condensed = pairwiseDistances(x)
+    square = np.zeros((60, 60))
+    square[np.triu_indices(60, 1)] = condensed
+    square += square.T
+    np.save(tmp_path / "square.npy", square)
+    mapped = np.load(tmp_path / "square.npy", mmap_mode='r')
+
+    inputs = {'condensed': condensed, 'square': square, 'memmap': mapped, 'path': str(tmp_path / "square.npy")}
+    for name, distances in inputs.items():
+        for maxMemory in (None, 1 << 16):
+            with subtests.test(input=name, maxMemory=maxMemory):
+                values = intCriteria(distances, part, crit, backend='numpy', metric='precomputed',
+                                     maxMemory=maxMemory)
+                assert values == pytest.approx(expected, rel=1e-9)
+
+    with subtests.test("metric"):
+        cosine = intCriteria(x, part, crit, backend='numpy', metric='cosine')
+        precomputed = intCriteria(pairwiseDistances(x, resolveMetric('cosine')), part, crit,
+                                  backend='numpy', metric='precomputed')
+        assert cosine == pytest.approx(precomputed, rel=1e-9)
+    with subtests.test("batch"):
+        table = intCriteriaBatch(condensed, [part, part[::-1]], crit, backend='numpy', metric='precomputed')
+        assert np.allclose(table[0], [expected[c.name] for c in crit])
+    with subtests.test("coordinates"):
+        with pytest.raises(ValueError, match="Calinski_Harabasz"):
+            intCriteria(condensed, part, [CriteriaInternal.Calinski_Harabasz], backend='numpy',
+                        metric='precomputed')
+        with pytest.raises(ValueError):
+            intCriteria(x, part, [CriteriaInternal.Xie_Beni], backend='numpy', metric='cosine')
+    with subtests.test("invalid"):
+        with pytest.raises(ValueError):
+            intCriteria(condensed, part, crit, metric='precomputed')
+        with pytest.raises(ValueError):
+            intCriteria(condensed, part[:-1], crit, backend='numpy', metric='precomputed')
+        with pytest.raises(ValueError):
+            intCriteria(square[:, :-1], part, crit, backend='numpy', metric='precomputed')
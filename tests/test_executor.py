@@ -0,0 +1,140 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import asyncio
+import threading
+import numpy as np
+import pytest
+from cluster_crit import (
+    RExecutor, ExecutorBusyError, aintCriteria, aextCriteria, abestCriterion,
+    intCriteria, extCriteria, bestCriterion
+)
+from cluster_crit.criteria import CriteriaExternal, CriteriaInternal
+
+
+rng = np.random.default_rng(18)
+traj = rng.normal(size=(60, 2))
+partitions = [rng.integers(1, k + 1, size=60) for k in range(2, 7)]
+subsets = [
+    [CriteriaInternal.Calinski_Harabasz, CriteriaInternal.Silhouette],
+    [CriteriaInternal.Dunn],
+    [CriteriaInternal.Silhouette, CriteriaInternal.Trace_W],
+]
+
+
+def testCoalescedRequests(subtests):
+    '''Requests against the same data set, waiting together, are merged into one
+    call and each receives the criteria it requested.
+    '''
+    async def main(executor):
+        gate = threading.Event()
+        blocked = asyncio.ensure_future(executor.run(gate.wait))
+        requests = [
+            asyncio.ensure_future(executor.intCriteria(traj, p, subsets[i % len(subsets)], 'numpy'))
+            for i, p in enumerate(partitions)
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        await blocked
+        return await asyncio.gather(*requests)
+
+    with RExecutor() as executor:
+        outputs = asyncio.run(main(executor))
+
+    with subtests.test("one call"):
+        assert executor.calls == 2
+
+    for i, (p, output) in enumerate(zip(partitions, outputs)):
+        with subtests.test(partition=i):
+            expected = intCriteria(traj, p, subsets[i % len(subsets)], backend='numpy')
+            assert output.keys() == expected.keys()
+            np.testing.assert_allclose(list(output.values()), list(expected.values()))
+
+
+def testBackpressure(subtests):
+    '''Requests are refused once the queue is full.'''
+    async def main(executor):
+        gate = threading.Event()
+        blocked = asyncio.ensure_future(executor.run(gate.wait))
+        await asyncio.sleep(0)
+        waiting = [asyncio.ensure_future(executor.run(len, [])) for _ in range(executor.maxQueue + 2)]
+        await asyncio.sleep(0)
+        gate.set()
+        await blocked
+        return await asyncio.gather(*waiting, return_exceptions=True)
+
+    with RExecutor(maxQueue=2) as executor:
+        outputs = asyncio.run(main(executor))
+
+    with subtests.test("refused"):
+        assert any(isinstance(o, ExecutorBusyError) for o in outputs)
+    with subtests.test("accepted"):
+        assert 0 in outputs
+
+
+def testTimeout(subtests):
+    '''A request that times out while waiting is never run.'''
+    async def main(executor):
+        gate = threading.Event()
+        blocked = asyncio.ensure_future(executor.run(gate.wait))
+        await asyncio.sleep(0)
+        with subtests.test("timeout"):
+            with pytest.raises(asyncio.TimeoutError):
+                await executor.intCriteria(traj, partitions[0], subsets[0], 'numpy', timeout=0.05)
+        gate.set()
+        await blocked
+        return await executor.run(len, [])
+
+    with RExecutor() as executor:
+        asyncio.run(main(executor))
+
+    with subtests.test("skipped"):
+        assert executor.calls == 2
+
+
+def testErrors():
+    '''Errors raised by the executor are raised to the caller.'''
+    async def main():
+        return await abestCriterion(np.arange(3.0), "McNemar")
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def testModuleFunctions(subtests):
+    '''The module functions use the default executor.'''
+    async def main():
+        return await asyncio.gather(
+            aintCriteria(traj, partitions[0], subsets[0], backend='numpy'),
+            aextCriteria(partitions[0], partitions[1], [CriteriaExternal.Rand], backend='numpy'),
+            abestCriterion(np.array([1.0, 3.0, 2.0]), "Dunn"),
+        )
+
+    internal, external, best = asyncio.run(main())
+    with subtests.test("intCriteria"):
+        expected = intCriteria(traj, partitions[0], subsets[0], backend='numpy')
+        np.testing.assert_allclose(list(internal.values()), list(expected.values()))
+    with subtests.test("extCriteria"):
+        assert external == extCriteria(partitions[0], partitions[1], [CriteriaExternal.Rand], backend='numpy')
+    with subtests.test("bestCriterion"):
+        assert best == bestCriterion(np.array([1.0, 3.0, 2.0]), "Dunn") == 1
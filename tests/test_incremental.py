@@ -0,0 +1,109 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+import pytest
+from cluster_crit import IncrementalCriteria
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.incremental import IncrementalSupported
+from cluster_crit.scatter import scatterCriteria
+
+
+rng = np.random.default_rng(5)
+traj = rng.normal(size=(60, 3)) + np.repeat(np.eye(3) * 4, 20, axis=0)
+part = np.repeat(['a', 'b', 'c'], 20)
+crit = [c for c in CriteriaInternal if c in IncrementalSupported]
+moments = [c for c in crit if c != CriteriaInternal.Davies_Bouldin]
+
+
+def _naiveDaviesBouldin(x, labels):
+    '''Davies-Bouldin index from its definition.'''
+    clusters = [x[np.asarray(labels) == label] for label in sorted(set(labels))]
+    centroids = [c.mean(axis=0) for c in clusters]
+    spread = [np.linalg.norm(c - g, axis=1).mean() for c, g in zip(clusters, centroids)]
+    total = 0.0
+    for i in range(len(clusters)):
+        total += max(
+            (spread[i] + spread[j]) / np.linalg.norm(centroids[i] - centroids[j])
+            for j in range(len(clusters)) if j != i
+        )
+    return total / len(clusters)
+
+
+def _check(incremental, points):
+    '''Compare the incremental criteria with a computation from scratch.'''
+    current = points[incremental.indices]
+    labels = incremental.part
+    values = incremental.criteria(crit)
+    expected = dict(zip([c.name for c in moments], scatterCriteria(current, labels, moments)))
+    expected['Davies_Bouldin'] = _naiveDaviesBouldin(current, labels)
+    for name, value in expected.items():
+        assert np.isclose(values[name], value, rtol=1e-8), name
+
+
+def testIncrementalUpdates(subtests):
+    '''The criteria match a computation from scratch after moves, additions
+    and removals, including new and emptied clusters.
+    '''
+    incremental = IncrementalCriteria(traj, part)
+    points = traj.copy()
+
+    with subtests.test(step='initial'):
+        _check(incremental, points)
+
+    with subtests.test(step='move'):
+        incremental.move(3, 'b')
+        incremental.move([10, 30, 50], ['c', 'a', 'b'])
+        _check(incremental, points)
+
+    with subtests.test(step='add'):
+        extra = rng.normal(size=(15, 3)) + 8
+        idx = incremental.add(extra, 'd')
+        points = np.concatenate((points, extra))
+        assert idx.tolist() == list(range(60, 75))
+        _check(incremental, points)
+
+    with subtests.test(step='remove'):
+        incremental.remove([0, 1, 2, 61, 62])
+        assert incremental.n == 70
+        _check(incremental, points)
+
+    with subtests.test(step='empty cluster'):
+        incremental.move([i for i in incremental.indices if i >= 60], 'a')
+        assert incremental.k == 3
+        _check(incremental, points)
+
+
+def testIncrementalInvalid(subtests):
+    '''Unknown indices and unsupported criteria are rejected.'''
+    incremental = IncrementalCriteria(traj, part)
+    incremental.remove(4)
+    with subtests.test(error='removed index'):
+        with pytest.raises(IndexError):
+            incremental.move(4, 'a')
+    with subtests.test(error='out of range'):
+        with pytest.raises(IndexError):
+            incremental.remove(60)
+    with subtests.test(error='unsupported'):
+        with pytest.raises(ValueError):
+            incremental.criteria([CriteriaInternal.Silhouette])
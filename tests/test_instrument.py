@@ -0,0 +1,158 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import logging
+import numpy as np
+import pytest
+from cluster_crit import (
+    MetricsCollector, addHook, removeHook, instrument, loggingHook,
+    intCriteria, intCriteriaBatch, extCriteria
+)
+from cluster_crit.criteria import CriteriaInternal, CriteriaExternal
+from cluster_crit.instrument import Histogram, currentRecord, record
+
+
+rng = np.random.default_rng(4)
+traj = rng.normal(size=(30, 3))
+part = rng.integers(1, 4, size=30)
+crit = [CriteriaInternal.Calinski_Harabasz, CriteriaInternal.Dunn]
+
+
+def testRecords(subtests):
+    '''Every entry point passes one record describing the call to the hooks.'''
+    records = []
+    with instrument(records.append):
+        intCriteria(traj, part, crit, backend='numpy')
+        intCriteriaBatch(traj, [part, part % 2 + 1], crit, backend='numpy')
+        extCriteria(part, part, [CriteriaExternal.Rand], backend='numpy')
+    intCriteria(traj, part, crit, backend='numpy')
+
+    assert [r.entry for r in records] == ['intCriteria', 'intCriteriaBatch', 'extCriteria']
+
+    with subtests.test(entry='intCriteria'):
+        rec = records[0]
+        assert (rec.backend, rec.n, rec.d, rec.k, rec.partitions) == ('numpy', 30, 3, 3, 1)
+        assert rec.criteria == ['Calinski_Harabasz', 'Dunn']
+        assert set(rec.phases) == {'compute'}
+        assert 0 <= rec.phases['compute'] <= rec.seconds
+
+    with subtests.test(entry='intCriteriaBatch'):
+        assert (records[1].n, records[1].k, records[1].partitions) == (30, 3, 2)
+
+    with subtests.test(entry='extCriteria'):
+        assert (records[2].n, records[2].d, records[2].k) == (30, None, 3)
+
+
+def testRecordPrecomputed(subtests):
+    '''With precomputed distances N is the number of points and d is unknown,
+    and K is only counted when it is read.'''
+    from cluster_crit.distance import pairwiseDistances
+
+    records = []
+    with instrument(records.append):
+        intCriteria(pairwiseDistances(traj), part, [CriteriaInternal.Dunn], backend='numpy',
+                    metric='precomputed')
+        with record('test', 'numpy', part=part):
+            pass
+
+    with subtests.test("precomputed"):
+        assert (records[0].n, records[0].d, records[0].k) == (30, None, 3)
+    with subtests.test("lazy"):
+        assert records[1]._k is None
+        assert records[1].k == 3
+
+
+def testRecordError():
+    '''Calls raising an error are recorded with the error.'''
+    records = []
+    addHook(records.append)
+    try:
+        with pytest.raises(ValueError):
+            intCriteria(traj, part[:10], crit, backend='numpy')
+    finally:
+        removeHook(records.append)
+    assert records[0].error == 'ValueError'
+
+
+def testFailingHook(subtests, caplog):
+    '''A hook raising an error is logged, the other hooks still run and the
+    caller receives the result or the error of the call.
+    '''
+    def failing(rec):
+        raise RuntimeError("broken hook")
+
+    records = []
+    with caplog.at_level(logging.ERROR, logger='cluster_crit'):
+        with instrument(failing), instrument(records.append):
+            with subtests.test("result"):
+                output = intCriteria(traj, part, crit, backend='numpy')
+                assert output == intCriteria(traj, part, crit, backend='numpy')
+            with subtests.test("error"):
+                with pytest.raises(ValueError):
+                    intCriteria(traj, part[:10], crit, backend='numpy')
+
+    assert [r.error for r in records] == [None, None, 'ValueError']
+    assert len(caplog.records) == 3
+    assert all('broken hook' in r.exc_text for r in caplog.records)
+
+
+def testNothingRecordedWithoutHooks():
+    '''Without hooks the measurements are discarded.'''
+    with currentRecord().phase('compute'):
+        pass
+    currentRecord().addBytes(10)
+
+
+def testHistogram():
+    '''The buckets are cumulative and end with +Inf.'''
+    h = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        h.observe(value)
+    assert h.cumulative() == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+    assert (h.count, h.sum) == (4, 2.65)
+
+
+def testMetricsCollector():
+    '''The collector aggregates the records and exports them as Prometheus text.'''
+    collector = MetricsCollector()
+    with instrument(collector):
+        for _ in range(3):
+            intCriteria(traj, part, crit, backend='numpy')
+
+    assert collector.histogram('intCriteria', 'numpy').count == 3
+    assert collector.histogram('intCriteria', 'numpy', 'compute').count == 3
+    assert collector.calls == {('intCriteria', 'numpy'): 3}
+
+    text = collector.toPrometheus()
+    assert '# TYPE cluster_crit_phase_seconds histogram' in text
+    assert 'cluster_crit_phase_seconds_bucket{entry="intCriteria",backend="numpy",phase="total",le="+Inf"} 3' in text
+    assert 'cluster_crit_calls_total{entry="intCriteria",backend="numpy"} 3' in text
+
+
+def testLoggingHook(caplog):
+    '''The logging hook writes one line per call.'''
+    with caplog.at_level(logging.INFO, logger='cluster_crit'):
+        with instrument(loggingHook()):
+            intCriteria(traj, part, crit, backend='numpy')
+    assert len(caplog.records) == 1
+    assert caplog.records[0].getMessage().startswith('intCriteria backend=numpy n=30 d=3 k=3')
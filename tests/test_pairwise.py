@@ -0,0 +1,202 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+import numpy as np
+from cluster_crit import distance
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.native import nativeCriteria
+from cluster_crit.pairwise import PairwiseCriteria, sumSmallest
+from cluster_crit import pairwise
+
+
+rng = np.random.default_rng(4321)
+traj = np.vstack([
+    rng.normal(0.0, 0.6, size=(20, 2)),
+    rng.normal(2.0, 0.6, size=(15, 2)),
+    rng.normal(4.0, 0.6, size=(25, 2)),
+])
+part = np.repeat([1, 2, 3], [20, 15, 25])
+rng.shuffle(part[:30])
+
+
+def _naiveValues():
+    '''Straight forward implementation of the formulas found in the
+    clusterCrit documentation.
+    '''
+    n = len(traj)
+    labels = np.unique(part)
+    members = [np.flatnonzero(part == label) for label in labels]
+    dist = np.sqrt(((traj[:, None, :] - traj[None, :, :]) ** 2).sum(axis=-1))
+
+    within, between = [], []
+    for i in range(n):
+        for j in range(i + 1, n):
+            (within if part[i] == part[j] else between).append(dist[i, j])
+    nw, nb, nt = len(within), len(between), n * (n - 1) // 2
+    ordered = np.sort(within + between)
+
+    silhouettes = []
+    for m in members:
+        widths = []
+        for i in m:
+            a = dist[i, m[m != i]].mean()
+            b = min(dist[i, o].mean() for o in members if o is not m)
+            widths.append((b - a) / max(a, b))
+        silhouettes.append(np.mean(widths))
+
+    def delta(u, x, y):
+        if u == 1:
+            return dist[np.ix_(x, y)].min()
+        if u == 2:
+            return dist[np.ix_(x, y)].max()
+        if u == 3:
+            return dist[np.ix_(x, y)].mean()
+        gx, gy = traj[x].mean(axis=0), traj[y].mean(axis=0)
+        if u == 4:
+            return np.linalg.norm(gx - gy)
+        return (
+            np.linalg.norm(traj[x] - gx, axis=1).sum() + np.linalg.norm(traj[y] - gy, axis=1).sum()
+        ) / (len(x) + len(y))
+
+    def diameter(v, x):
+        if v == 1:
+            return dist[np.ix_(x, x)].max()
+        if v == 2:
+            return dist[np.ix_(x, x)].sum() / (len(x) * (len(x) - 1))
+        return 2 * np.linalg.norm(traj[x] - traj[x].mean(axis=0), axis=1).mean()
+
+    values = {
+        CriteriaInternal.C_index: (sum(within) - ordered[:nw].sum()) / (ordered[-nw:].sum() - ordered[:nw].sum()),
+        CriteriaInternal.Dunn: min(between) / max(within),
+        CriteriaInternal.McClain_Rao: (np.mean(within)) / (np.mean(between)),
+        CriteriaInternal.Point_Biserial: (np.mean(within) - np.mean(between)) * np.sqrt(nw * nb) / nt,
+        CriteriaInternal.Silhouette: np.mean(silhouettes),
+    }
+    for u in range(1, 6):
+        for v in range(1, 4):
+            values[CriteriaInternal['GDI{}{}'.format(u, v)]] = min(
+                delta(u, members[x], members[y])
+                for x in range(len(members)) for y in range(len(members)) if x != y
+            ) / max(diameter(v, m) for m in members)
+
+    return values
+
+
+def testPairwiseCriteriaMatchFormulas(subtests):
+    '''Every distance based criterion should match a direct
+    implementation of its definition.
+    '''
+    expected = _naiveValues()
+    criteria = list(PairwiseCriteria)
+    output = nativeCriteria(traj, part, criteria)
+
+    for crit, value in zip(criteria, output):
+        with subtests.test(crit=crit):
+            assert value == pytest.approx(expected[crit], rel=1e-9)
+
+
+def testPairwiseSmallBlocks(monkeypatch):
+    '''Accumulating the statistics over many small blocks of pairs gives
+    the same values.
+    '''
+    criteria = list(PairwiseCriteria)
+    expected = nativeCriteria(traj, part, criteria)
+
+    monkeypatch.setattr(distance, "BlockEntries", 50)
+    distance.distanceCache.clear()
+    assert nativeCriteria(traj, part, criteria) == pytest.approx(expected, rel=1e-12)
+    distance.distanceCache.clear()
+
+
+def testTiledMatchesInMemory(monkeypatch):
+    '''Computing the distances block by block within a small memory budget
+    gives the same values, and nothing is cached.
+    '''
+    criteria = list(PairwiseCriteria) + [CriteriaInternal.Xie_Beni]
+    expected = nativeCriteria(traj, part, criteria)
+
+    distance.distanceCache.clear()
+    monkeypatch.setattr(pairwise, "SelectionBins", 4)
+    output = nativeCriteria(traj, part, criteria, maxMemory=distance.PairBytes * 40)
+
+    assert output == pytest.approx(expected, rel=1e-12)
+    assert traj not in distance.distanceCache
+
+
+def testXieBeniWithoutDistances(subtests):
+    '''Alone, Xie_Beni finds the closest pair of clusters block by block and
+    never fills the distance cache. It uses the cached distances when they exist.
+    '''
+    from cluster_crit.scatter import scatterCriteria
+
+    expected = scatterCriteria(traj, part, [CriteriaInternal.Xie_Beni])
+    distance.distanceCache.clear()
+    with subtests.test("scatter"):
+        assert nativeCriteria(traj, part, [CriteriaInternal.Xie_Beni]) == pytest.approx(expected, rel=1e-12)
+        assert traj not in distance.distanceCache
+    with subtests.test("cached"):
+        nativeCriteria(traj, part, [CriteriaInternal.Dunn])
+        assert traj in distance.distanceCache
+        assert nativeCriteria(traj, part, [CriteriaInternal.Xie_Beni]) == pytest.approx(expected, rel=1e-12)
+    distance.distanceCache.clear()
+
+
+def testSumSmallest(monkeypatch, subtests):
+    '''The multi-pass selection matches sorting every value, including
+    ties and a capacity smaller than the candidate bins.
+    '''
+    monkeypatch.setattr(pairwise, "SelectionBins", 8)
+    values = np.round(rng.random(500) * 10, 1)
+    blocks = np.array_split(values, 7)
+    ordered = np.sort(values)
+
+    for count in (0, 1, 17, 250, 499, 500):
+        with subtests.test(count=count):
+            smallest = sumSmallest(lambda: iter(blocks), count, 5)
+            largest = sumSmallest(lambda: iter(blocks), count, 5, largest=True)
+            assert smallest == pytest.approx(ordered[:count].sum())
+            assert largest == pytest.approx(ordered[len(ordered) - count:].sum())
+
+
+def testSilhouetteSingleton():
+    '''A point alone in its cluster has a silhouette width of 0.
+    '''
+    x = np.asarray([[0.0], [0.1], [0.2], [5.0]])
+    value, = nativeCriteria(x, [1, 1, 1, 2], [CriteriaInternal.Silhouette])
+    assert np.isfinite(value)
+
+
+def testPairwiseMatchesR(subtests):
+    '''The numpy backend should agree with the clusterCrit R package.
+    '''
+    pytest.importorskip("rpy2")
+    from cluster_crit import intCriteria
+
+    criteria = list(PairwiseCriteria)
+    fromR = intCriteria(traj, part, criteria)
+    fromNumpy = intCriteria(traj, part, criteria, backend='numpy')
+
+    for crit in criteria:
+        with subtests.test(crit=crit):
+            assert fromNumpy[crit.name] == pytest.approx(fromR[crit.name], rel=1e-6)
@@ -0,0 +1,71 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import warnings
+import numpy as np
+import pytest
+from cluster_crit import ParallelEvaluator, intCriteriaBatch
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.native import NativeCriteria
+
+
+rng = np.random.default_rng(8)
+traj = rng.normal(size=(80, 3))
+partitions = [rng.integers(1, k + 1, size=80) for k in range(2, 9)]
+crit = [c for c in CriteriaInternal if c in NativeCriteria]
+
+
+def testParallelEvaluator(subtests):
+    '''The workers find the same values as a serial evaluation, for several
+    batches sharing the same pool.
+    '''
+    expected = intCriteriaBatch(traj, partitions, crit, backend='numpy')
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        with ParallelEvaluator(2, backend='numpy') as evaluator:
+            for name, data in (('first', traj), ('second', traj * 2.0)):
+                with subtests.test(batch=name):
+                    values = evaluator.intCriteriaBatch(data, partitions, crit)
+                    serial = expected if name == 'first' else intCriteriaBatch(
+                        data, partitions, crit, backend='numpy'
+                    )
+                    assert list(values.index) == list(serial.index)
+                    np.testing.assert_allclose(values.values, serial.values, equal_nan=True)
+
+
+def testBatchJobs():
+    '''nJobs spreads a batch over a temporary pool of workers.'''
+    expected = intCriteriaBatch(traj, partitions, crit, backend='numpy')
+    values = intCriteriaBatch(traj, partitions, crit, backend='numpy', nJobs=2)
+    np.testing.assert_allclose(values.values, expected.values, equal_nan=True)
+
+
+def testParallelEvaluatorR():
+    '''The R workers match the R backend.'''
+    pytest.importorskip("rpy2")
+    subset = [CriteriaInternal.Calinski_Harabasz, CriteriaInternal.Silhouette]
+    expected = intCriteriaBatch(traj, partitions, subset)
+    with ParallelEvaluator(2) as evaluator:
+        values = evaluator.intCriteriaBatch(traj, partitions, subset)
+    np.testing.assert_allclose(values.values, expected.values)
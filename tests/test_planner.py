@@ -0,0 +1,118 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+from cluster_crit import planner
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.native import NativeCriteria, nativeCriteria, nativeCriteriaBatch
+from cluster_crit.planner import Intermediates, Plan, Requirements
+
+
+rng = np.random.default_rng(21)
+traj = rng.normal(size=(50, 3))
+part = rng.integers(1, 5, size=50)
+every = [c for c in CriteriaInternal if c != CriteriaInternal.ALL]
+
+
+def testRequirementsCoverCriteria():
+    '''Every criterion of the numpy backend declares known intermediates.'''
+    assert set(Requirements) == set(NativeCriteria)
+    for names in Requirements.values():
+        assert all(name in Intermediates for name in names)
+    for requires, _ in Intermediates.values():
+        assert all(name in Intermediates for name in requires)
+
+
+def testPlanOrder(subtests):
+    '''Each intermediate appears once, after the ones it depends on.'''
+    for criteria in (every, [CriteriaInternal.GDI53], [CriteriaInternal.Trace_W]):
+        with subtests.test(criteria=len(criteria)):
+            plan = Plan(criteria)
+            assert len(plan.steps) == len(set(plan.steps))
+            for position, name in enumerate(plan.steps):
+                assert all(plan.steps.index(r) < position for r in Intermediates[name][0])
+
+    with subtests.test(criteria='scatter only'):
+        assert Plan([CriteriaInternal.Trace_W, CriteriaInternal.Calinski_Harabasz]).steps == ['scatter']
+
+
+def testIntermediatesComputedOnce(monkeypatch):
+    '''Evaluating every criterion computes each intermediate once per partition.'''
+    calls = {}
+
+    def counted(name, compute):
+        def _compute(ctx):
+            calls[name] = calls.get(name, 0) + 1
+            return compute(ctx)
+        return _compute
+
+    for name, (requires, compute) in list(Intermediates.items()):
+        monkeypatch.setitem(planner.Intermediates, name, (requires, counted(name, compute)))
+
+    nativeCriteriaBatch(traj, [part, part % 2 + 1], every)
+    assert set(calls) == set(Intermediates)
+    assert all(count == 2 for count in calls.values())
+
+
+def testPlanMatchesSeparateEvaluation():
+    '''Sharing the intermediates does not change any value.'''
+    together = nativeCriteria(traj, part, every)
+    separate = [nativeCriteria(traj, part, [c])[0] for c in every]
+    np.testing.assert_allclose(together, separate, equal_nan=True)
+
+
+def testPointSumsOnlyForSilhouette(subtests):
+    '''The N x K point sums are accumulated only when Silhouette is planned.'''
+    from cluster_crit.native import DistanceSource, PartitionStatistics
+
+    source = DistanceSource(traj, traj, cache=False)
+    for criteria, expected in (([CriteriaInternal.Dunn], False),
+                               ([CriteriaInternal.Dunn, CriteriaInternal.Silhouette], True)):
+        with subtests.test(criteria=[c.name for c in criteria]):
+            stats = PartitionStatistics(traj, part, source)
+            stats.evaluate(Plan(criteria))
+            assert (stats.pairwise.pointSums is not None) == expected
+    with subtests.test("outside a plan"):
+        stats = PartitionStatistics(traj, part, source)
+        stats.evaluate(Plan([CriteriaInternal.Dunn]))
+        assert stats.get('pointSums').shape == (50, 4)
+
+
+def testDistanceSourceCallsOnce(monkeypatch, subtests):
+    '''The distances are read and the extremes selected once per partition,
+    also when several criteria use them.
+    '''
+    from cluster_crit.native import DistanceSource
+
+    for method in ('blocks', 'sumExtremes'):
+        calls = {}
+
+        def counted(self, *args, _method=getattr(DistanceSource, method), _name=method):
+            calls[_name] = calls.get(_name, 0) + 1
+            return _method(self, *args)
+
+        with subtests.test(method=method):
+            with monkeypatch.context() as m:
+                m.setattr(DistanceSource, method, counted)
+                nativeCriteria(traj, part, [CriteriaInternal.C_index, CriteriaInternal.Dunn])
+            assert calls == {method: 1}
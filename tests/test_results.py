@@ -0,0 +1,108 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import math
+import numpy as np
+from cluster_crit import ResultCache, intCriteria, extCriteria
+from cluster_crit.criteria import CriteriaInternal, CriteriaExternal
+from cluster_crit.results import EntryBytes, digest
+
+
+rng = np.random.default_rng(3)
+traj = rng.normal(size=(40, 2))
+part = rng.integers(1, 4, size=40)
+other = rng.integers(1, 5, size=40)
+
+
+def testDigest(subtests):
+    '''The digest depends on the content, type and shape of the data only.'''
+    with subtests.test(case='equal content'):
+        assert digest(traj, part) == digest(traj.copy(), list(part))
+    with subtests.test(case='different content'):
+        assert digest(traj, part) != digest(traj, other)
+    with subtests.test(case='different shape'):
+        assert digest(traj) != digest(traj.reshape(2, -1))
+    with subtests.test(case='strings'):
+        assert digest('a', ['x', 'y']) == digest('a', np.array(['x', 'y']))
+
+
+def testResultCacheMissingOnly():
+    '''Only the criteria missing from the cache are computed.'''
+    cache = ResultCache()
+    calls = []
+
+    def compute(names):
+        calls.append(list(names))
+        return [float(len(n)) for n in names]
+
+    scope = cache.scope('test', traj, part)
+    assert cache.fetch(scope, ['a', 'bb'], compute) == [1.0, 2.0]
+    assert cache.fetch(scope, ['bb', 'ccc', 'a'], compute) == [2.0, 3.0, 1.0]
+    assert calls == [['a', 'bb'], ['ccc']]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def testResultCacheCriteria(subtests):
+    '''Cached values match the computed values.'''
+    cache = ResultCache()
+    internal = [CriteriaInternal.Calinski_Harabasz, CriteriaInternal.Silhouette]
+    external = [CriteriaExternal.Rand, CriteriaExternal.Jaccard]
+
+    with subtests.test(kind='internal'):
+        expected = intCriteria(traj, part, internal, backend='numpy')
+        for _ in range(2):
+            values = intCriteria(traj, part, internal, backend='numpy', resultCache=cache)
+            assert values == expected
+        assert cache.hits == 2
+
+    with subtests.test(kind='external'):
+        expected = extCriteria(part, other, external, backend='numpy')
+        for _ in range(2):
+            values = extCriteria(part, other, external, backend='numpy', resultCache=cache)
+            assert values == expected
+        assert cache.hits == 4
+
+
+def testResultCacheDisk(tmp_path):
+    '''The disk tier persists the values, including NaN, between caches.'''
+    with ResultCache(directory=str(tmp_path)) as cache:
+        cache.fetch('scope', ['a', 'b'], lambda names: [1.5, math.nan])
+
+    with ResultCache(directory=str(tmp_path)) as cache:
+        values = cache.fetch('scope', ['a', 'b'], lambda names: 1 / 0)
+        assert values[0] == 1.5 and math.isnan(values[1])
+        assert len(cache) == 2
+
+
+def testResultCacheBudget():
+    '''The memory tier drops the least recently used values.'''
+    cache = ResultCache(maxBytes=3 * EntryBytes)
+    cache.fetch('scope', ['a', 'b', 'c'], lambda names: [1.0] * len(names))
+    cache.fetch('scope', ['a'], lambda names: 1 / 0)
+    cache.fetch('scope', ['d'], lambda names: [2.0])
+    assert len(cache) == 3
+    assert cache.nbytes <= cache.maxBytes
+
+    computed = []
+    cache.fetch('scope', ['a', 'b'], lambda names: computed.extend(names) or [3.0] * len(names))
+    assert computed == ['b']
@@ -0,0 +1,89 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+from cluster_crit import intCriteria, distanceCache
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.sampling import Estimate, stratifiedSample
+
+
+rng = np.random.default_rng(11)
+centers = np.array([[0.0, 0.0], [6.0, 0.0], [0.0, 6.0]])
+sizes = [600, 300, 100]
+traj = np.concatenate([c + rng.normal(size=(s, 2)) for c, s in zip(centers, sizes)])
+part = np.repeat([1, 2, 3], sizes)
+crit = [
+    CriteriaInternal.Silhouette, CriteriaInternal.C_index,
+    CriteriaInternal.Gamma, CriteriaInternal.Dunn
+]
+
+
+def testStratifiedSample(subtests):
+    '''The subsample has the requested size and keeps the cluster proportions,
+    with at least two points in every cluster.
+    '''
+    codes = part - 1
+    for size in (10, 50, 250):
+        with subtests.test(size=size):
+            sample = stratifiedSample(codes, size, np.random.default_rng(0))
+            counts = np.bincount(codes[sample], minlength=3)
+            assert len(np.unique(sample)) == len(sample)
+            assert counts.sum() >= size
+            assert np.all(counts >= 2)
+            assert np.all(np.abs(counts - size * np.bincount(codes) / len(codes)) <= 2)
+
+
+def testApproximateCriteria(subtests):
+    '''The estimates are reproducible for a given seed, and their intervals
+    surround the mean and are close to the exact values.
+    '''
+    exact = intCriteria(traj, part, crit, backend='numpy')
+    first = intCriteria(traj, part, crit, backend='numpy', approximate=True,
+                        sampleSize=200, nRepeats=8, seed=3)
+    second = intCriteria(traj, part, crit, backend='numpy', approximate=True,
+                         sampleSize=200, nRepeats=8, seed=3)
+
+    for name, estimate in first.items():
+        with subtests.test(criterion=name):
+            assert isinstance(estimate, Estimate)
+            assert estimate == second[name]
+            assert estimate.lower <= estimate.value <= estimate.upper
+            if name != 'Dunn':
+                # the Dunn index depends on the extreme distances and is biased by sampling
+                assert abs(estimate.value - exact[name]) < 0.05
+
+
+def testApproximateSmallDataset():
+    '''Data sets not larger than the sample size are computed exactly, and the
+    subsamples are kept out of the distance cache.
+    '''
+    distanceCache.clear()
+    exact = intCriteria(traj, part, crit, backend='numpy')
+    estimates = intCriteria(traj, part, crit, backend='numpy', approximate=True,
+                            sampleSize=len(traj))
+    for name, estimate in estimates.items():
+        assert estimate.value == estimate.lower == estimate.upper
+        assert np.isclose(estimate.value, exact[name])
+
+    intCriteria(traj, part, crit, backend='numpy', approximate=True, sampleSize=100, nRepeats=2)
+    assert len(distanceCache) == 1
@@ -0,0 +1,217 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import pytest
+import numpy as np
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.scatter import ScatterCriteria, ScatterStatistics, asMatrix, factorize, scatterCriteria
+
+
+rng = np.random.default_rng(1234)
+traj = np.vstack([
+    rng.normal(0.0, 0.5, size=(30, 3)),
+    rng.normal(2.0, 0.5, size=(25, 3)),
+    rng.normal(4.0, 0.5, size=(35, 3)),
+])
+part = np.repeat([1, 2, 3], [30, 25, 35])
+rng.shuffle(part[:40])
+
+
+def _naiveValues():
+    '''Straight forward implementation of the formulas found in the
+    clusterCrit documentation.
+    '''
+    labels = np.unique(part)
+    n, p = traj.shape
+    k = len(labels)
+    center = traj.mean(axis=0)
+
+    wgk, nk, centroids = [], [], []
+    for label in labels:
+        members = traj[part == label]
+        g = members.mean(axis=0)
+        wgk.append((members - g).T @ (members - g))
+        nk.append(len(members))
+        centroids.append(g)
+
+    wgk, nk, centroids = np.asarray(wgk), np.asarray(nk), np.asarray(centroids)
+    wg = wgk.sum(axis=0)
+    bg = sum(nk[i] * np.outer(centroids[i] - center, centroids[i] - center) for i in range(k))
+    t = (traj - center).T @ (traj - center)
+    wgss, bgss = np.trace(wg), np.trace(bg)
+
+    centroidDist = [
+        np.linalg.norm(centroids[i] - centroids[j]) for i in range(k) for j in range(i + 1, k)
+    ]
+    minBetween = min(
+        np.sum((traj[i] - traj[j]) ** 2)
+        for i in range(n) for j in range(i + 1, n) if part[i] != part[j]
+    )
+    ew = sum(np.linalg.norm(traj[i] - centroids[np.searchsorted(labels, part[i])]) for i in range(n))
+    et = sum(np.linalg.norm(traj[i] - center) for i in range(n))
+
+    delta = [np.linalg.norm(traj[part == label] - centroids[i], axis=1).mean() for i, label in enumerate(labels)]
+    db = np.mean([
+        max((delta[i] + delta[j]) / np.linalg.norm(centroids[i] - centroids[j]) for j in range(k) if j != i)
+        for i in range(k)
+    ])
+
+    variances = [traj[part == label].var(axis=0) for label in labels]
+    scat = np.mean([np.linalg.norm(v) for v in variances]) / np.linalg.norm(traj.var(axis=0))
+    dis = max(centroidDist) / min(centroidDist) * sum(
+        1.0 / sum(np.linalg.norm(centroids[i] - centroids[j]) for j in range(k) if j != i) for i in range(k)
+    )
+
+    sigma = np.sqrt(sum(np.linalg.norm(v) for v in variances)) / k
+    def density(point, i, j):
+        members = traj[(part == labels[i]) | (part == labels[j])]
+        return np.sum(np.linalg.norm(members - point, axis=1) < sigma)
+    ratios = [
+        density((centroids[i] + centroids[j]) / 2, i, j) /
+        max(density(centroids[i], i, j), density(centroids[j], i, j))
+        for i in range(k) for j in range(i + 1, k)
+    ]
+
+    wemmert = 0.0
+    for i, label in enumerate(labels):
+        members = traj[part == label]
+        quotients = [
+            np.linalg.norm(m - centroids[i]) /
+            min(np.linalg.norm(m - centroids[j]) for j in range(k) if j != i)
+            for m in members
+        ]
+        wemmert += len(members) * max(0.0, 1.0 - np.mean(quotients))
+
+    return {
+        CriteriaInternal.Ball_Hall: np.mean([np.trace(wgk[i]) / nk[i] for i in range(k)]),
+        CriteriaInternal.Banfeld_Raftery: sum(nk[i] * np.log(np.trace(wgk[i]) / nk[i]) for i in range(k)),
+        CriteriaInternal.Calinski_Harabasz: (n - k) / (k - 1) * bgss / wgss,
+        CriteriaInternal.Det_Ratio: np.linalg.det(t) / np.linalg.det(wg),
+        CriteriaInternal.Log_Det_Ratio: n * np.log(np.linalg.det(t) / np.linalg.det(wg)),
+        CriteriaInternal.Ksq_DetW: k ** 2 * np.linalg.det(wg),
+        CriteriaInternal.Log_SS_Ratio: np.log(bgss / wgss),
+        CriteriaInternal.Scott_Symons: sum(nk[i] * np.log(np.linalg.det(wgk[i] / nk[i])) for i in range(k)),
+        CriteriaInternal.Trace_W: wgss,
+        CriteriaInternal.Trace_WiB: np.trace(np.linalg.inv(wg) @ bg),
+        CriteriaInternal.Ratkowsky_Lance: np.sqrt(np.mean(np.diag(bg) / np.diag(t)) / k),
+        CriteriaInternal.PBM: (et / (k * ew) * max(centroidDist)) ** 2,
+        CriteriaInternal.Xie_Beni: wgss / n / minBetween,
+        CriteriaInternal.Ray_Turi: wgss / n / min(centroidDist) ** 2,
+        CriteriaInternal.Davies_Bouldin: db,
+        CriteriaInternal.SD_Scat: scat,
+        CriteriaInternal.SD_Dis: dis,
+        CriteriaInternal.S_Dbw: scat + np.mean(ratios),
+        CriteriaInternal.Wemmert_Gancarski: wemmert / n,
+    }
+
+
+def testScatterCriteriaMatchFormulas(subtests):
+    '''Every criterion of the scatter family should match a direct
+    implementation of its definition.
+    '''
+    expected = _naiveValues()
+    criteria = list(ScatterCriteria)
+    output = scatterCriteria(traj, part, criteria)
+
+    for crit, value in zip(criteria, output):
+        with subtests.test(crit=crit):
+            assert value == pytest.approx(expected[crit], rel=1e-9)
+
+
+def testScatterStatisticsDecomposition():
+    '''The total scatter matrix is the sum of the within and between
+    group scatter matrices.
+    '''
+    stats = ScatterStatistics(traj, part)
+    assert np.allclose(stats.t, stats.wg + stats.bg)
+    assert stats.k == 3
+    assert stats.counts.sum() == len(part)
+
+
+def testScatterLabelValuesIgnored():
+    '''Relabeling the clusters must not change any of the values.
+    '''
+    criteria = list(ScatterCriteria)
+    relabeled = np.choose(part - 1, [7, 0, 42])
+    assert np.allclose(
+        scatterCriteria(traj, part, criteria),
+        scatterCriteria(traj, relabeled, criteria)
+    )
+
+
+def testFactorize(subtests):
+    '''Every kind of label is converted to the codes found by sorting the labels.
+    '''
+    labels = {
+        "int16": np.array([-30000, 30000, 5] * 10, dtype=np.int16),
+        "uint8": np.array([3, 1, 7, 3], dtype=np.uint8),
+        "sparse": np.array([10 ** 9, 0, 10 ** 9]),
+        "strings": np.array(["b", "a", "c", "b"]),
+        "list": [0, 5, 5, 2],
+    }
+    for name, values in labels.items():
+        with subtests.test(labels=name):
+            expected, inverse = np.unique(np.asarray(values), return_inverse=True)
+            codes, found = factorize(values)
+            assert np.array_equal(codes, inverse.ravel())
+            assert np.array_equal(found, expected)
+            assert found.dtype == expected.dtype
+
+
+def testScatterFloat32(subtests):
+    '''float32 observations are not converted, and the statistics are accumulated
+    in float64 so that the values match the float64 computation.
+    '''
+    compact = traj.astype(np.float32)
+    with subtests.test("kept"):
+        assert asMatrix(compact).dtype == np.float32
+
+    criteria = list(ScatterCriteria)
+    with subtests.test("values"):
+        assert np.allclose(
+            scatterCriteria(compact, part.astype(np.int16), criteria),
+            scatterCriteria(compact.astype(np.float64), part, criteria),
+            rtol=1e-9
+        )
+
+
+def testScatterLengthMismatch():
+    '''A partition that does not match the observations is rejected.
+    '''
+    with pytest.raises(ValueError):
+        ScatterStatistics(traj, part[:-1])
+
+
+def testScatterMatchesR(subtests):
+    '''The numpy backend should agree with the clusterCrit R package.
+    '''
+    pytest.importorskip("rpy2")
+    from cluster_crit import intCriteria
+
+    criteria = list(ScatterCriteria)
+    fromR = intCriteria(traj, part, criteria)
+    fromNumpy = intCriteria(traj, part, criteria, backend='numpy')
+
+    for crit in criteria:
+        with subtests.test(crit=crit):
+            assert fromNumpy[crit.name] == pytest.approx(fromR[crit.name], rel=1e-6)
@@ -0,0 +1,94 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+import pytest
+from cluster_crit import bestCriterion, intCriteria, selectK, sweepK
+from cluster_crit.criteria import CriteriaInternal
+
+
+rng = np.random.default_rng(23)
+traj = np.vstack([rng.normal(4.0 * c, 0.4, size=(25, 2)) for c in range(4)])
+crit = [CriteriaInternal.Silhouette, CriteriaInternal.Calinski_Harabasz, CriteriaInternal.Ball_Hall]
+
+
+def quantiles(data, k):
+    '''Clusterer splitting the observations in k groups along the first axis.'''
+    order = np.argsort(data[:, 0], kind='stable')
+    part = np.empty(len(data), dtype=np.int64)
+    part[order] = np.arange(len(data)) * k // len(data)
+    return part
+
+
+def testSelectK(subtests):
+    '''The table holds the criteria of every k and the best k follows bestCriterion.'''
+    best, table = selectK(traj, quantiles, range(2, 9), crit, backend='numpy')
+
+    with subtests.test("table"):
+        assert list(table.columns) == list(range(2, 9))
+        assert list(table.index) == [c.name for c in crit]
+    for k in range(2, 9):
+        with subtests.test(k=k):
+            expected = intCriteria(traj, quantiles(traj, k), crit, backend='numpy')
+            assert np.allclose(table[k], [expected[c.name] for c in crit])
+    with subtests.test("best"):
+        assert best["Silhouette"] == 4
+        for c in crit:
+            index = bestCriterion(table.loc[c.name].values, c)
+            assert best[c.name] == (None if index is None else table.columns[index])
+
+
+def testSweepKEarlyStopping(subtests):
+    '''The sweep stops once the watched criteria have peaked, values are
+    yielded in increasing order of k.'''
+    with subtests.test("serial"):
+        ks = [k for k, _ in sweepK(traj, quantiles, range(2, 12), crit, backend='numpy',
+                                   patience=2, stopOn=["Silhouette"])]
+        assert ks == [2, 3, 4, 5, 6]
+    with subtests.test("unsorted range"):
+        best, table = selectK(traj, quantiles, [9, 3, 2, 6, 5, 4, 7], crit, backend='numpy',
+                              patience=2, stopOn=[CriteriaInternal.Silhouette])
+        assert list(table.columns) == [2, 3, 4, 5, 6]
+        assert best["Silhouette"] == 4
+    with subtests.test("iterator"):
+        best, table = selectK(traj, quantiles, (k for k in range(2, 6)), crit, backend='numpy')
+        assert list(table.columns) == [2, 3, 4, 5]
+    with subtests.test("invalid"):
+        with pytest.raises(ValueError):
+            selectK(traj, quantiles, range(2, 5), crit, backend='numpy', stopOn=["Dunn"])
+        with pytest.raises(ValueError):
+            selectK(traj, quantiles, [], crit, backend='numpy')
+
+
+def testSelectKJobs(subtests):
+    '''The clusterings run in worker processes and find the serial values.'''
+    expected = selectK(traj, quantiles, range(2, 10), crit, backend='numpy')[1]
+    with subtests.test("full"):
+        best, table = selectK(traj, quantiles, range(2, 10), crit, backend='numpy', nJobs=2)
+        np.testing.assert_allclose(table.values, expected.values)
+        assert best["Silhouette"] == 4
+    with subtests.test("early stopping"):
+        best, table = selectK(traj, quantiles, range(2, 10), crit, backend='numpy', nJobs=2,
+                              patience=2, stopOn=["Silhouette"])
+        assert list(table.columns) == [2, 3, 4, 5, 6]
+        np.testing.assert_allclose(table.values, expected.values[:, :5])
@@ -0,0 +1,101 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import subprocess
+import sys
+import numpy as np
+import pytest
+from cluster_crit import session
+
+
+def testImportDoesNotLoadR():
+    '''Importing the package must not load rpy2 or initialize R.
+    '''
+    code = (
+        "import sys, cluster_crit; "
+        "from cluster_crit.criteria import CriteriaInternal; "
+        "assert 'rpy2' not in sys.modules; "
+        "assert not cluster_crit.session.isInitialized()"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def testInitWithoutRpy2(monkeypatch):
+    '''A clear error is raised when rpy2 cannot be loaded.
+    '''
+    monkeypatch.setattr(session, "_initialized", False)
+    monkeypatch.setitem(sys.modules, "rpy2", None)
+
+    with pytest.raises(session.RUnavailableError):
+        session.init()
+
+    assert not session.isInitialized()
+
+
+def testOfflineEnvironment(monkeypatch):
+    '''Offline mode can be enabled through the environment.
+    '''
+    monkeypatch.setattr(session, "_offline", None)
+    monkeypatch.setenv(session.OfflineEnvironmentVariable, "1")
+    assert session.isOffline()
+
+    monkeypatch.setenv(session.OfflineEnvironmentVariable, "0")
+    assert not session.isOffline()
+
+
+def testSetOfflineOverridesEnvironment(monkeypatch):
+    '''An explicit offline setting wins over the environment.
+    '''
+    monkeypatch.setattr(session, "_offline", None)
+    monkeypatch.setenv(session.OfflineEnvironmentVariable, "1")
+    session.setOffline(False)
+    assert not session.isOffline()
+
+
+def testToR(subtests):
+    '''Values are prepared in the layout and types that R uses natively.
+    '''
+    with subtests.test(value='matrix'):
+        traj = session.toR(np.arange(12, dtype=np.float32).reshape(4, 3))
+        assert traj.dtype == np.float64 and traj.flags.f_contiguous
+
+    with subtests.test(value='integer matrix'):
+        traj = session.toR(np.arange(12, dtype=np.int64).reshape(4, 3) + 2 ** 40)
+        assert traj.dtype == np.float64 and traj.flags.f_contiguous
+        assert traj[0, 0] == 2 ** 40
+
+    with subtests.test(value='labels'):
+        labels = session.toR(np.asarray([1, 2, 2, 3], dtype=np.int32))
+        assert labels.dtype == np.int32 and labels.tolist() == [1, 2, 2, 3]
+
+    with subtests.test(value='partitions'):
+        partitions = np.ascontiguousarray(np.ones((3, 10), dtype=np.int32)).T
+        converted = session.toR(partitions)
+        assert converted.dtype == np.int32 and converted.flags.f_contiguous
+
+    with subtests.test(value='criteria'):
+        criteria = session.toR(['Dunn', 'Silhouette'])
+        assert criteria.dtype.kind == 'U' and criteria.tolist() == ['Dunn', 'Silhouette']
+
+    with subtests.test(value='string'):
+        assert session.toR('Dunn') == 'Dunn'
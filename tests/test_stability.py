@@ -0,0 +1,92 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+import pytest
+from cluster_crit import stability
+from cluster_crit.criteria import CriteriaExternal
+from cluster_crit.stability import resamples
+
+
+rng = np.random.default_rng(25)
+traj = np.concatenate([rng.normal(10.0 * c, 1.0, size=(40, 1)) for c in range(3)])
+
+
+def gaps(data, k):
+    '''Clusterer cutting the sorted observations at their k - 1 largest gaps.'''
+    values = data[:, 0]
+    order = np.argsort(values)
+    cuts = np.sort(np.argsort(np.diff(values[order]))[len(values) - k:])
+    part = np.empty(len(values), dtype=np.int64)
+    part[order] = np.searchsorted(cuts, np.arange(len(values)), side='left')
+    return part
+
+
+def testResamples(subtests):
+    '''The subsets are sorted index arrays drawn again with the same seed.'''
+    subsets = resamples(100, 4, fraction=0.5, seed=3)
+    with subtests.test("shape"):
+        assert len(subsets) == 4
+        assert all(len(s) == 50 and np.all(np.diff(s) > 0) for s in subsets)
+    with subtests.test("seed"):
+        assert all(np.array_equal(a, b) for a, b in zip(subsets, resamples(100, 4, fraction=0.5, seed=3)))
+    with subtests.test("replace"):
+        # the points drawn several times are kept once
+        for s in resamples(100, 3, fraction=1.0, replace=True, seed=3):
+            assert 50 < len(s) < 100
+            assert np.all(np.diff(s) > 0)
+    with subtests.test("invalid"):
+        with pytest.raises(ValueError):
+            resamples(100, 3, fraction=1.5)
+
+
+def testStability(subtests):
+    '''The number of groups of the data is perfectly stable, splitting a group
+    at a random gap is not.'''
+    crit = [CriteriaExternal.Jaccard, CriteriaExternal.Rand]
+    table = stability(traj, gaps, range(2, 6), nBoot=8, seed=0, crit=crit)
+
+    with subtests.test("table"):
+        assert list(table.index) == [2, 3, 4, 5]
+        assert list(table.columns) == [(c.name, s) for c in crit for s in ('mean', 'var')]
+    with subtests.test("stable"):
+        assert table.loc[3, ("Jaccard", "mean")] == pytest.approx(1.0)
+        assert table.loc[3, ("Jaccard", "var")] == pytest.approx(0.0)
+        assert table[("Jaccard", "mean")].idxmax() == 3
+        assert table.loc[4, ("Jaccard", "var")] > 0.0
+    with subtests.test("replace"):
+        boot = stability(traj, gaps, [3, 4], nBoot=6, seed=0, crit=crit, replace=True)
+        assert boot.loc[3, ("Jaccard", "mean")] == pytest.approx(1.0)
+        assert boot.loc[4, ("Jaccard", "mean")] < 1.0
+    with subtests.test("invalid"):
+        with pytest.raises(ValueError):
+            stability(traj, gaps, [3], nBoot=1)
+        with pytest.raises(ValueError):
+            stability(traj, lambda data, k: gaps(data, k)[1:], [3], nBoot=3)
+
+
+def testStabilityJobs():
+    '''The clusterings run in worker processes and find the serial values.'''
+    serial = stability(traj, gaps, range(2, 6), nBoot=6, seed=1)
+    parallel = stability(traj, gaps, range(2, 6), nBoot=6, seed=1, nJobs=2)
+    np.testing.assert_allclose(parallel.values, serial.values, equal_nan=True)
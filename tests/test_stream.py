@@ -0,0 +1,157 @@
+"""
+MIT License
+
+Copyright (c) 2022 Brent Barbachem
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+import numpy as np
+import pytest
+from cluster_crit import intCriteria
+from cluster_crit.criteria import CriteriaInternal
+from cluster_crit.native import nativeCriteria
+from cluster_crit.stream import StreamCriteria, streamCriteria
+
+
+rng = np.random.default_rng(19)
+centers = rng.normal(scale=6.0, size=(4, 3))
+part = rng.integers(0, 4, size=500)
+traj = centers[part] + rng.normal(size=(500, 3))
+crit = list(StreamCriteria)
+expected = nativeCriteria(traj, part, crit)
+
+
+@pytest.fixture
+def files(tmp_path):
+    np.save(tmp_path / "traj.npy", traj)
+    np.save(tmp_path / "part.npy", part)
+    return tmp_path / "traj.npy", tmp_path / "part.npy"
+
+
+def testStreamCriteria(subtests, files):
+    '''The criteria read in chunks match the in memory computation, for every
+    kind of source and chunks much smaller than the data set.
+    '''
+    path, labels = files
+    sources = {
+        "array": (traj, part),
+        "path": (str(path), str(labels)),
+        "memmap": (np.load(path, mmap_mode='r'), np.load(labels, mmap_mode='r')),
+    }
+    for name, (data, values) in sources.items():
+        output = streamCriteria(data, values, crit, maxMemory=1024)
+        for c, value, exp in zip(crit, output, expected):
+            with subtests.test(source=name, c=c):
+                assert np.isclose(value, exp)
+
+
+def testStreamRatiosOnlyWhenNeeded(subtests):
+    '''The sums of the centroid ratios are only accumulated for Wemmert_Gancarski.'''
+    from cluster_crit.stream import ArraySource, StreamStatistics
+
+    for requested in (False, True):
+        with subtests.test(ratios=requested):
+            streamed = StreamStatistics(ArraySource(traj), part)
+            streamed.moments(ratios=requested)
+            assert (streamed.ratios is not None) == requested
+
+
+def testStreamParquet(subtests, tmp_path):
+    '''Parquet files are read one batch of rows at a time.'''
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    path = tmp_path / "traj.parquet"
+    pq.write_table(pa.table({"x{}".format(j): traj[:, j] for j in range(traj.shape[1])}), path, row_group_size=64)
+
+    output = intCriteria(str(path), part, crit, backend='numpy', maxMemory=1024)
+    for c, exp in zip(crit, expected):
+        with subtests.test(c=c):
+            assert np.isclose(output[c.name], exp)
+
+
+class _Rows:
+    '''Array read by rows, like an h5py dataset, recording the largest read.'''
+
+    def __init__(self, array):
+        self.array = array
+        self.shape = array.shape
+        self.largest = 0
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, rows):
+        block = self.array[rows]
+        self.largest = max(self.largest, len(block))
+        return block
+
+
+def testIntCriteriaRowSliceable():
+    '''Objects sliced by rows that are not arrays are read in chunks, never whole.'''
+    data, labels = _Rows(traj), _Rows(part)
+    output = intCriteria(data, labels, crit, backend='numpy', maxMemory=1024)
+    assert np.allclose([output[c.name] for c in crit], expected, equal_nan=True)
+    assert 0 < data.largest < len(traj)
+    assert 0 < labels.largest < len(part)
+
+
+def testStreamHDF5(subtests, tmp_path):
+    '''HDF5 datasets and files holding a single dataset are read in chunks of rows.'''
+    h5py = pytest.importorskip("h5py")
+
+    path, labels = tmp_path / "traj.h5", tmp_path / "part.hdf5"
+    with h5py.File(path, "w") as f:
+        f.create_dataset("group/traj", data=traj)
+    with h5py.File(labels, "w") as f:
+        f.create_dataset("part", data=part)
+
+    with subtests.test("paths"):
+        output = intCriteria(str(path), str(labels), crit, backend='numpy', maxMemory=1024)
+        assert np.allclose([output[c.name] for c in crit], expected, equal_nan=True)
+    with subtests.test("datasets"):
+        with h5py.File(path, "r") as f, h5py.File(labels, "r") as g:
+            output = streamCriteria(f["group/traj"], g["part"], crit, maxMemory=1024)
+        assert np.allclose(output, expected, equal_nan=True)
+    with subtests.test("several datasets"):
+        with h5py.File(path, "a") as f:
+            f.create_dataset("other", data=part)
+        with pytest.raises(ValueError):
+            intCriteria(str(path), part, crit, backend='numpy')
+
+
+def testIntCriteriaFromDisk(subtests, files):
+    '''intCriteria reads paths in chunks, and memory maps them for the other criteria.'''
+    path, labels = files
+    with subtests.test("streamed"):
+        output = intCriteria(path, labels, [CriteriaInternal.Calinski_Harabasz], backend='numpy')
+        assert np.isclose(output["Calinski_Harabasz"], expected[crit.index(CriteriaInternal.Calinski_Harabasz)])
+    with subtests.test("memory mapped"):
+        output = intCriteria(path, labels, [CriteriaInternal.Silhouette], backend='numpy')
+        assert np.isclose(output["Silhouette"], nativeCriteria(traj, part, [CriteriaInternal.Silhouette])[0])
+
+
+def testStreamInvalid(subtests):
+    '''Criteria needing every pair of points, or mismatched labels, are refused.'''
+    with subtests.test("criteria"):
+        with pytest.raises(ValueError):
+            streamCriteria(traj, part, [CriteriaInternal.Xie_Beni])
+    with subtests.test("length"):
+        with pytest.raises(ValueError):
+            streamCriteria(traj, part[:-1], [CriteriaInternal.Trace_W])